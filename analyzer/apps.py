@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, pre_delete
+
+
+class AnalyzerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analyzer'
+    
+    def ready(self):
+        from .models import AnalysisSession
+        from .services.recurring import refresh_account_on_delete
+        from .services.response_cache import invalidate_session_on_delete
+        from .services.rollups import remove_session_on_delete
+        
+        # Keep monthly rollups in step when sessions (and their transactions) are deleted
+        pre_delete.connect(remove_session_on_delete, sender=AnalysisSession, dispatch_uid='analyzer_rollup_delete')
+        # Recurring payments are detected over the account's remaining transactions
+        post_delete.connect(refresh_account_on_delete, sender=AnalysisSession, dispatch_uid='analyzer_recurring_delete')
+        post_delete.connect(invalidate_session_on_delete, sender=AnalysisSession, dispatch_uid='analyzer_cache_delete')
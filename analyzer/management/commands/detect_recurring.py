@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from analyzer.models import AnalysisSession
+from analyzer.services.recurring import refresh_account
+
+
+class Command(BaseCommand):
+    """Detect recurring payments from stored transactions (e.g. for data ingested before detection existed)"""
+    help = 'Recompute the RecurringPayment rows of some or all accounts'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('accounts', nargs='*', help='Accounts to scan (default: all)')
+    
+    def handle(self, *args, **options):
+        accounts = options['accounts'] or (
+            AnalysisSession.objects.order_by().values_list('account', flat=True).distinct()
+        )
+        for account in accounts:
+            payments = refresh_account(account)
+            self.stdout.write(f'{account}: {len(payments)} recurring payments')
@@ -0,0 +1,35 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from analyzer.models import AnalysisSession
+from analyzer.services.jobs import StatementQueue
+from analyzer.services.pipeline import statement_path
+
+
+class Command(BaseCommand):
+    """Resume statements that were queued but never processed (e.g. after a restart)"""
+    help = 'Process PENDING analysis sessions whose uploaded statement is still on disk'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker threads')
+    
+    def handle(self, *args, **options):
+        queue = StatementQueue(options['workers'])
+        futures = []
+        sessions = AnalysisSession.objects.filter(status=AnalysisSession.STATUS_PENDING).annotate(file_count=Count('files'))
+        for session in sessions:
+            if session.file_count:
+                # Multi-statement upload; files missing from storage fail on their own
+                futures.append((session.session_id, queue.submit_batch(session.session_id)))
+                continue
+            relative_path = statement_path(session.session_id)
+            if not default_storage.exists(relative_path):
+                session.update_status(AnalysisSession.STATUS_FAILED, error='Uploaded statement is no longer available')
+                continue
+            futures.append((session.session_id, queue.submit(session.session_id, relative_path)))
+        
+        queue.shutdown(wait=True)
+        for session_id, future in futures:
+            outcome = 'processed' if future.result() is not None else 'failed'
+            self.stdout.write(f'{session_id}: {outcome}')
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.models import AnalysisSession
+from analyzer.services.ingest import iter_session_rows
+from analyzer.services.ml_analyzer import get_analyzer
+from analyzer.services.pipeline import save_analysis_result
+from analyzer.services.recurring import recurring_insights
+
+
+class Command(BaseCommand):
+    """Rebuild AnalysisResult rows from stored transactions without re-running categorization
+    
+    Only completed sessions are re-analyzed: pending and processing ones belong to
+    the workers, and failed ones have had their rows discarded.
+    """
+    help = 'Re-analyze completed sessions using the categories stored on each transaction'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('session_ids', nargs='*', help='Sessions to re-analyze (default: all completed)')
+    
+    def handle(self, *args, **options):
+        sessions = AnalysisSession.objects.filter(status=AnalysisSession.STATUS_COMPLETED)
+        if options['session_ids']:
+            sessions = sessions.filter(session_id__in=options['session_ids'])
+            if not sessions.exists():
+                raise CommandError('No matching completed analysis sessions')
+        
+        analyzer = get_analyzer()
+        # Recurring payments of a signed-in account are detected once for all of its
+        # sessions; anonymous sessions each get their own
+        recurring = {}
+        for session in sessions:
+            # Stored rows are streamed chunk by chunk and carry their category (and
+            # anomaly flags), so the classifier is never invoked here. Category totals
+            # and the top category come from the same aggregates as on upload.
+            analysis_result = analyzer.analyze_transactions(iter_session_rows(session))
+            key = session.account if session.has_owner else session.session_id
+            if key not in recurring:
+                recurring[key] = recurring_insights(session)
+            analysis_result['insights'].update(recurring[key])
+            save_analysis_result(session, analysis_result)
+            transactions = analysis_result['insights'].get('total_transactions', 0)
+            self.stdout.write(f'Re-analyzed {session.session_id} ({transactions} transactions)')
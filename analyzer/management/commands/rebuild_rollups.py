@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from analyzer.models import AnalysisSession
+from analyzer.services.rollups import rebuild_account
+
+
+class Command(BaseCommand):
+    """Recompute monthly rollups from stored transactions (e.g. for data ingested before they existed)"""
+    help = 'Rebuild the MonthlyRollup rows of some or all accounts'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('accounts', nargs='*', help='Accounts to rebuild (default: all)')
+    
+    def handle(self, *args, **options):
+        accounts = options['accounts'] or (
+            AnalysisSession.objects.order_by().values_list('account', flat=True).distinct()
+        )
+        for account in accounts:
+            groups = rebuild_account(account)
+            self.stdout.write(f'{account}: {groups} rollup groups')
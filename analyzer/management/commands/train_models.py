@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from analyzer.services.ml_analyzer import MODEL_VERSION, build_model_artifact, get_model_path
+
+
+class Command(BaseCommand):
+    """Rebuild the persisted categorization model artifact"""
+    help = 'Train the transaction categorization models and save them to ML_MODEL_DIR'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the artifact to this path instead of ML_MODEL_DIR')
+    
+    def handle(self, *args, **options):
+        path = options.get('output') or get_model_path()
+        build_model_artifact(path)
+        self.stdout.write(self.style.SUCCESS(f'Saved model artifact v{MODEL_VERSION} to {path}'))
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def mark_existing_sessions_completed(apps, schema_editor):
+    """Sessions created before background processing were analyzed inline"""
+    AnalysisSession = apps.get_model('analyzer', 'AnalysisSession')
+    AnalysisSession.objects.filter(analysis_result__isnull=False).update(status='COMPLETED', progress=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(mark_existing_sessions_completed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_analysissession_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_analysissession_content_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='transaction',
+            options={'ordering': ['-date', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['session', '-date', '-id'], name='transaction_session_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['session', 'transaction_type', '-date', '-id'], name='transaction_session_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['session', 'category', '-date', '-id'], name='transaction_session_cat_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_transaction_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=100, unique=True)),
+                ('model', models.BinaryField()),
+                ('sample_count', models.IntegerField(default=0)),
+                ('seen_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='account',
+            field=models.CharField(db_index=True, default='anonymous', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='anomaly_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='is_anomaly',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0005_anomaly_baseline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.IntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('duplicate_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='analyzer.analysissession')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='statementfile',
+            constraint=models.UniqueConstraint(fields=('session', 'position'), name='statement_file_position_unique'),
+        ),
+    ]
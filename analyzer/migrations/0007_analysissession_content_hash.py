@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0006_statement_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='analysissession',
+            index=models.Index(fields=['content_hash', 'account'], name='session_content_hash_idx'),
+        ),
+    ]
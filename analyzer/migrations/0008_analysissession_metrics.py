@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0007_analysissession_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0009_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=100)),
+                ('merchant_key', models.CharField(max_length=255)),
+                ('merchant', models.TextField()),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('cadence', models.CharField(choices=[('weekly', 'Weekly'), ('biweekly', 'Every two weeks'), ('monthly', 'Monthly'), ('quarterly', 'Quarterly'), ('yearly', 'Yearly')], max_length=20)),
+                ('interval_days', models.FloatField()),
+                ('occurrences', models.PositiveIntegerField()),
+                ('average_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount_std_dev', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('next_date', models.DateField()),
+                ('next_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['account', 'next_date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recurringpayment',
+            constraint=models.UniqueConstraint(fields=('account', 'merchant_key'), name='recurring_payment_unique'),
+        ),
+    ]
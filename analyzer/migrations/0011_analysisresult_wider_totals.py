@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0010_recurring_payment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='net_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='total_expenses',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='total_income',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+    ]
@@ -4,13 +4,89 @@ from django.utils import timezone
 
 class AnalysisSession(models.Model):
     """Model to store analysis sessions"""
+    STATUS_PENDING = 'PENDING'
+    STATUS_PROCESSING = 'PROCESSING'
+    STATUS_COMPLETED = 'COMPLETED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
     session_id = models.CharField(max_length=100, unique=True)
+    # Owner of the statement: 'user:<pk>' (plus an optional label) for a signed-in
+    # user, else the shared 'anonymous' account. Anomaly baselines are kept per owned account
+    account = models.CharField(max_length=100, default='anonymous', db_index=True)
     created_at = models.DateTimeField(default=timezone.now)
     file_name = models.CharField(max_length=255)
     file_size = models.IntegerField()
+    status = models.CharField(max_length=20, default=STATUS_PENDING, choices=STATUS_CHOICES)
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    # Incremented whenever the stored analysis changes; part of the response cache key and ETag
+    content_version = models.PositiveIntegerField(default=0)
+    # SHA-256 of the uploaded PDF; a re-upload of the same file reuses this session
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Per-stage timings and counters of the upload pipeline (see services/metrics.py)
+    metrics = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_hash', 'account'], name='session_content_hash_idx'),
+        ]
     
     def __str__(self):
         return f"Analysis {self.session_id} - {self.file_name}"
+    
+    @staticmethod
+    def account_has_owner(account):
+        """Whether an account key belongs to a signed-in user rather than the shared anonymous account"""
+        return account.startswith('user:')
+    
+    @property
+    def has_owner(self):
+        return self.account_has_owner(self.account)
+    
+    def update_status(self, status=None, progress=None, error=None):
+        """Persist a status/progress change without touching other fields"""
+        update_fields = []
+        if status is not None:
+            self.status = status
+            update_fields.append('status')
+        if progress is not None:
+            self.progress = progress
+            update_fields.append('progress')
+        if error is not None:
+            self.error = error
+            update_fields.append('error')
+        if update_fields:
+            self.save(update_fields=update_fields)
+
+
+class StatementFile(models.Model):
+    """One PDF of a multi-statement upload; the session holds the combined analysis"""
+    session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='files')
+    position = models.PositiveSmallIntegerField()
+    file_name = models.CharField(max_length=255)
+    file_size = models.IntegerField()
+    status = models.CharField(max_length=20, default=AnalysisSession.STATUS_PENDING,
+                              choices=AnalysisSession.STATUS_CHOICES)
+    error = models.TextField(blank=True, default='')
+    # Rows stored for this file, rows already present in an earlier file, and invalid rows
+    transaction_count = models.PositiveIntegerField(default=0)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'position'], name='statement_file_position_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
 
 
 class Transaction(models.Model):
@@ -25,20 +101,117 @@ class Transaction(models.Model):
     ])
     category = models.CharField(max_length=50, blank=True, null=True)
     confidence = models.FloatField(default=0.0)
+    # IsolationForest score_samples() against the account baseline; lower is more unusual
+    anomaly_score = models.FloatField(blank=True, null=True)
+    is_anomaly = models.BooleanField(default=False)
     
     class Meta:
-        ordering = ['-date']
+        ordering = ['-date', '-id']
+        indexes = [
+            # Keyset pagination of a session's transactions, optionally filtered by type or category
+            models.Index(fields=['session', '-date', '-id'], name='transaction_session_date_idx'),
+            models.Index(fields=['session', 'transaction_type', '-date', '-id'], name='transaction_session_type_idx'),
+            models.Index(fields=['session', 'category', '-date', '-id'], name='transaction_session_cat_idx'),
+        ]
     
     def __str__(self):
         return f"{self.date} - {self.description} - {self.amount}"
 
 
+class MonthlyRollup(models.Model):
+    """Totals of one account's transactions per month, category and type
+    
+    Maintained incrementally as sessions are ingested and deleted (see
+    services/rollups.py), so trend queries never scan Transaction rows.
+    """
+    account = models.CharField(max_length=100)
+    # First day of the month
+    month = models.DateField()
+    # '' for rows without a category (credits)
+    category = models.CharField(max_length=50, blank=True, default='')
+    transaction_type = models.CharField(max_length=20, choices=[
+        ('CREDIT', 'Credit'),
+        ('DEBIT', 'Debit'),
+    ])
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    
+    class Meta:
+        ordering = ['account', 'month']
+        constraints = [
+            # Also serves the (account, month) range scans of the trends API
+            models.UniqueConstraint(fields=['account', 'month', 'category', 'transaction_type'],
+                                    name='monthly_rollup_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account} {self.month:%Y-%m} {self.transaction_type} {self.category or '-'}: {self.total}"
+
+
+class RecurringPayment(models.Model):
+    """A subscription or bill detected across an account's statements
+    
+    Recomputed from the account's debits whenever a statement is stored or a
+    session deleted (see services/recurring.py), so reads are a plain query.
+    """
+    CADENCE_CHOICES = [
+        ('weekly', 'Weekly'),
+        ('biweekly', 'Every two weeks'),
+        ('monthly', 'Monthly'),
+        ('quarterly', 'Quarterly'),
+        ('yearly', 'Yearly'),
+    ]
+    
+    account = models.CharField(max_length=100)
+    # Normalized merchant the charges were grouped by (see services/merchants.py)
+    merchant_key = models.CharField(max_length=255)
+    # Description of the latest charge
+    merchant = models.TextField()
+    category = models.CharField(max_length=50, blank=True, default='')
+    cadence = models.CharField(max_length=20, choices=CADENCE_CHOICES)
+    interval_days = models.FloatField()
+    occurrences = models.PositiveIntegerField()
+    average_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_std_dev = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    first_date = models.DateField()
+    last_date = models.DateField()
+    next_date = models.DateField()
+    next_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # False once the next expected charge is overdue by more than one interval
+    active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['account', 'next_date']
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'merchant_key'], name='recurring_payment_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account} {self.cadence} {self.merchant_key}: {self.average_amount}"
+
+
+class AnomalyBaseline(models.Model):
+    """Persisted per-account anomaly model, updated as statements arrive"""
+    account = models.CharField(max_length=100, unique=True)
+    model = models.BinaryField()
+    sample_count = models.IntegerField(default=0)
+    seen_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Anomaly baseline for {self.account} ({self.seen_count} transactions)"
+
+
 class AnalysisResult(models.Model):
     """Model to store analysis insights"""
     session = models.OneToOneField(AnalysisSession, on_delete=models.CASCADE, related_name='analysis_result')
-    total_income = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    total_expenses = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    net_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Totals add up every row of a statement, so they need more digits than Transaction.amount
+    total_income = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_expenses = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    net_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
     category_breakdown = models.JSONField(default=dict)
     anomaly_transactions = models.JSONField(default=list)
     insights = models.JSONField(default=dict)
@@ -0,0 +1,242 @@
+import io
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_REASON = 'Unusual amount compared to your transaction history'
+
+# Times a statement is folded into a baseline that concurrent uploads keep replacing
+SAVE_ATTEMPTS = 5
+
+
+class AnomalyDetector:
+    """Per-account anomaly baseline that is scored, never refit, on each upload
+    
+    The baseline is an IsolationForest fitted on a bounded reservoir sample of the
+    account's transaction amounts. New rows are scored with score_samples() against
+    the forest as it was before they arrived. update() then folds them into the
+    reservoir and refits only once enough new history has accumulated, so the cost
+    of a fit is amortized over many uploads. stored_seen is the seen_count of the
+    stored baseline this one was loaded from (None if there was none), which
+    save_anomaly_detector() checks before replacing it.
+    """
+    
+    def __init__(self, reservoir_size: int = 2048, refit_fraction: float = 0.25,
+                 min_rows: int = 3, seed: int = 42):
+        self.reservoir_size = reservoir_size
+        self.refit_fraction = refit_fraction
+        self.min_rows = min_rows
+        self.reservoir = np.empty(0, dtype=np.float64)
+        self.seen = 0
+        self.pending = 0
+        self.forest: Optional[IsolationForest] = None
+        self.stored_seen: Optional[int] = None
+        self._rng = np.random.default_rng(seed)
+    
+    @property
+    def is_fitted(self) -> bool:
+        return self.forest is not None
+    
+    @staticmethod
+    def features(transactions: List[Dict]) -> np.ndarray:
+        """Amount feature matrix; the forest is invariant to affine scaling, so no scaler"""
+        amounts = np.fromiter(
+            (float(t['amount']) if t.get('amount') is not None else 0.0 for t in transactions),
+            dtype=np.float64, count=len(transactions)
+        )
+        return amounts.reshape(-1, 1)
+    
+    def score(self, transactions: List[Dict]) -> List[Dict]:
+        """Set 'anomaly_score' and 'is_anomaly' on each row without touching the forest
+        
+        Scores follow sklearn's convention: lower is more anomalous, and rows below
+        the forest's offset_ are the ones predict() would label -1.
+        """
+        if not self.is_fitted or not transactions:
+            return transactions
+        
+        scores, flags = self.score_amounts(self.features(transactions).ravel())
+        for transaction, score, flag in zip(transactions, scores.tolist(), flags.tolist()):
+            transaction['anomaly_score'] = score
+            transaction['is_anomaly'] = flag
+        return transactions
+    
+    def score_amounts(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, anomaly flags) of an array of amounts against the fitted forest"""
+        scores = self.forest.score_samples(values.reshape(-1, 1))
+        return scores, scores < self.forest.offset_
+    
+    def update(self, transactions: List[Dict]) -> bool:
+        """Add rows to the history sample; refit when it has grown enough. Returns True on refit"""
+        if transactions:
+            self.add(self.features(transactions).ravel())
+        return self.refit_if_due()
+    
+    def refit_if_due(self) -> bool:
+        """Refit once the amounts added since the last fit reach refit_fraction of the sample"""
+        if len(self.reservoir) < self.min_rows:
+            return False
+        if self.is_fitted and self.pending < self.refit_fraction * len(self.reservoir):
+            return False
+        
+        self.forest = IsolationForest(contamination=0.1, random_state=42)
+        self.forest.fit(self.reservoir.reshape(-1, 1))
+        self.pending = 0
+        logger.info("Refitted anomaly baseline on %d sampled amounts (%d seen)", len(self.reservoir), self.seen)
+        return True
+    
+    def add(self, values: np.ndarray):
+        """Reservoir sampling (Algorithm R): every amount seen so far is equally likely to be kept"""
+        free = max(0, self.reservoir_size - len(self.reservoir))
+        if free:
+            self.reservoir = np.concatenate([self.reservoir, values[:free]])
+        for offset, value in enumerate(values[free:].tolist()):
+            slot = self._rng.integers(0, self.seen + free + offset + 1)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = value
+        self.seen += len(values)
+        self.pending += len(values)
+    
+    def dumps(self) -> bytes:
+        buffer = io.BytesIO()
+        joblib.dump(self, buffer)
+        return buffer.getvalue()
+    
+    @classmethod
+    def loads(cls, data: bytes) -> 'AnomalyDetector':
+        return joblib.load(io.BytesIO(bytes(data)))
+
+
+def load_anomaly_detector(account: str) -> AnomalyDetector:
+    """The persisted baseline of an account, or a fresh one"""
+    from django.conf import settings
+    from ..models import AnomalyBaseline
+    
+    baseline = AnomalyBaseline.objects.filter(account=account).first()
+    detector = None
+    if baseline is not None:
+        try:
+            detector = AnomalyDetector.loads(baseline.model)
+        except Exception as e:
+            logger.warning("Discarding unreadable anomaly baseline for %s: %s", account, e)
+    
+    if detector is None:
+        detector = AnomalyDetector(
+            reservoir_size=getattr(settings, 'ANOMALY_RESERVOIR_SIZE', 2048),
+            refit_fraction=getattr(settings, 'ANOMALY_REFIT_FRACTION', 0.25),
+        )
+    detector.stored_seen = baseline.seen_count if baseline is not None else None
+    return detector
+
+
+def save_anomaly_detector(account: str, detector: AnomalyDetector) -> bool:
+    """Persist a baseline unless another one was saved since it was loaded
+    
+    seen_count only grows, so it versions the stored baseline: the row is replaced
+    only while it still has the seen_count the detector was loaded with. Returns
+    False (saving nothing) when a concurrent upload got there first.
+    """
+    from django.db import IntegrityError, transaction
+    from django.utils import timezone
+    from ..models import AnomalyBaseline
+    
+    fields = {
+        'model': detector.dumps(),
+        'sample_count': len(detector.reservoir),
+        'seen_count': detector.seen,
+        'updated_at': timezone.now(),
+    }
+    if detector.stored_seen is None:
+        try:
+            with transaction.atomic():
+                AnomalyBaseline.objects.create(account=account, **fields)
+        except IntegrityError:
+            return False
+    elif not AnomalyBaseline.objects.filter(account=account, seen_count=detector.stored_seen).update(**fields):
+        return False
+    
+    detector.stored_seen = detector.seen
+    return True
+
+
+def _session_amounts(session, chunk_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """(ids, amounts) of a session's stored rows, chunk by chunk in insertion order"""
+    from ..models import Transaction
+    
+    last_id = 0
+    while True:
+        rows = list(
+            Transaction.objects.filter(session=session, pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', 'amount')[:chunk_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield (np.fromiter((pk for pk, _ in rows), dtype=np.int64, count=len(rows)),
+               np.fromiter((float(amount) for _, amount in rows), dtype=np.float64, count=len(rows)))
+
+
+def _fold_session(session, detector: AnomalyDetector, chunk_size: int):
+    for _, amounts in _session_amounts(session, chunk_size):
+        detector.add(amounts)
+    detector.refit_if_due()
+
+
+def fold_statement(session, detector: AnomalyDetector) -> AnomalyDetector:
+    """Fold an ingested statement into the account baseline, without saving it
+    
+    The statement's amounts are read back from the database chunk by chunk. Rows
+    scored during ingest keep their scores. On a cold start (no baseline yet) the
+    rows are scored against the baseline fitted on this statement.
+    """
+    from django.conf import settings
+    from ..models import Transaction
+    
+    chunk_size = getattr(settings, 'TRANSACTION_BULK_BATCH_SIZE', 500)
+    cold_start = not detector.is_fitted
+    _fold_session(session, detector, chunk_size)
+    
+    if cold_start and detector.is_fitted:
+        for ids, amounts in _session_amounts(session, chunk_size):
+            scores, flags = detector.score_amounts(amounts)
+            Transaction.objects.bulk_update(
+                [
+                    Transaction(id=pk, anomaly_score=score, is_anomaly=flag)
+                    for pk, score, flag in zip(ids.tolist(), scores.tolist(), flags.tolist())
+                ],
+                ['anomaly_score', 'is_anomaly'],
+                batch_size=chunk_size
+            )
+    return detector
+
+
+def save_baseline(session, detector: AnomalyDetector) -> AnomalyDetector:
+    """Persist a baseline that fold_statement() updated with the session's statement
+    
+    Called once the session's analysis is otherwise complete, so a failed upload
+    never reaches the baseline. When another upload of the account saved the
+    baseline after this one was loaded, the newer baseline is reloaded and the
+    statement folded into it instead, so concurrent uploads never lose each
+    other's update. Returns the saved detector.
+    """
+    from django.conf import settings
+    
+    chunk_size = getattr(settings, 'TRANSACTION_BULK_BATCH_SIZE', 500)
+    attempt = 1
+    while not save_anomaly_detector(session.account, detector):
+        if attempt == SAVE_ATTEMPTS:
+            logger.warning("Anomaly baseline of %s kept changing; session %s is left out of it",
+                           session.account, session.session_id)
+            break
+        attempt += 1
+        logger.info("Anomaly baseline of %s changed concurrently, folding session %s in again",
+                    session.account, session.session_id)
+        detector = load_anomaly_detector(session.account)
+        _fold_session(session, detector, chunk_size)
+    return detector
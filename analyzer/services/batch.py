@@ -0,0 +1,183 @@
+import re
+import logging
+from collections import Counter
+from decimal import Decimal
+from typing import Dict, Any, List, Tuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from ..models import AnalysisSession, StatementFile
+from .ingest import CENT, ingest_stream, session_frame, validate_transaction
+from .metrics import PipelineMetrics, collect, maybe_profile, record_session, stage
+from .pipeline import StatementProcessingError, discard_failed_session, keep_uploads, save_analysis_result
+from .recurring import recurring_insights
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def statement_file_path(session_id: str, position: int) -> str:
+    """Storage path used for one PDF of a multi-statement upload"""
+    return f'statements/{session_id}-{position}.pdf'
+
+
+def transaction_key(trans_data: Dict[str, Any]) -> Tuple:
+    """Identity of a validated row across statements: date, type, amount and description"""
+    return (
+        trans_data['date'],
+        trans_data['type'],
+        Decimal(str(trans_data['amount'])).quantize(CENT),
+        WHITESPACE_RE.sub(' ', str(trans_data['description'])).strip().upper(),
+    )
+
+
+def dedupe_statements(statements: List[List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Merge the rows of overlapping statements, dropping rows an earlier statement already had
+    
+    Identical rows within one statement are real (two equal purchases on one day),
+    so keys are counted per statement: the merged rows contain each key as often
+    as the statement with the most occurrences of it. Returns the merged rows and
+    the number of duplicates dropped from each statement.
+    """
+    kept = Counter()
+    merged = []
+    duplicates = []
+    for rows in statements:
+        occurrences = Counter()
+        dropped = 0
+        for row in rows:
+            key = transaction_key(row)
+            occurrences[key] += 1
+            if occurrences[key] > kept[key]:
+                kept[key] = occurrences[key]
+                merged.append(row)
+            else:
+                dropped += 1
+        duplicates.append(dropped)
+    return merged, duplicates
+
+
+def _fail_file(statement_file: StatementFile, error: str):
+    statement_file.status = AnalysisSession.STATUS_FAILED
+    statement_file.error = error
+    statement_file.save(update_fields=['status', 'error', 'rejected_count'])
+
+
+def process_statement_batch(session_id: str) -> Tuple[Dict[str, Any], List[StatementFile]]:
+    """Parse the PDFs of a multi-statement upload concurrently and analyze them as one
+    
+    Each file is parsed and validated on its own; a file that fails is marked FAILED
+    and left out without affecting the others. Rows repeated across overlapping
+    statements are stored once, and the session gets one combined AnalysisResult.
+    Returns (analysis_result, statement_files). Uploaded files are removed afterwards
+    unless STATEMENT_KEEP_UPLOADS is set. Stage timings and counters are stored on
+    the session.
+    """
+    session = AnalysisSession.objects.get(session_id=session_id)
+    files = list(session.files.all())
+    paths = {statement_file.pk: statement_file_path(session_id, statement_file.position) for statement_file in files}
+    metrics = PipelineMetrics()
+    
+    try:
+        with collect(metrics), maybe_profile(metrics, session_id):
+            analysis_result = _process_statement_batch(session, files, paths)
+        record_session(session, metrics, AnalysisSession.STATUS_COMPLETED)
+        return analysis_result, files
+    except Exception as e:
+        logger.error("Batch processing failed for session %s: %s", session_id, e)
+        discard_failed_session(session)
+        session.files.filter(status=AnalysisSession.STATUS_PENDING).update(
+            status=AnalysisSession.STATUS_FAILED, error=str(e)
+        )
+        session.update_status(AnalysisSession.STATUS_FAILED, error=str(e))
+        record_session(session, metrics, AnalysisSession.STATUS_FAILED)
+        raise
+    finally:
+        if not keep_uploads():
+            for relative_path in paths.values():
+                default_storage.delete(relative_path)
+
+
+def _process_statement_batch(session: AnalysisSession, files: List[StatementFile],
+                             paths: Dict[int, str]) -> Dict[str, Any]:
+    # The ML and PDF stacks are imported on first use, not when the URLconf loads
+    from .anomaly import fold_statement, load_anomaly_detector, save_baseline
+    from .ml_analyzer import get_analyzer
+    from .pdf_parser import PDFParser
+    
+    session.update_status(AnalysisSession.STATUS_PROCESSING, progress=10)
+    
+    # Files are the unit of parallelism here, so pages are extracted serially per file
+    pending = [f for f in files if f.status == AnalysisSession.STATUS_PENDING]
+    parser = PDFParser(chunk_size=getattr(settings, 'PDF_PARSER_CHUNK_SIZE', 16))
+    with stage('parse'):
+        results = parser.parse_statements(
+            [default_storage.path(paths[statement_file.pk]) for statement_file in pending],
+            workers=getattr(settings, 'STATEMENT_BATCH_WORKERS', 4)
+        )
+    session.update_status(progress=40)
+    
+    parsed_files = []
+    statements = []
+    for statement_file, (rows, error) in zip(pending, results):
+        if error is not None:
+            logger.warning("Could not parse %s in session %s: %s", statement_file.file_name, session.session_id, error)
+            _fail_file(statement_file, f'Could not process PDF: {error}')
+            continue
+        
+        valid = []
+        for trans_data in rows:
+            if validate_transaction(trans_data):
+                statement_file.rejected_count += 1
+            else:
+                valid.append(trans_data)
+        if not valid:
+            _fail_file(statement_file, 'Could not extract valid transactions from PDF' if rows
+                       else 'Could not extract transactions from PDF')
+            continue
+        parsed_files.append(statement_file)
+        statements.append(valid)
+    
+    if not statements:
+        raise StatementProcessingError('None of the uploaded statements could be processed')
+    
+    with stage('dedupe'):
+        merged, duplicates = dedupe_statements(statements)
+    
+    with stage('load_models'):
+        analyzer = get_analyzer()
+        # Only a signed-in owner's statements share a baseline; anonymous uploads all
+        # fall under one account, so they are checked against their own amounts instead
+        detector = load_anomaly_detector(session.account) if session.has_owner else None
+    accepted, _ = ingest_stream(
+        session, merged, analyzer=analyzer,
+        anomaly_detector=detector if detector is not None and detector.is_fitted else None
+    )
+    session.update_status(progress=70)
+    
+    for statement_file, rows, duplicate_count in zip(parsed_files, statements, duplicates):
+        statement_file.status = AnalysisSession.STATUS_COMPLETED
+        statement_file.transaction_count = len(rows) - duplicate_count
+        statement_file.duplicate_count = duplicate_count
+        statement_file.save(update_fields=['status', 'transaction_count', 'duplicate_count', 'rejected_count'])
+    
+    if detector is not None:
+        with stage('anomaly_baseline'):
+            detector = fold_statement(session, detector)
+    with stage('analyze'):
+        analysis_result = analyzer.analyze_transactions(session_frame(session, analyzer.categories))
+    # Subscriptions and bills show up across statements, so they are detected over the
+    # whole signed-in account (an anonymous upload only over its own statement)
+    with stage('recurring'):
+        analysis_result['insights'].update(recurring_insights(session))
+    with stage('save_result'):
+        if detector is not None:
+            save_baseline(session, detector)
+        save_analysis_result(session, analysis_result)
+    
+    logger.info("Batch %s: %d of %d statements, %d transactions, %d duplicates dropped",
+                session.session_id, len(parsed_files), len(files), accepted, sum(duplicates))
+    session.update_status(AnalysisSession.STATUS_COMPLETED, progress=100)
+    return analysis_result
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadhandler import FileUploadHandler
+
+from ..models import AnalysisSession
+
+logger = logging.getLogger(__name__)
+
+# settings.STATEMENT_DEDUP_POLICY values
+POLICY_OFF = 'off'          # always store and process the upload again
+POLICY_ACCOUNT = 'account'  # reuse a session with the same content from the same account
+
+HIT_KEY = 'statement-dedup:hits'
+MISS_KEY = 'statement-dedup:misses'
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """Computes the SHA-256 of each uploaded file from the chunks as they stream in
+    
+    Chunks are passed on unchanged to the handlers that store the file. Digests are
+    kept per form field in upload order; see attach_content_hashes().
+    """
+    
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests = defaultdict(list)
+        self._hasher = None
+    
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hasher = hashlib.sha256()
+    
+    def receive_data_chunk(self, raw_data, start):
+        self._hasher.update(raw_data)
+        return raw_data
+    
+    def file_complete(self, file_size):
+        self.digests[self.field_name].append(self._hasher.hexdigest())
+        return None
+
+
+def install_hash_handler(request) -> ContentHashUploadHandler:
+    """Put a ContentHashUploadHandler in front of the request's upload handlers
+    
+    Must run before request.data or request.FILES is first accessed.
+    """
+    handler = ContentHashUploadHandler(request)
+    request.upload_handlers.insert(0, handler)
+    return handler
+
+
+def attach_content_hashes(request, handler: ContentHashUploadHandler, field_name: str):
+    """Set .content_hash on the uploaded files of field_name from the streamed digests"""
+    uploaded_files = request.FILES.getlist(field_name)
+    digests = handler.digests.get(field_name, [])
+    for index, uploaded_file in enumerate(uploaded_files):
+        uploaded_file.content_hash = digests[index] if index < len(digests) else content_hash(uploaded_file)
+    return uploaded_files
+
+
+def content_hash(uploaded_file) -> str:
+    """SHA-256 of an uploaded file, read chunk by chunk (used when no digest was streamed)"""
+    digest = getattr(uploaded_file, 'content_hash', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+
+def dedup_policy() -> str:
+    return getattr(settings, 'STATEMENT_DEDUP_POLICY', POLICY_ACCOUNT)
+
+
+def find_duplicate_session(digest: str, account: str) -> Optional[AnalysisSession]:
+    """Latest session of the account whose statement had this content
+    
+    Only signed-in accounts reuse sessions: anonymous uploads all share one
+    account, and a session is never handed to anyone but its owner. Sessions that
+    failed are never reused; pending ones are, so concurrent re-uploads of one
+    file share a single processing job. Hits and misses are counted.
+    """
+    if dedup_policy() == POLICY_OFF or not digest or not AnalysisSession.account_has_owner(account):
+        return None
+    
+    session = (
+        AnalysisSession.objects.filter(content_hash=digest, account=account)
+        .exclude(status=AnalysisSession.STATUS_FAILED)
+        .order_by('-created_at')
+        .first()
+    )
+    
+    _count(HIT_KEY if session is not None else MISS_KEY)
+    if session is not None:
+        logger.info("Statement %s already analyzed in session %s", digest[:12], session.session_id)
+    return session
+
+
+def _count(key: str):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def dedup_stats() -> Dict:
+    """Hit/miss counts of the re-upload lookup since the cache was last cleared"""
+    hits = cache.get(HIT_KEY, 0)
+    misses = cache.get(MISS_KEY, 0)
+    lookups = hits + misses
+    return {
+        'policy': dedup_policy(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+    }
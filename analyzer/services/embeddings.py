@@ -0,0 +1,351 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .metrics import count
+
+try:
+    import fcntl
+except ImportError:  # Windows: caches fall back to a directory per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Reference numbers, card digits, dates and punctuation vary between repeats of the
+# same merchant string; they are dropped before the cache lookup
+NOISE_RE = re.compile(r'[^a-z&\s]+')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_description(description: str) -> str:
+    """Cache key of a description: lowercase letters only, single-spaced"""
+    return SPACE_RE.sub(' ', NOISE_RE.sub(' ', description.lower())).strip()
+
+
+class SentenceTransformerEncoder:
+    """CPU sentence-transformers model, loaded on first use"""
+    
+    def __init__(self, model_name: str, batch_size: int = 64):
+        self.name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+    
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.name, device='cpu')
+        return self._model
+    
+    @property
+    def dim(self) -> int:
+        return self._get_model().get_sentence_embedding_dimension()
+    
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self._get_model().encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False
+        ).astype(np.float32)
+
+
+class HashingEncoder:
+    """Dependency-free stand-in encoder: hashed character n-grams, L2-normalized
+    
+    Deterministic and instant, so it is what local development and tests use
+    (EMBEDDING_MODEL = 'hashing'); it captures spelling, not meaning.
+    """
+    
+    name = 'hashing'
+    
+    def __init__(self, dim: int = 512):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        
+        self.dim = dim
+        self._vectorizer = HashingVectorizer(
+            analyzer='char_wb', ngram_range=(3, 4), n_features=dim, alternate_sign=False, norm='l2'
+        )
+    
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self._vectorizer.transform(texts).toarray().astype(np.float32)
+
+
+class EmbeddingCache:
+    """LRU-bounded embedding store backed by a memory-mapped .npy file
+    
+    Vectors live in `directory/embeddings.npy` (capacity x dim float32, opened with
+    np.memmap) and `directory/index.json` maps each key to its row in LRU order.
+    When full, the least recently used key gives its row to the new one. A cache
+    built for another model or dimension is discarded. Without a directory the
+    store is an in-memory array.
+    
+    Worker processes may share a directory: reads hold a shared lock on
+    `directory/lock` and writes an exclusive one, under which put_many() writes
+    its vectors and the index together. Each process reloads the index when
+    another one has replaced it, so a key never maps to a row holding another
+    key's vector. Without fcntl (Windows) each process gets its own subdirectory.
+    """
+    
+    def __init__(self, directory: Optional[str], dim: int, capacity: int = 50000, model_name: str = ''):
+        self.directory = directory
+        self.dim = dim
+        self.capacity = capacity
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self.slots: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+        self._index_signature = None
+        self._vectors_inode = None
+        
+        if directory is None:
+            self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+            return
+        
+        if fcntl is None:
+            self.directory = directory = os.path.join(directory, f'process-{os.getpid()}')
+        os.makedirs(directory, exist_ok=True)
+        with self._locked(exclusive=True, sync=False):
+            index = self._read_index()
+            if index is not None and os.path.exists(self._vectors_path()) and self._open_vectors():
+                self.slots = OrderedDict((key, int(slot)) for key, slot in index['slots'])
+                self._index_signature = _file_signature(self._index_path())
+            else:
+                self._create_vectors()
+    
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, 'index.json')
+    
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, 'embeddings.npy')
+    
+    @contextmanager
+    def _locked(self, exclusive: bool, sync: bool = True):
+        """Hold the thread lock and, for a shared directory, the directory's file lock"""
+        with self._lock:
+            if self.directory is None or fcntl is None:
+                yield
+                return
+            # flock locks belong to the open file, which a forked worker would share
+            if self._lock_pid != os.getpid():
+                self._lock_file = open(os.path.join(self.directory, 'lock'), 'a+b')
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                if sync:
+                    self._sync()
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+    
+    def _sync(self):
+        """Reload the index (and reopen the vectors) if another process replaced them"""
+        signature = _file_signature(self._index_path())
+        if signature == self._index_signature:
+            return
+        self._index_signature = signature
+        index = self._read_index() if signature is not None else None
+        if index is not None and _file_inode(self._vectors_path()) != self._vectors_inode:
+            if not self._open_vectors():
+                index = None
+        self.slots = OrderedDict((key, int(slot)) for key, slot in index['slots']) if index else OrderedDict()
+    
+    def _open_vectors(self) -> bool:
+        try:
+            vectors = np.lib.format.open_memmap(self._vectors_path(), mode='r+')
+        except (OSError, ValueError):
+            return False
+        if vectors.shape != (self.capacity, self.dim) or vectors.dtype != np.float32:
+            return False
+        self.vectors = vectors
+        self._vectors_inode = _file_inode(self._vectors_path())
+        return True
+    
+    def _create_vectors(self):
+        """Start an empty vector file; replaced rather than truncated, as other processes may map it"""
+        tmp_path = f"{self._vectors_path()}.{os.getpid()}.tmp"
+        vectors = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(self.capacity, self.dim))
+        vectors.flush()
+        del vectors
+        os.replace(tmp_path, self._vectors_path())
+        self._open_vectors()
+        self.slots = OrderedDict()
+    
+    def _read_index(self) -> Optional[Dict]:
+        try:
+            with open(self._index_path(), encoding='utf-8') as handle:
+                index = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if (index.get('model'), index.get('dim'), index.get('capacity')) != (self.model_name, self.dim, self.capacity):
+            logger.info("Discarding embedding cache in %s built for another model or size", self.directory)
+            return None
+        return index
+    
+    def _write_index(self):
+        self.vectors.flush()
+        tmp_path = f"{self._index_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'model': self.model_name,
+                'dim': self.dim,
+                'capacity': self.capacity,
+                'slots': list(self.slots.items()),
+            }, handle)
+        os.replace(tmp_path, self._index_path())
+        self._index_signature = _file_signature(self._index_path())
+    
+    def get_many(self, keys: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """Cached vectors for keys (zero rows where missing) and the indices of the misses"""
+        result = np.zeros((len(keys), self.dim), dtype=np.float32)
+        missing = []
+        with self._locked(exclusive=False):
+            for i, key in enumerate(keys):
+                slot = self.slots.get(key)
+                if slot is None:
+                    missing.append(i)
+                    continue
+                self.slots.move_to_end(key)
+                result[i] = self.vectors[slot]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return result, missing
+    
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray):
+        """Store vectors for keys, persisting the vectors and index before returning"""
+        with self._locked(exclusive=True):
+            if self.directory is not None and _file_inode(self._vectors_path()) != self._vectors_inode:
+                # Replaced by a process configured for another model or size
+                self._create_vectors()
+            for key, vector in zip(keys, vectors):
+                slot = self.slots.get(key)
+                if slot is None:
+                    if len(self.slots) < self.capacity:
+                        slot = len(self.slots)
+                    else:
+                        _, slot = self.slots.popitem(last=False)
+                self.slots[key] = slot
+                self.slots.move_to_end(key)
+                self.vectors[slot] = vector
+            if self.directory is not None:
+                self._write_index()
+    
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self.slots),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hit_ratio, 4)
+        }
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime, size) of a file, which changes whenever it is replaced or rewritten"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _file_inode(path: str) -> Optional[int]:
+    signature = _file_signature(path)
+    return signature[0] if signature is not None else None
+
+
+class EmbeddingCategorizer:
+    """Nearest-centroid categorizer over sentence embeddings of category prototypes
+    
+    Each category's prototype texts (its keywords) are embedded once and averaged
+    into a unit centroid. Descriptions are embedded in batches, through the cache,
+    and take the category of the most similar centroid; below min_similarity they
+    fall back to default_category. Confidence is the cosine similarity.
+    """
+    
+    def __init__(self, encoder, prototypes: Dict[str, Sequence[str]], cache: Optional[EmbeddingCache] = None,
+                 min_similarity: float = 0.3, default_category: str = 'Other'):
+        self.encoder = encoder
+        self.cache = cache
+        self.min_similarity = min_similarity
+        self.default_category = default_category
+        
+        self.labels = [label for label, texts in prototypes.items() if texts]
+        centroids = []
+        for label in self.labels:
+            centroid = self.encoder.encode([text.lower() for text in prototypes[label]]).mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+        self.centroids = np.vstack(centroids).astype(np.float32)
+    
+    def embed(self, descriptions: Sequence[str]) -> np.ndarray:
+        """Unit vectors for descriptions; each distinct normalized key is encoded at most once"""
+        keys = [normalize_description(description) for description in descriptions]
+        unique_keys = list(dict.fromkeys(keys))
+        
+        if self.cache is None:
+            unique_vectors = self.encoder.encode(unique_keys)
+        else:
+            unique_vectors, missing = self.cache.get_many(unique_keys)
+            count('embedding_cache_hits', len(unique_keys) - len(missing))
+            count('embedding_cache_misses', len(missing))
+            if missing:
+                missing_keys = [unique_keys[i] for i in missing]
+                encoded = self.encoder.encode(missing_keys)
+                unique_vectors[missing] = encoded
+                self.cache.put_many(missing_keys, encoded)
+        
+        position = {key: i for i, key in enumerate(unique_keys)}
+        return unique_vectors[[position[key] for key in keys]]
+    
+    def classify_batch(self, descriptions: Sequence[str]) -> Tuple[List[str], List[float]]:
+        if not descriptions:
+            return [], []
+        
+        similarities = self.embed(descriptions) @ self.centroids.T
+        best = similarities.argmax(axis=1)
+        scores = similarities[np.arange(len(best)), best]
+        labels = [
+            self.labels[index] if score >= self.min_similarity else self.default_category
+            for index, score in zip(best.tolist(), scores.tolist())
+        ]
+        return labels, [round(max(score, 0.0), 4) for score in scores.tolist()]
+
+
+def build_embedding_categorizer(prototypes: Dict[str, Sequence[str]]) -> Optional[EmbeddingCategorizer]:
+    """Categorizer configured by settings, or None when CATEGORIZER_BACKEND is not 'embedding'"""
+    from django.conf import settings
+    
+    if getattr(settings, 'CATEGORIZER_BACKEND', 'tfidf') != 'embedding':
+        return None
+    
+    model_name = getattr(settings, 'EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+    if model_name == 'hashing':
+        encoder = HashingEncoder()
+    else:
+        encoder = SentenceTransformerEncoder(model_name, batch_size=getattr(settings, 'EMBEDDING_BATCH_SIZE', 64))
+    
+    cache_dir = getattr(settings, 'EMBEDDING_CACHE_DIR', None)
+    cache = EmbeddingCache(
+        str(cache_dir) if cache_dir else None,
+        dim=encoder.dim,
+        capacity=getattr(settings, 'EMBEDDING_CACHE_SIZE', 50000),
+        model_name=encoder.name
+    )
+    return EmbeddingCategorizer(
+        encoder, prototypes, cache=cache,
+        min_similarity=getattr(settings, 'EMBEDDING_MIN_SIMILARITY', 0.3)
+    )
@@ -0,0 +1,234 @@
+import logging
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from ..models import Transaction
+from .metrics import count, stage
+from .rollups import apply_rows, remove_session
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_TYPES = ('CREDIT', 'DEBIT')
+
+# Transaction.amount is DecimalField(max_digits=10, decimal_places=2)
+MAX_AMOUNT = Decimal('99999999.99')
+CENT = Decimal('0.01')
+
+# Rejected rows whose reason is logged at DEBUG, per statement
+REJECTED_LOG_SAMPLE = 5
+
+
+def validate_transaction(trans_data: Dict[str, Any]) -> Optional[str]:
+    """Return the reason a parsed row cannot be stored, or None if it is valid"""
+    if not isinstance(trans_data.get('date'), date):
+        return 'missing or invalid date'
+    
+    if not str(trans_data.get('description') or '').strip():
+        return 'missing description'
+    
+    if trans_data.get('type') not in TRANSACTION_TYPES:
+        return f"invalid type {trans_data.get('type')!r}"
+    
+    try:
+        amount = Decimal(str(trans_data.get('amount', 0))).quantize(CENT)
+    except (InvalidOperation, TypeError, ValueError):
+        return f"invalid amount {trans_data.get('amount')!r}"
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        return f"amount out of range {trans_data.get('amount')!r}"
+    
+    return None
+
+
+def ingest_transactions(session, rows: List[Dict[str, Any]], analyzer=None, anomaly_detector=None,
+                        batch_size: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """Validate parsed rows and insert the valid ones with batched bulk_create
+    
+    When an analyzer is given, valid rows are categorized before the insert so the
+    category is stored with each row; likewise a fitted anomaly detector stores an
+    anomaly score per row. Only the inserts and the matching monthly rollup update
+    run in an atomic block. Inserted rows get their primary key as 'id'.
+    Returns (accepted_rows, rejected_rows); rejected rows carry a 'reason' key and
+    are never sent to the database.
+    """
+    batch_size = batch_size or getattr(settings, 'TRANSACTION_BULK_BATCH_SIZE', 500)
+    
+    accepted = []
+    rejected = []
+    with stage('validate'):
+        for trans_data in rows:
+            reason = validate_transaction(trans_data)
+            if reason:
+                rejected.append({**trans_data, 'reason': reason})
+                continue
+            
+            trans_data['amount'] = Decimal(str(trans_data['amount'])).quantize(CENT)
+            accepted.append(trans_data)
+    count('rows_accepted', len(accepted))
+    count('rows_rejected', len(rejected))
+    
+    if analyzer is not None:
+        with stage('categorize'):
+            analyzer.categorize(accepted)
+    if anomaly_detector is not None:
+        with stage('anomaly_score'):
+            anomaly_detector.score(accepted)
+    
+    objects = [
+        Transaction(
+            session=session,
+            date=trans_data['date'],
+            description=trans_data['description'],
+            amount=trans_data['amount'],
+            transaction_type=trans_data['type'],
+            category=trans_data.get('category'),
+            confidence=trans_data.get('confidence', 0.0),
+            anomaly_score=trans_data.get('anomaly_score'),
+            is_anomaly=trans_data.get('is_anomaly', False)
+        )
+        for trans_data in accepted
+    ]
+    
+    # Monthly rollups commit (or roll back) together with the rows
+    with transaction.atomic():
+        with stage('insert'):
+            Transaction.objects.bulk_create(objects, batch_size=batch_size)
+        with stage('rollup'):
+            apply_rows(session.account, accepted)
+    
+    for trans_data, obj in zip(accepted, objects):
+        trans_data['id'] = obj.pk
+    
+    return accepted, rejected
+
+
+def ingest_stream(session, rows: Iterable[Dict[str, Any]], analyzer=None, anomaly_detector=None,
+                  chunk_size: Optional[int] = None) -> Tuple[int, int]:
+    """Ingest rows from an iterator (e.g. PDFParser.iter_transactions) chunk by chunk
+    
+    Each chunk of chunk_size rows is pulled from the iterator (running the parser),
+    validated and categorized outside any transaction, then inserted with its
+    rollup update in a short atomic block of its own, so the database is never
+    locked while a PDF is being parsed. Rows are not kept once their chunk is
+    stored; read them back with iter_session_rows(). If a chunk fails, the chunks
+    already committed are removed again before the error propagates.
+    Returns (accepted_count, rejected_count).
+    """
+    chunk_size = chunk_size or getattr(settings, 'TRANSACTION_BULK_BATCH_SIZE', 500)
+    rows = iter(rows)
+    
+    accepted = 0
+    rejected = 0
+    rejected_sample = []
+    try:
+        while True:
+            # Pulling a chunk runs the parser (and page extraction) behind the iterator
+            with stage('parse'):
+                chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            chunk_accepted, chunk_rejected = ingest_transactions(session, chunk, analyzer=analyzer,
+                                                                 anomaly_detector=anomaly_detector,
+                                                                 batch_size=chunk_size)
+            accepted += len(chunk_accepted)
+            rejected += len(chunk_rejected)
+            rejected_sample.extend(chunk_rejected[:REJECTED_LOG_SAMPLE - len(rejected_sample)])
+    except Exception:
+        if accepted:
+            discard_session_rows(session)
+        raise
+    
+    # One summary line per statement; reasons of a few rejected rows at DEBUG
+    if rejected:
+        logger.warning("Rejected %d of %d parsed transactions for session %s",
+                       rejected, accepted + rejected, session.session_id)
+        for row in rejected_sample:
+            logger.debug("Rejected row %r: %s", row.get('description'), row['reason'])
+    logger.info("Ingested %d transactions for session %s", accepted, session.session_id)
+    return accepted, rejected
+
+
+def discard_session_rows(session) -> int:
+    """Remove a session's stored transactions and their share of the account's rollups
+    
+    Returns the number of transactions removed.
+    """
+    with transaction.atomic():
+        remove_session(session)
+        deleted, _ = Transaction.objects.filter(session=session).delete()
+    if deleted:
+        logger.info("Discarded %d stored transactions of session %s", deleted, session.session_id)
+    return deleted
+
+
+def iter_session_rows(session, chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """A session's stored transactions as row dicts, read in primary key order chunk by chunk
+    
+    Rows carry their stored category, and their anomaly flags when they were
+    scored against a baseline, so analyze_transactions() reuses both.
+    """
+    chunk_size = chunk_size or getattr(settings, 'TRANSACTION_BULK_BATCH_SIZE', 500)
+    last_id = 0
+    while True:
+        chunk = list(
+            Transaction.objects.filter(session=session, pk__gt=last_id)
+            .order_by('pk')
+            .values('id', 'date', 'description', 'amount', 'transaction_type', 'category', 'confidence',
+                    'anomaly_score', 'is_anomaly')[:chunk_size]
+        )
+        if not chunk:
+            return
+        last_id = chunk[-1]['id']
+        for trans in chunk:
+            row = {
+                'id': trans['id'],
+                'date': trans['date'],
+                'description': trans['description'],
+                'amount': trans['amount'],
+                'type': trans['transaction_type'],
+                'category': trans['category'],
+                'confidence': trans['confidence'],
+            }
+            if trans['anomaly_score'] is not None:
+                row['anomaly_score'] = trans['anomaly_score']
+                row['is_anomaly'] = trans['is_anomaly']
+            yield row
+
+
+def session_frame(session, categories: Sequence[str] = (), chunk_size: Optional[int] = None):
+    """A session's stored transactions as one frame (see services/frame.py)
+    
+    Rows are read chunk by chunk in primary key order as value tuples and appended
+    straight to the frame's columns, so no row dicts are built. Like
+    iter_session_rows(), rows keep their stored category and anomaly flags.
+    Amounts are read as floats: converting them to Decimal costs more than the
+    rest of the query, and the frame holds them as float-derived minor units anyway.
+    """
+    # pandas is imported on first use, not when the URLconf loads
+    from .frame import frame_from_columns
+    
+    chunk_size = chunk_size or getattr(settings, 'TRANSACTION_BULK_BATCH_SIZE', 500)
+    columns = [[] for _ in range(7)]
+    last_id = 0
+    while True:
+        chunk = list(
+            Transaction.objects.filter(session=session, pk__gt=last_id)
+            .order_by('pk')
+            .annotate(amount_value=Cast('amount', FloatField()))
+            .values_list('id', 'amount_value', 'transaction_type', 'date', 'description', 'category',
+                         'anomaly_score', 'is_anomaly')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        for column, values in zip(columns, list(zip(*chunk))[1:]):
+            column.extend(values)
+    amounts, types, dates, descriptions, category_values, anomaly_scores, anomaly_flags = columns
+    return frame_from_columns(amounts, types, dates, descriptions, category_values,
+                              anomaly_scores, anomaly_flags, categories)
@@ -0,0 +1,88 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .batch import process_statement_batch
+from .pipeline import process_statement
+
+logger = logging.getLogger(__name__)
+
+
+def _run_job(process: Callable, session_id: str, *args):
+    """Worker entry point; each job gets fresh database connections"""
+    close_old_connections()
+    try:
+        return process(session_id, *args)
+    except Exception:
+        # process_statement has already marked the session as FAILED
+        logger.exception("Background job for session %s failed", session_id)
+        return None
+    finally:
+        close_old_connections()
+
+
+class StatementQueue:
+    """In-process pool of background workers that process uploaded statements
+    
+    Pending work is also recorded in the database (AnalysisSession.status), so jobs
+    lost on a restart can be resumed with `manage.py process_pending_statements`.
+    """
+    
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='statement-worker')
+    
+    def submit(self, session_id: str, relative_path: str) -> Future:
+        return self._executor.submit(_run_job, process_statement, session_id, relative_path)
+    
+    def submit_batch(self, session_id: str) -> Future:
+        """Queue a multi-statement upload; its files are listed on the session"""
+        return self._executor.submit(_run_job, process_statement_batch, session_id)
+    
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_statement_queue: Optional[StatementQueue] = None
+_statement_queue_lock = threading.Lock()
+
+
+def get_statement_queue() -> StatementQueue:
+    """Return the worker pool for this process, creating it on first use"""
+    global _statement_queue
+    
+    with _statement_queue_lock:
+        if _statement_queue is None:
+            _statement_queue = StatementQueue(statement_workers())
+    return _statement_queue
+
+
+def statement_workers() -> int:
+    """Background worker count (STATEMENT_WORKERS); by default 1 on SQLite and 2 elsewhere
+    
+    SQLite runs one write transaction at a time, so a second worker mostly waits
+    for the first one's inserts.
+    """
+    workers = getattr(settings, 'STATEMENT_WORKERS', None)
+    if workers is None:
+        workers = 1 if connection.vendor == 'sqlite' else 2
+    return workers
+
+
+def processing_is_async() -> bool:
+    """Whether uploads are handed to background workers (STATEMENT_PROCESSING_MODE)"""
+    return getattr(settings, 'STATEMENT_PROCESSING_MODE', 'async') != 'sync'
+
+
+def enqueue_statement(session_id: str, relative_path: str) -> Future:
+    """Hand a statement to the background workers"""
+    return get_statement_queue().submit(session_id, relative_path)
+
+
+def enqueue_statement_batch(session_id: str) -> Future:
+    """Hand a multi-statement upload to the background workers"""
+    return get_statement_queue().submit_batch(session_id)
@@ -0,0 +1,200 @@
+import os
+import json
+import hashlib
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - pure-Python automaton is used instead
+    ahocorasick = None
+
+# Keyword lists shipped with the app; override with settings.KEYWORD_DATA_DIR
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+CATEGORY_KEYWORDS_FILE = 'category_keywords.json'
+TRANSACTION_TYPE_KEYWORDS_FILE = 'transaction_type_keywords.json'
+
+
+class KeywordMatcher:
+    """Aho-Corasick multi-pattern matcher over prioritized keyword groups
+    
+    Groups are (label, keywords) pairs in priority order. A description is scanned
+    once, case-insensitively, and every keyword occurring anywhere in it is a hit,
+    exactly like `keyword in description.lower()`. When a keyword belongs to several
+    groups it counts for the first one. Uses the pyahocorasick C extension when it
+    is installed and an equivalent pure-Python automaton otherwise.
+    """
+    
+    def __init__(self, groups: Sequence[Tuple[str, Iterable[str]]]):
+        self.labels = [label for label, _ in groups]
+        
+        # keyword -> index of the first group declaring it
+        self.priorities: Dict[str, int] = {}
+        for index, (_, keywords) in enumerate(groups):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and keyword not in self.priorities:
+                    self.priorities[keyword] = index
+        
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, priority in self.priorities.items():
+                self._automaton.add_word(keyword, (priority, keyword))
+            if self.priorities:
+                self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build_python_automaton()
+    
+    def _build_python_automaton(self):
+        """Build goto/fail tables; each state knows its keywords and best priority"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[str]] = [[]]
+        
+        for keyword in self.priorities:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append(keyword)
+        
+        # Breadth-first pass for failure links, merging outputs along them
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        
+        self._best = [
+            min((self.priorities[keyword] for keyword in outputs), default=None)
+            for outputs in self._outputs
+        ]
+    
+    def _iter_python(self, text: str):
+        """Yield the state reached after each character of text"""
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            yield state
+    
+    def find_all(self, text: str) -> List[str]:
+        """All distinct keywords occurring in text, in order of first occurrence"""
+        text = text.lower()
+        found = {}
+        if self._automaton is not None:
+            if self.priorities:
+                for _, (_, keyword) in self._automaton.iter(text):
+                    found.setdefault(keyword, None)
+        else:
+            for state in self._iter_python(text):
+                for keyword in self._outputs[state]:
+                    found.setdefault(keyword, None)
+        return list(found)
+    
+    def first_label(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Label of the highest-priority group with a keyword in text, else default"""
+        text = text.lower()
+        best = None
+        if self._automaton is not None:
+            if self.priorities:
+                for _, (priority, _) in self._automaton.iter(text):
+                    if best is None or priority < best:
+                        best = priority
+                        if best == 0:
+                            break
+        else:
+            state_best = self._best
+            for state in self._iter_python(text):
+                priority = state_best[state]
+                if priority is not None and (best is None or priority < best):
+                    best = priority
+                    if best == 0:
+                        break
+        return self.labels[best] if best is not None else default
+
+
+def keyword_data_dir() -> str:
+    """Directory holding the keyword JSON files"""
+    from django.conf import settings
+    
+    if settings.configured:
+        return str(getattr(settings, 'KEYWORD_DATA_DIR', None) or DEFAULT_DATA_DIR)
+    return DEFAULT_DATA_DIR
+
+
+def load_keyword_groups(path: str) -> Dict[str, List[str]]:
+    """Load an ordered {label: [keywords]} mapping from a JSON data file"""
+    with open(path, encoding='utf-8') as handle:
+        groups = json.load(handle)
+    if not isinstance(groups, dict) or not all(isinstance(v, list) for v in groups.values()):
+        raise ValueError(f"{path} must map each label to a list of keywords")
+    return groups
+
+
+@lru_cache(maxsize=None)
+def load_category_keywords() -> Dict[str, List[str]]:
+    """Category keywords in declaration (priority) order"""
+    return load_keyword_groups(os.path.join(keyword_data_dir(), CATEGORY_KEYWORDS_FILE))
+
+
+@lru_cache(maxsize=None)
+def load_transaction_type_keywords() -> Dict[str, List[str]]:
+    """CREDIT and DEBIT keywords; CREDIT is listed first and wins ties"""
+    return load_keyword_groups(os.path.join(keyword_data_dir(), TRANSACTION_TYPE_KEYWORDS_FILE))
+
+
+@lru_cache(maxsize=None)
+def get_category_matcher() -> KeywordMatcher:
+    """Shared matcher for keyword-based category fallback"""
+    return KeywordMatcher(list(load_category_keywords().items()))
+
+
+@lru_cache(maxsize=None)
+def get_transaction_type_matcher() -> KeywordMatcher:
+    """Shared matcher for credit/debit typing"""
+    return KeywordMatcher(list(load_transaction_type_keywords().items()))
+
+
+@lru_cache(maxsize=None)
+def get_transaction_type_memo():
+    """(key function, memo) for per-merchant credit/debit typing, or None
+    
+    Only the pure-Python automaton is slow enough for a per-row memo lookup to pay
+    off; with pyahocorasick the scan itself is cheaper than computing the key. The
+    memo is in-process only, as typing runs once per parsed row.
+    """
+    if ahocorasick is not None:
+        return None
+    from .merchants import get_memo, key_function
+    
+    keywords = load_transaction_type_keywords()
+    return key_function(keywords), get_memo('type', keywords_digest(keywords)[:12], shared=False)
+
+
+def keywords_digest(groups: Dict[str, List[str]]) -> str:
+    """Stable fingerprint of a keyword mapping, used to detect stale model artifacts"""
+    return hashlib.sha256(json.dumps(groups, sort_keys=False).encode('utf-8')).hexdigest()
+
+
+def reset_keyword_cache():
+    """Reload keyword data files and rebuild matchers on next use"""
+    for cached in (load_category_keywords, load_transaction_type_keywords,
+                   get_category_matcher, get_transaction_type_matcher, get_transaction_type_memo):
+        cached.cache_clear()
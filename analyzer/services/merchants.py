@@ -0,0 +1,191 @@
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Reference ids, STAN numbers, card digits, dates and amounts are the parts of a
+# description that change between occurrences of the same merchant. Digit runs
+# (with the separators between them) of at least MIN_DIGITS digits collapse to '#',
+# so "ref 99887766" and "ref 12345" share a key, while letters, punctuation and
+# short numbers inside names ("p2p", "k2") stay for the keywords to match.
+MIN_DIGITS = 3
+DIGIT_RUN_RE = re.compile(r'\d+(?:[\s/.,:-]*\d+)*')
+LONG_DIGIT_RUN_RE = re.compile(r'\d(?:[\s/.,:-]*\d){%d,}' % (MIN_DIGITS - 1))
+SEPARATOR_CHARS = frozenset(' \t\n\r\f\v/.,:-')
+
+
+def merchant_key(description: str) -> str:
+    """Canonical merchant form of a description, e.g. 'pos purchase foodpanda stan (#)'"""
+    return LONG_DIGIT_RUN_RE.sub('#', description.lower())
+
+
+def _survives_key(keyword: str) -> bool:
+    """Whether keyword occurs in merchant_key(text) exactly when it occurs in text
+    
+    Short digit runs are kept as long as the keyword pins both ends of them to
+    characters that cannot extend the run (as in 'p2p').
+    """
+    if '#' in keyword:
+        return False
+    for match in DIGIT_RUN_RE.finditer(keyword):
+        start, end = match.span()
+        if sum(char.isdigit() for char in match.group()) >= MIN_DIGITS:
+            return False
+        if start == 0 or end == len(keyword):
+            return False
+        if keyword[start - 1] in SEPARATOR_CHARS or keyword[end] in SEPARATOR_CHARS:
+            return False
+    return True
+
+
+def key_function(keyword_groups: Dict[str, List[str]]) -> Callable[[str], str]:
+    """merchant_key, unless a keyword could be changed by it
+    
+    Keyword scans over the key then give exactly the result they give over the
+    description, which is what makes memoizing them per key safe.
+    """
+    for keywords in keyword_groups.values():
+        for keyword in keywords:
+            if not _survives_key(keyword.lower()):
+                logger.info("Keyword %r would not survive merchant keys; memoizing per description", keyword)
+                return lambda description: description
+    return merchant_key
+
+
+class MerchantMemo:
+    """Bounded LRU memo of per-merchant results, shared by all requests of a process
+    
+    With a Django cache alias, entries missing locally are looked up there, and new
+    ones written there, in one round trip per batch; that tier survives restarts
+    and is shared between workers when the backend is (e.g. Redis or Memcached).
+    """
+    
+    def __init__(self, namespace: str, max_entries: int = 20000, cache_alias: Optional[str] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.cache_alias = cache_alias
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _shared_cache(self):
+        if not self.cache_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.cache_alias]
+    
+    def _cache_key(self, key: str) -> str:
+        # Backends such as Memcached reject spaces and long keys
+        return f'merchant:{self.namespace}:{hashlib.sha1(key.encode("utf-8")).hexdigest()}'
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Local-only lookup for per-row callers"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._store(key, value)
+    
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Values of the keys found locally or in the shared cache"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        
+        shared = self._shared_cache()
+        if shared is not None and missing:
+            cache_keys = {self._cache_key(key): key for key in missing}
+            remote = shared.get_many(list(cache_keys))
+            with self._lock:
+                for cache_key, value in remote.items():
+                    key = cache_keys[cache_key]
+                    found[key] = value
+                    self._store(key, value)
+        
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+    
+    def set_many(self, values: Dict[str, Any]):
+        with self._lock:
+            for key, value in values.items():
+                self._store(key, value)
+        shared = self._shared_cache()
+        if shared is not None and values:
+            shared.set_many({self._cache_key(key): value for key, value in values.items()})
+    
+    def _store(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hit_ratio, 4)
+        }
+
+
+_memos: Dict[str, MerchantMemo] = {}
+_memos_lock = threading.Lock()
+
+
+def get_memo(kind: str, namespace: str, shared: bool = True) -> MerchantMemo:
+    """Process-wide memo for one kind of result ('category', 'type')
+    
+    namespace identifies what produced the values (model version, keyword digest);
+    a new namespace replaces the memo so stale results are never served. shared=False
+    keeps the memo in-process, for per-row lookups that cannot afford a round trip.
+    """
+    from django.conf import settings
+    
+    with _memos_lock:
+        memo = _memos.get(kind)
+        if memo is None or memo.namespace != namespace:
+            configured = settings.configured
+            memo = MerchantMemo(
+                namespace,
+                max_entries=getattr(settings, 'MERCHANT_MEMO_SIZE', 20000) if configured else 20000,
+                cache_alias=getattr(settings, 'MERCHANT_MEMO_CACHE_ALIAS', None) if configured and shared else None
+            )
+            _memos[kind] = memo
+    return memo
+
+
+def memo_stats() -> Dict[str, Dict[str, Any]]:
+    with _memos_lock:
+        return {kind: memo.stats() for kind, memo in _memos.items()}
+
+
+def reset_memos():
+    with _memos_lock:
+        _memos.clear()
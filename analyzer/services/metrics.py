@@ -0,0 +1,253 @@
+import os
+import sys
+import time
+import random
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class PipelineMetrics:
+    """Stage timings (seconds) and counters of one unit of work, e.g. one upload
+    
+    Stages may nest: 'parse' includes the 'extract' time spent pulling page text,
+    and 'load_models' includes 'train_models' on a cold start.
+    """
+    
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.profile: Optional[str] = None
+    
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+    
+    def add_time(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+    
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+_current: ContextVar[Optional[PipelineMetrics]] = ContextVar('pipeline_metrics', default=None)
+
+
+@contextmanager
+def collect(metrics: Optional[PipelineMetrics] = None):
+    """Make metrics the target of stage() and count() calls in this context"""
+    metrics = metrics or PipelineMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the collecting PipelineMetrics; a no-op outside collect()"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.stage(name):
+        yield
+
+
+def count(name: str, value: int = 1):
+    """Add to a counter of the collecting PipelineMetrics, if any"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.observations = 0
+    
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.observations += 1
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of recorded PipelineMetrics, rendered for Prometheus
+    
+    Each worker process keeps its own registry; Prometheus scrapes (or sums) them.
+    """
+    
+    def __init__(self):
+        self.stage_seconds: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.sessions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, metrics: PipelineMetrics, status: Optional[str] = None):
+        with self._lock:
+            for name, seconds in metrics.stages.items():
+                histogram = self.stage_seconds.get(name)
+                if histogram is None:
+                    histogram = self.stage_seconds[name] = Histogram(STAGE_BUCKETS)
+                histogram.observe(seconds)
+            for name, value in metrics.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            if status:
+                self.sessions[status] = self.sessions.get(status, 0) + 1
+    
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP spendwise_stage_seconds Time spent in each statement pipeline stage',
+                '# TYPE spendwise_stage_seconds histogram',
+            ]
+            for name, histogram in sorted(self.stage_seconds.items()):
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'spendwise_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {bucket_count}')
+                lines.append(f'spendwise_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.observations}')
+                lines.append(f'spendwise_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+                lines.append(f'spendwise_stage_seconds_count{{stage="{name}"}} {histogram.observations}')
+            
+            lines += [
+                '# HELP spendwise_pipeline_events_total Pages, lines, rows and cache lookups seen by the pipeline',
+                '# TYPE spendwise_pipeline_events_total counter',
+            ]
+            lines += [
+                f'spendwise_pipeline_events_total{{event="{name}"}} {value}'
+                for name, value in sorted(self.counters.items())
+            ]
+            
+            lines += [
+                '# HELP spendwise_sessions_processed_total Statement sessions processed, by final status',
+                '# TYPE spendwise_sessions_processed_total counter',
+            ]
+            lines += [
+                f'spendwise_sessions_processed_total{{status="{name}"}} {value}'
+                for name, value in sorted(self.sessions.items())
+            ]
+        
+        lines += _cache_lines()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def record_session(session, metrics: PipelineMetrics, status: Optional[str] = None):
+    """Add metrics to the session's stored metrics and to the process histograms
+    
+    Never raises: losing the numbers of one upload must not fail the upload.
+    """
+    REGISTRY.observe(metrics, status)
+    
+    try:
+        session.refresh_from_db(fields=['metrics'])
+        stored = session.metrics or {}
+        stages = stored.setdefault('stages', {})
+        for name, seconds in metrics.stages.items():
+            stages[name] = round(stages.get(name, 0.0) + seconds, 6)
+        counters = stored.setdefault('counters', {})
+        for name, value in metrics.counters.items():
+            counters[name] = counters.get(name, 0) + value
+        if metrics.profile:
+            stored['profile'] = metrics.profile
+        session.metrics = stored
+        session.save(update_fields=['metrics'])
+    except Exception as e:
+        logger.warning("Could not store metrics of session %s: %s", session.session_id, e)
+
+
+def _cache_lines() -> List[str]:
+    """Dedup, merchant memo and embedding cache counters as Prometheus gauges"""
+    from .dedup import dedup_stats
+    from .merchants import memo_stats
+    
+    lines = [
+        '# HELP spendwise_cache_hits Cache hits since start (dedup: since the cache was cleared)',
+        '# TYPE spendwise_cache_hits gauge',
+    ]
+    misses = []
+    sizes = []
+    
+    dedup = dedup_stats()
+    lines.append(f'spendwise_cache_hits{{cache="dedup"}} {dedup["hits"]}')
+    misses.append(f'spendwise_cache_misses{{cache="dedup"}} {dedup["misses"]}')
+    
+    caches = {f'merchant_{kind}': stats for kind, stats in memo_stats().items()}
+    # Only report the embedding cache when the analyzer is already loaded; a scrape
+    # should never pull in the ML stack
+    ml_analyzer = sys.modules.get('analyzer.services.ml_analyzer')
+    analyzer = getattr(ml_analyzer, '_shared_analyzer', None)
+    categorizer = getattr(analyzer, 'embedding_categorizer', None)
+    if categorizer is not None and categorizer.cache is not None:
+        caches['embedding'] = categorizer.cache.stats()
+    
+    for name, stats in sorted(caches.items()):
+        lines.append(f'spendwise_cache_hits{{cache="{name}"}} {stats["hits"]}')
+        misses.append(f'spendwise_cache_misses{{cache="{name}"}} {stats["misses"]}')
+        sizes.append(f'spendwise_cache_entries{{cache="{name}"}} {stats["entries"]}')
+    
+    lines += ['# HELP spendwise_cache_misses Cache misses since start', '# TYPE spendwise_cache_misses gauge']
+    lines += misses
+    lines += ['# HELP spendwise_cache_entries Entries held by in-process caches', '# TYPE spendwise_cache_entries gauge']
+    lines += sizes
+    return lines
+
+
+@contextmanager
+def maybe_profile(metrics: PipelineMetrics, name: str):
+    """Run the block under cProfile for a PIPELINE_PROFILE_SAMPLE_RATE share of calls
+    
+    The stats are written to PIPELINE_PROFILE_DIR/<name>.prof and the path is kept
+    in metrics.profile. Only the calling thread is profiled.
+    """
+    rate = getattr(settings, 'PIPELINE_PROFILE_SAMPLE_RATE', 0.0)
+    if rate <= 0 or random.random() >= rate:
+        yield
+        return
+    
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is active in this process (only one may run at a time)
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        directory = str(getattr(settings, 'PIPELINE_PROFILE_DIR', None) or os.path.join(settings.BASE_DIR, 'profiles'))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'{name}.prof')
+            profiler.dump_stats(path)
+            metrics.profile = path
+            logger.info("Wrote pipeline profile %s", path)
+        except OSError as e:
+            logger.warning("Could not write pipeline profile for %s: %s", name, e)
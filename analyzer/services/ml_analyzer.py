@@ -1,8 +1,9 @@
 import re
+import os
 import logging
-import decimal
-from decimal import Decimal
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import IsolationForest
@@ -10,15 +11,31 @@ from sklearn.preprocessing import StandardScaler
 import numpy as np
 import pandas as pd
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from .anomaly import ANOMALY_REASON
+from .frame import build_frame, major_units
+from .keywords import get_category_matcher, keywords_digest, load_category_keywords
+from .merchants import get_memo, key_function, memo_stats
+from .metrics import count, stage
+from .stats import TransactionStats
+
 logger = logging.getLogger(__name__)
 
+# Bump whenever the training corpus format or model parameters change so stale
+# artifacts on disk are ignored and retrained (keyword list edits are detected
+# through the keywords digest stored in the artifact)
+MODEL_VERSION = 1
+
+# Descriptions that belong to no spending category
+OTHER_SAMPLES = [
+    "ATM withdrawal", "Bank transfer", "Deposit", "Interest payment",
+    "Service charge", "Fee", "Unknown transaction"
+]
+
 
 class MLAnalyzer:
     """Machine Learning analyzer for transaction categorization and anomaly detection"""
     
-    def __init__(self):
+    def __init__(self, train: bool = True):
         self.categories = [
             'Food & Dining',
             'Transportation',
@@ -29,51 +46,58 @@ class MLAnalyzer:
             'Other'
         ]
         
-        # Keywords for each category
-        self.category_keywords = {
-            'Food & Dining': [
-                'restaurant', 'cafe', 'food', 'dining', 'meal', 'lunch', 'dinner',
-                'breakfast', 'pizza', 'burger', 'coffee', 'starbucks', 'mcdonalds',
-                'kfc', 'subway', 'dominos', 'foodpanda', 'uber eats', 'zomato',
-                'bistro', 'porcelain', 'third culture'
-            ],
-            'Transportation': [
-                'uber', 'lyft', 'taxi', 'cab', 'transport', 'fuel', 'gas',
-                'petrol', 'diesel', 'parking', 'metro', 'bus', 'train', 'airline',
-                'flight', 'car', 'vehicle', 'maintenance', 'repair', 'atm cash'
-            ],
-            'Shopping': [
-                'amazon', 'walmart', 'target', 'shop', 'store', 'mall', 'retail',
-                'clothing', 'shoes', 'electronics', 'apparel', 'fashion', 'online',
-                'ecommerce', 'purchase', 'buy', 'order', 'pos', 'slack', 'upwork',
-                'fiverr', 'instaprint', 'inka', 'paysa', 'maria.b.design', 'royal tag'
-            ],
-            'Bills & Utilities': [
-                'electricity', 'water', 'gas', 'internet', 'phone', 'mobile',
-                'utility', 'bill', 'payment', 'service', 'subscription', 'netflix',
-                'spotify', 'youtube', 'premium', 'membership', 'charges taxes',
-                'bank charges', 'fed', 'telenor', 'batch transfer', 'salary transfer'
-            ],
-            'Entertainment': [
-                'movie', 'cinema', 'theater', 'concert', 'show', 'game', 'gaming',
-                'netflix', 'spotify', 'youtube', 'disney', 'hulu', 'amazon prime',
-                'entertainment', 'leisure', 'recreation'
-            ],
-            'Healthcare': [
-                'hospital', 'clinic', 'doctor', 'pharmacy', 'medicine', 'medical',
-                'health', 'dental', 'vision', 'insurance', 'treatment', 'therapy',
-                'prescription', 'drug', 'medicine'
-            ]
-        }
+        # Keywords for each category, in priority order (analyzer/data/category_keywords.json)
+        self.category_keywords = dict(load_category_keywords())
         
         # Initialize models
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
         self.classifier = LogisticRegression(random_state=42, max_iter=1000)
-        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
-        self.scaler = StandardScaler()
         
-        # Train the models with sample data
-        self._train_models()
+        # Optional sentence-embedding categorizer (CATEGORIZER_BACKEND = 'embedding'),
+        # attached by get_analyzer(); the TF-IDF model remains the fallback
+        self.embedding_categorizer = None
+        
+        # Merchant-key function and memo namespace of classify_batch, built on first use
+        self._key_function = None
+        self._keywords_digest = None
+        
+        # Train the models with sample data (skipped when loading an artifact)
+        if train:
+            with stage('train_models'):
+                self._train_models()
+    
+    def save(self, path: str):
+        """Serialize the trained categorization models to a versioned artifact"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Write to a temporary file first so concurrent loaders never see a partial artifact
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump({
+            'version': MODEL_VERSION,
+            'keywords_digest': keywords_digest(self.category_keywords),
+            'vectorizer': self.vectorizer,
+            'classifier': self.classifier,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info("Saved ML model artifact v%s to %s", MODEL_VERSION, path)
+    
+    @classmethod
+    def load(cls, path: str) -> 'MLAnalyzer':
+        """Load a pre-trained analyzer from an artifact written by save()"""
+        artifact = joblib.load(path)
+        if artifact.get('version') != MODEL_VERSION:
+            raise ValueError(
+                f"Model artifact version {artifact.get('version')} does not match {MODEL_VERSION}"
+            )
+        
+        analyzer = cls(train=False)
+        if artifact.get('keywords_digest') != keywords_digest(analyzer.category_keywords):
+            raise ValueError("Model artifact was trained on a different category keyword list")
+        analyzer.vectorizer = artifact['vectorizer']
+        analyzer.classifier = artifact['classifier']
+        return analyzer
     
     def _train_models(self):
         """Train the ML models with sample data"""
@@ -88,11 +112,7 @@ class MLAnalyzer:
                 sample_categories.append(category)
         
         # Add some "Other" category samples
-        other_samples = [
-            "ATM withdrawal", "Bank transfer", "Deposit", "Interest payment",
-            "Service charge", "Fee", "Unknown transaction"
-        ]
-        for sample in other_samples:
+        for sample in OTHER_SAMPLES:
             sample_descriptions.append(sample)
             sample_categories.append('Other')
         
@@ -102,159 +122,193 @@ class MLAnalyzer:
             self.classifier.fit(X, sample_categories)
     
     def analyze_transactions(self, transactions) -> Dict[str, Any]:
-        """Analyze transactions and return insights"""
-        logger.info(f"Analyzing {len(transactions)} transactions")
-        
-        if not transactions:
+        """Analyze transactions and return insights
+        
+        transactions may be a frame from services/frame.py (e.g. ingest.session_frame()),
+        a list or any iterable of row dicts. The rows are converted once into a
+        columnar frame; categorization, totals, breakdowns and anomaly flags are
+        vectorized operations on that frame.
+        """
+        if isinstance(transactions, pd.DataFrame):
+            frame = transactions
+        else:
+            # Convert to list if it's a QuerySet
+            if hasattr(transactions, 'values'):
+                transactions = transactions.values()
+            frame = build_frame(list(transactions), self.categories)
+        if not len(frame):
             return self._empty_analysis()
         
-        # Convert to list if it's a QuerySet
-        if hasattr(transactions, 'values'):
-            transactions = list(transactions.values())
-        
-        # Calculate basic statistics with error handling
-        total_income = 0.0
-        total_expenses = 0.0
-        
-        for t in transactions:
-            try:
-                amount = float(t['amount']) if t['amount'] is not None else 0.0
-                if t['type'] == 'CREDIT':
-                    total_income += amount
-                elif t['type'] == 'DEBIT':
-                    total_expenses += amount
-            except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                logger.warning(f"Error converting amount for transaction {t.get('description', 'Unknown')}: {e}")
-                continue
-        
-        net_amount = total_income - total_expenses
-        
-        logger.info(f"Total income: {total_income}, expenses: {total_expenses}, net: {net_amount}")
-        
-        # Categorize transactions
-        categorized_transactions = self._categorize_transactions(transactions)
+        # Rows categorized at ingest are not classified again
+        frame = self.categorize_frame(frame)
+        stats = TransactionStats.from_frame(frame, self.categories)
         
-        # Detect anomalies
-        anomalies = self._detect_anomalies(transactions)
-        logger.info(f"Found {len(anomalies)} anomalies")
+        # Rows scored against the account baseline report their stored flags; the
+        # rest fall back to a forest fitted on all of them
+        scored = frame['scored'].to_numpy()
+        anomalies = self._anomaly_entries(frame[scored & frame['is_anomaly'].to_numpy()], ANOMALY_REASON)
+        if not scored.all():
+            with stage('isolation_forest'):
+                anomalies.extend(self._detect_anomalies(frame[~scored]))
         
-        # Generate insights
-        insights = self._generate_insights(transactions, total_income, total_expenses)
+        logger.info("Analyzed %d transactions (CREDIT: %d, DEBIT: %d), income: %s, expenses: %s, anomalies: %d",
+                    stats.count, stats.credit_count, stats.debit_count, stats.total_income, stats.total_expenses,
+                    len(anomalies))
         
-        result = {
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'net_amount': net_amount,
-            'category_breakdown': categorized_transactions,
+        return {
+            'total_income': stats.total_income,
+            'total_expenses': stats.total_expenses,
+            'net_amount': stats.net_amount,
+            'category_breakdown': stats.category_totals,
             'anomalies': anomalies,
-            'insights': insights
+            'insights': self._generate_insights(stats)
         }
-        
-        return result
     
-    def _categorize_transactions(self, transactions: List[Dict]) -> Dict[str, float]:
-        """Categorize transactions and return breakdown"""
-        category_totals = {cat: 0.0 for cat in self.categories}
+    def categorize_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Fill the category of uncategorized debits in a frame with one classify_batch call"""
+        pending = ((frame['type'] == 'DEBIT') & frame['category'].isna()).to_numpy()
+        if pending.any():
+            labels, _ = self.classify_batch(frame['description'].to_numpy()[pending].tolist())
+            new_levels = [label for label in dict.fromkeys(labels) if label not in frame['category'].cat.categories]
+            if new_levels:
+                frame['category'] = frame['category'].cat.add_categories(new_levels)
+            frame.loc[pending, 'category'] = labels
+        return frame
+    
+    def categorize(self, transactions: List[Dict]) -> List[Dict]:
+        """Set 'category' and 'confidence' on every debit that does not have a category yet"""
+        pending = [t for t in transactions if t['type'] == 'DEBIT' and not t.get('category')]
+        labels, confidences = self.classify_batch([t['description'] for t in pending])
         
-        credit_count = 0
-        debit_count = 0
+        for transaction, label, confidence in zip(pending, labels, confidences):
+            transaction['category'] = label
+            transaction['confidence'] = confidence
         
-        for transaction in transactions:
-            logger.info(f"Processing transaction: {transaction['description'][:50]}... Type: {transaction['type']}, Amount: {transaction['amount']}")
-            
-            if transaction['type'] == 'DEBIT':  # Only categorize expenses
-                debit_count += 1
-                description = transaction['description'].lower()
-                
-                # Use ML classifier
-                category = self._classify_transaction(description)
-                try:
-                    amount = float(transaction['amount']) if transaction['amount'] is not None else 0.0
-                    category_totals[category] += amount
-                    logger.info(f"Categorized as {category}: {amount}")
-                except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                    logger.warning(f"Error converting amount for categorization: {e}")
-                    continue
-            elif transaction['type'] == 'CREDIT':
-                credit_count += 1
-        
-        logger.info(f"Total CREDIT transactions: {credit_count}, DEBIT transactions: {debit_count}")
-        return category_totals
+        return transactions
     
-    def _classify_transaction(self, description: str) -> str:
-        """Classify a transaction using ML"""
+    def classify_batch(self, descriptions: List[str]) -> Tuple[List[str], List[float]]:
+        """Classify many descriptions with one vectorize and one predict call
+        
+        Descriptions are reduced to merchant keys (see services/merchants.py) and each
+        distinct key is predicted once; results are memoized per key across batches.
+        Returns the predicted category and its probability for each description.
+        """
+        if not descriptions:
+            return [], []
+        
+        keys = [self._merchant_key(description) for description in descriptions]
+        unique_keys = list(dict.fromkeys(keys))
+        memo = get_memo('category', self._memo_namespace())
+        results = memo.get_many(unique_keys)
+        
+        missing = [key for key in unique_keys if key not in results]
+        count('merchant_memo_hits', len(results))
+        count('merchant_memo_misses', len(missing))
+        if missing:
+            predicted = self._predict(missing)
+            if predicted is not None:
+                new_results = dict(zip(missing, zip(*predicted)))
+                memo.set_many(new_results)
+                results.update(new_results)
+            else:
+                # Keyword fallback results are not memoized so the model is retried next batch
+                results.update((key, (self._keyword_classify(key.lower()), 0.0)) for key in missing)
+        
+        labels = [results[key][0] for key in keys]
+        confidences = [results[key][1] for key in keys]
+        return labels, confidences
+    
+    def _predict(self, texts: List[str]) -> Optional[Tuple[List[str], List[float]]]:
+        """Model predictions for texts, or None when no model could classify them"""
+        if self.embedding_categorizer is not None:
+            try:
+                return self.embedding_categorizer.classify_batch(texts)
+            except Exception as e:
+                logger.warning("Embedding categorizer failed, using TF-IDF model: %s", e)
+        
+        lowered = [text.lower() for text in texts]
         try:
-            # Vectorize the description
-            X = self.vectorizer.transform([description])
-            
-            # Predict category
-            prediction = self.classifier.predict(X)[0]
-            return prediction
+            X = self.vectorizer.transform(lowered)
+            probabilities = self.classifier.predict_proba(X)
+            best = probabilities.argmax(axis=1)
+            labels = self.classifier.classes_[best].tolist()
+            confidences = probabilities[np.arange(len(best)), best].tolist()
+            return labels, confidences
         except Exception as e:
             # Fallback to keyword matching
-            return self._keyword_classify(description)
+            logger.warning("Batch classification failed, using keyword fallback: %s", e)
+            return None
+    
+    def _merchant_key(self, description: str) -> str:
+        if self._key_function is None:
+            self._key_function = key_function(self.category_keywords)
+        return self._key_function(description)
+    
+    def _memo_namespace(self) -> str:
+        """Identifies the model behind memoized categories; changes whenever predictions may"""
+        if self._keywords_digest is None:
+            self._keywords_digest = keywords_digest(self.category_keywords)[:12]
+        backend = self.embedding_categorizer.encoder.name if self.embedding_categorizer is not None else 'tfidf'
+        return f'v{MODEL_VERSION}:{self._keywords_digest}:{backend}'
+    
+    def _classify_transaction(self, description: str) -> str:
+        """Classify a single transaction using ML"""
+        labels, _ = self.classify_batch([description])
+        return labels[0]
     
     def _keyword_classify(self, description: str) -> str:
         """Fallback classification using keywords"""
-        description_lower = description.lower()
-        
-        for category, keywords in self.category_keywords.items():
-            for keyword in keywords:
-                if keyword.lower() in description_lower:
-                    return category
-        
-        return 'Other'
+        return get_category_matcher().first_label(description, 'Other')
     
-    def _detect_anomalies(self, transactions: List[Dict]) -> List[Dict]:
-        """Detect anomalous transactions"""
-        if len(transactions) < 3:
+    def _detect_anomalies(self, frame: pd.DataFrame) -> List[Dict]:
+        """Detect anomalous amounts among rows without a baseline score
+        
+        Fits a forest on this batch alone; rows already scored against an account
+        baseline (see services/anomaly.py) are reported from their stored flags
+        by analyze_transactions.
+        """
+        if len(frame) < 3:
             return []
         
-        # Prepare features for anomaly detection with error handling
-        amounts = []
-        for t in transactions:
-            try:
-                amount = float(t['amount']) if t['amount'] is not None else 0.0
-                amounts.append(amount)
-            except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                logger.warning(f"Error converting amount for anomaly detection: {e}")
-                amounts.append(0.0)  # Use 0 as fallback
-        
-        amounts_2d = np.array(amounts).reshape(-1, 1)
+        amounts_2d = major_units(frame['amount'].to_numpy()).reshape(-1, 1)
         
-        # Scale the amounts
-        amounts_scaled = self.scaler.fit_transform(amounts_2d)
+        # Scale the amounts (fresh estimators per call so a shared analyzer stays thread-safe)
+        scaler = StandardScaler()
+        amounts_scaled = scaler.fit_transform(amounts_2d)
         
         # Detect anomalies
-        anomaly_labels = self.anomaly_detector.fit_predict(amounts_scaled)
-        
-        # Return anomalous transactions
-        anomalies = []
-        for i, (transaction, is_anomaly) in enumerate(zip(transactions, anomaly_labels)):
-            if is_anomaly == -1:  # -1 indicates anomaly
-                try:
-                    amount = float(transaction['amount']) if transaction['amount'] is not None else 0.0
-                    anomaly_data = {
-                        'date': transaction['date'].isoformat() if hasattr(transaction['date'], 'isoformat') else str(transaction['date']),
-                        'description': transaction['description'],
-                        'amount': amount,
-                        'type': transaction['type'],
-                        'reason': 'Unusual amount compared to other transactions'
-                    }
-                    anomalies.append(anomaly_data)
-                except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                    logger.warning(f"Error converting amount for anomaly: {e}")
-                    continue
-        
-        return anomalies
+        anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+        anomaly_labels = anomaly_detector.fit_predict(amounts_scaled)
+        
+        # Return anomalous transactions (-1 indicates anomaly)
+        return self._anomaly_entries(frame[anomaly_labels == -1], 'Unusual amount compared to other transactions')
+    
+    def _anomaly_entries(self, frame: pd.DataFrame, reason: str) -> List[Dict[str, Any]]:
+        """JSON-ready descriptions of the (few) anomalous rows of a frame"""
+        dates = frame['date'].dt.strftime('%Y-%m-%d').tolist()
+        scores = frame['anomaly_score'].tolist()
+        return [
+            {
+                'date': entry_date if isinstance(entry_date, str) else None,
+                'description': description,
+                'amount': amount,
+                'type': transaction_type,
+                'score': score if score == score else None,  # NaN means unscored
+                'reason': reason
+            }
+            for entry_date, description, amount, transaction_type, score in zip(
+                dates, frame['description'].tolist(), major_units(frame['amount'].to_numpy()).tolist(),
+                frame['type'].astype(object).tolist(), scores
+            )
+        ]
     
-    def _generate_insights(self, transactions: List[Dict], total_income: float, total_expenses: float) -> Dict[str, Any]:
-        """Generate insights from transaction data"""
+    def _generate_insights(self, stats: TransactionStats) -> Dict[str, Any]:
+        """Generate insights from the accumulated statement statistics"""
         insights = {}
         
         # Spending vs Income ratio
-        if total_income > 0:
-            spending_ratio = (total_expenses / total_income) * 100
+        if stats.total_income > 0:
+            spending_ratio = (stats.total_expenses / stats.total_income) * 100
             insights['spending_ratio'] = round(spending_ratio, 2)
             
             if spending_ratio > 90:
@@ -265,30 +319,16 @@ class MLAnalyzer:
                 insights['spending_warning'] = "Good spending control!"
         
         # Most common spending category
-        if transactions:
-            debit_transactions = [t for t in transactions if t['type'] == 'DEBIT']
-            if debit_transactions:
-                categories = [self._classify_transaction(t['description'].lower()) for t in debit_transactions]
-                if categories:
-                    most_common = max(set(categories), key=categories.count)
-                    insights['top_category'] = most_common
+        top_category = stats.top_category()
+        if top_category:
+            insights['top_category'] = top_category
         
         # Transaction frequency
-        insights['total_transactions'] = len(transactions)
-        
-        # Calculate average transaction amount with error handling
-        total_amount = 0.0
-        valid_transactions = 0
-        for t in transactions:
-            try:
-                amount = float(t['amount']) if t['amount'] is not None else 0.0
-                total_amount += amount
-                valid_transactions += 1
-            except (ValueError, TypeError, decimal.InvalidOperation) as e:
-                logger.warning(f"Error converting amount for average calculation: {e}")
-                continue
+        insights['total_transactions'] = stats.count
         
-        insights['avg_transaction_amount'] = round(total_amount / valid_transactions, 2) if valid_transactions > 0 else 0.0
+        # Average and spread of transaction amounts
+        insights['avg_transaction_amount'] = round(stats.mean, 2) if stats.valid_count else 0.0
+        insights['amount_std_dev'] = round(stats.std_dev, 2)
         
         return insights
     
@@ -301,4 +341,81 @@ class MLAnalyzer:
             'category_breakdown': {cat: 0.0 for cat in self.categories},
             'anomalies': [],
             'insights': {}
-        } 
\ No newline at end of file
+        } 
+
+
+# Process-wide analyzer shared by all requests handled by this worker
+_shared_analyzer: Optional[MLAnalyzer] = None
+_shared_analyzer_lock = threading.Lock()
+
+
+def get_model_path() -> str:
+    """Location of the model artifact for the current MODEL_VERSION"""
+    from django.conf import settings
+    
+    model_dir = getattr(settings, 'ML_MODEL_DIR', os.path.join(settings.BASE_DIR, 'artifacts'))
+    return os.path.join(str(model_dir), f'category_model_v{MODEL_VERSION}.joblib')
+
+
+def build_model_artifact(path: Optional[str] = None) -> MLAnalyzer:
+    """Train a fresh analyzer and persist it, replacing any existing artifact"""
+    path = path or get_model_path()
+    analyzer = MLAnalyzer()
+    analyzer.save(path)
+    return analyzer
+
+
+def get_analyzer() -> MLAnalyzer:
+    """Return the shared analyzer, loading (or training) it once per process"""
+    global _shared_analyzer
+    
+    if _shared_analyzer is not None:
+        return _shared_analyzer
+    
+    with _shared_analyzer_lock:
+        if _shared_analyzer is None:
+            path = get_model_path()
+            try:
+                analyzer = MLAnalyzer.load(path)
+                logger.info("Loaded ML model artifact from %s", path)
+            except FileNotFoundError:
+                logger.info("No ML model artifact at %s, training a new one", path)
+                analyzer = build_model_artifact(path)
+            except Exception as e:
+                logger.warning("Could not load ML model artifact %s (%s), retraining", path, e)
+                analyzer = build_model_artifact(path)
+            analyzer.embedding_categorizer = _build_embedding_categorizer(analyzer)
+            # Published only once complete: readers skip the lock when it is set
+            _shared_analyzer = analyzer
+    
+    return _shared_analyzer
+
+
+def _build_embedding_categorizer(analyzer: MLAnalyzer):
+    from .embeddings import build_embedding_categorizer
+    
+    try:
+        return build_embedding_categorizer({**analyzer.category_keywords, 'Other': OTHER_SAMPLES})
+    except Exception as e:
+        logger.warning("Embedding categorizer unavailable (%s), using the TF-IDF model", e)
+        return None
+
+
+def get_categorizer_stats() -> Dict[str, Any]:
+    """Active categorizer, embedding cache and merchant memo counters of this process"""
+    analyzer = _shared_analyzer
+    categorizer = analyzer.embedding_categorizer if analyzer is not None else None
+    return {
+        'backend': 'embedding' if categorizer is not None else 'tfidf',
+        'loaded': analyzer is not None,
+        'embedding_cache': categorizer.cache.stats() if categorizer is not None and categorizer.cache else None,
+        'merchant_memo': memo_stats()
+    }
+
+
+def reset_analyzer():
+    """Drop the shared analyzer so the next call reloads it from disk"""
+    global _shared_analyzer
+    
+    with _shared_analyzer_lock:
+        _shared_analyzer = None
@@ -1,25 +1,143 @@
+import io
+import os
 import re
+import logging
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 import pdfplumber
-from datetime import datetime, date
+from datetime import date
 from decimal import Decimal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+from .keywords import get_transaction_type_matcher, get_transaction_type_memo
+from .metrics import count, stage
+
+logger = logging.getLogger(__name__)
+
+# Precompiled patterns for Meezan Bank format. DATE_PATTERNS keeps the original
+# priority order; DATE_RE combines them into one alternation for the line scan.
+DATE_PATTERNS = [
+    re.compile(r'(?P<weekday>(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2})'),  # Wed Jun 26
+    re.compile(r'(?P<dmy_slash>\d{2}/\d{2}/\d{4})'),  # DD/MM/YYYY
+    re.compile(r'(?P<dmy_dash>\d{2}-\d{2}-\d{4})'),  # DD-MM-YYYY
+    re.compile(r'(?P<iso>\d{4}-\d{2}-\d{2})'),  # YYYY-MM-DD
+]
+DATE_RE = re.compile('|'.join(pattern.pattern for pattern in DATE_PATTERNS))
+DATE_PRIORITY = {name: rank for rank, pattern in enumerate(DATE_PATTERNS) for name in pattern.groupindex}
+
+AMOUNT_RE = re.compile(r'[\d,]+\.\d{2}')  # 1,234.56 or 1234.56
+WHITESPACE_RE = re.compile(r'\s+')
+STAN_RE = re.compile(r'STAN\(\d+\)')
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on; extraction never starts more worker processes"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) in a worker process"""
+    with pdfplumber.open(file_path) as pdf:
+        return [pdf.pages[index].extract_text() or '' for index in range(start, stop)]
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only seekable stream over a bytes-like buffer (memoryview, mmap, bytes)
+    
+    The buffer itself is never copied; only the slices pdfminer reads are.
+    """
+    
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readinto(self, target) -> int:
+        count = max(0, min(len(target), len(self._view) - self._position))
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f'negative seek position {offset}')
+        self._position = offset
+        return offset
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def close(self):
+        # Release the export so the owner (e.g. an mmap) can be closed
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+# Anything PDFParser can read a statement from: a path, a binary file-like object
+# (e.g. a Django UploadedFile), or a buffer such as a memoryview or mmap
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap, io.IOBase]
+
+
+@contextmanager
+def open_pdf(source: PDFSource):
+    """Open any PDFSource with pdfplumber; buffers are wrapped, not copied"""
+    if not isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        with pdfplumber.open(source) as pdf:
+            yield pdf
+        return
+    
+    reader = BufferReader(source)
+    try:
+        with pdfplumber.open(reader) as pdf:
+            yield pdf
+    finally:
+        reader.close()
+
+
+def _extract_document(file_path: str) -> List[str]:
+    """Extract the text of every page of one statement in a worker process"""
+    with pdfplumber.open(file_path) as pdf:
+        texts = []
+        for page in pdf.pages:
+            texts.append(page.extract_text() or '')
+            page.flush_cache()
+        return texts
 
 
 class PDFParser:
-    """Parser for extracting transaction data from bank statement PDFs"""
+    """Parser for extracting transaction data from bank statement PDFs
     
-    def __init__(self):
+    Statements can be read from a path, a file-like object or an in-memory buffer
+    (see PDFSource). With workers > 1, page text extraction of a file on disk is
+    spread over a process pool in chunks of chunk_size pages, using at most one
+    process per available CPU; with fewer than two CPUs, or for in-memory sources,
+    pages are extracted in this process. Each page is scanned on its own, in page
+    order, so serial and parallel modes produce identical transactions.
+    """
+    
+    def __init__(self, workers: int = 0, chunk_size: int = 16):
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        
         # Updated patterns for Meezan Bank format
-        self.date_patterns = [
-            r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}',  # Wed Jun 26
-            r'\d{2}/\d{2}/\d{4}',  # DD/MM/YYYY
-            r'\d{2}-\d{2}-\d{4}',  # DD-MM-YYYY
-            r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
-        ]
-        self.amount_patterns = [
-            r'[\d,]+\.\d{2}',  # 1,234.56
-            r'[\d,]+\.\d{2}',  # 1234.56
-        ]
+        self.date_patterns = DATE_PATTERNS
+        self.amount_patterns = [AMOUNT_RE]
         
         # Month mapping for conversion
         self.month_map = {
@@ -27,180 +145,241 @@ class PDFParser:
             'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
         }
     
-    def parse_pdf(self, file_path: str) -> List[Dict[str, Any]]:
+    def parse_pdf(self, source: PDFSource) -> List[Dict[str, Any]]:
         """Extract transactions from PDF file"""
-        transactions = []
-        
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        page_transactions = self._extract_transactions_from_text(text)
-                        transactions.extend(page_transactions)
-            
-            return transactions
+            return list(self.iter_transactions(source))
         except Exception as e:
-            print(f"Error parsing PDF: {e}")
+            logger.warning("Error parsing PDF: %s", e)
             return []
     
+    def iter_transactions(self, source: PDFSource) -> Iterator[Dict[str, Any]]:
+        """Yield transactions page by page, in statement order
+        
+        Each page is scanned on its own, so the header and footer lines of a page
+        never end up in the description of the previous page's last transaction.
+        Only the current page is held in memory.
+        """
+        yield from self._scan_pages(self._iter_page_texts(source))
+    
+    def parse_statements(self, file_paths: Sequence[str],
+                         workers: int = 0) -> List[Tuple[Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+        """Parse several statements, extracting their text concurrently
+        
+        With workers > 1 each file's text is extracted in its own process; lines are
+        scanned here in file order. Returns a (transactions, error) pair per file in
+        input order, so a file that cannot be parsed never affects the others.
+        """
+        workers = min(workers, available_cpus())
+        if workers <= 1 or len(file_paths) <= 1:
+            results = []
+            for file_path in file_paths:
+                try:
+                    results.append((list(self.iter_transactions(file_path)), None))
+                except Exception as e:
+                    results.append((None, e))
+            return results
+        
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(file_paths)), mp_context=context) as executor:
+            futures = [executor.submit(_extract_document, file_path) for file_path in file_paths]
+            results = []
+            for file_path, future in zip(file_paths, futures):
+                try:
+                    try:
+                        page_texts = future.result()
+                    except BrokenProcessPool:
+                        # A worker died (e.g. a crash inside the PDF library) and took the
+                        # pool's other tasks with it; retry this file in a process of its own
+                        with ProcessPoolExecutor(max_workers=1, mp_context=context) as isolated:
+                            page_texts = isolated.submit(_extract_document, file_path).result()
+                    results.append((list(self._scan_pages(page_texts)), None))
+                except Exception as e:
+                    results.append((None, e))
+            return results
+    
+    def _scan_pages(self, page_texts: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Transactions of each page in turn; a block never runs past the end of its page"""
+        for page_text in page_texts:
+            count('pages')
+            if page_text:
+                lines = page_text.split('\n')
+                count('lines', len(lines))
+                yield from self._scan_lines(lines)
+    
+    def _iter_page_texts(self, source: PDFSource) -> Iterator[str]:
+        """Yield the text of every page, in page order"""
+        on_disk = isinstance(source, (str, os.PathLike))
+        # A pool on a single CPU only adds process start-up and IPC to the same work
+        workers = min(self.workers, available_cpus())
+        with open_pdf(source) as pdf:
+            page_count = len(pdf.pages)
+            if not on_disk or workers <= 1 or page_count <= self.chunk_size:
+                for page in pdf.pages:
+                    with stage('extract'):
+                        text = page.extract_text() or ''
+                        # Drop the page's parsed layout objects once its text is out
+                        page.flush_cache()
+                    yield text
+                return
+        
+        chunks = [
+            (start, min(start + self.chunk_size, page_count))
+            for start in range(0, page_count, self.chunk_size)
+        ]
+        # spawn: the parser may run inside a threaded worker, where fork is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+            results = executor.map(
+                _extract_page_range,
+                [source] * len(chunks),
+                [start for start, _ in chunks],
+                [stop for _, stop in chunks],
+            )
+            while True:
+                # Time spent waiting on the workers, not their summed CPU time
+                with stage('extract'):
+                    chunk_texts = next(results, None)
+                if chunk_texts is None:
+                    break
+                yield from chunk_texts
+    
     def _extract_transactions_from_text(self, text: str) -> List[Dict[str, Any]]:
         """Extract transaction data from text content"""
-        transactions = []
-        lines = text.split('\n')
+        return list(self._scan_lines(text.split('\n')))
+    
+    def _scan_lines(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Single linear sweep: classify each line once and emit one transaction per block
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Look for transaction start (date pattern)
+        A block starts at a line containing a date and runs until the next such line
+        or the end of lines (one page of text). Lines before the first date line are
+        ignored.
+        """
+        block = None
+        for raw_line in lines:
+            line = raw_line.strip()
             date_match = self._find_date_in_line(line)
-            if date_match:
-                # Try to parse this as a transaction
-                transaction = self._parse_meezan_transaction(lines, i)
-                if transaction:
-                    transactions.append(transaction)
-                    # Skip lines we've already processed
-                    i = transaction.get('next_line_index', i + 1)
-                else:
-                    i += 1
-            else:
-                i += 1
-        return transactions
+            if date_match is not None:
+                if block is not None:
+                    transaction = self._parse_meezan_transaction(*block)
+                    if transaction:
+                        yield transaction
+                block = (line, date_match, [])
+            elif block is not None:
+                block[2].append(line)
+        
+        if block is not None:
+            transaction = self._parse_meezan_transaction(*block)
+            if transaction:
+                yield transaction
     
     def _find_date_in_line(self, line: str) -> Optional[re.Match]:
-        """Find date pattern in a line"""
-        for pattern in self.date_patterns:
-            match = re.search(pattern, line)
-            if match:
-                return match
-        return None
-    
-    def _parse_meezan_transaction(self, lines: List[str], start_index: int) -> Optional[Dict[str, Any]]:
-        """Parse Meezan Bank transaction format with 5 columns"""
-        if start_index >= len(lines):
-            return None
-        
-        # Get the first line (should contain date)
-        first_line = lines[start_index].strip()
+        """Find date pattern in a line, preferring patterns in DATE_PATTERNS order"""
+        match = DATE_RE.search(line)
+        if match is None or match.lastgroup == 'weekday':
+            return match
         
-        # Extract date
-        date_match = self._find_date_in_line(first_line)
-        if not date_match:
-            return None
+        # The alternation returns the leftmost date; a higher-priority format later in
+        # the line still wins, as it did when patterns were tried one by one
+        for pattern in DATE_PATTERNS[:DATE_PRIORITY[match.lastgroup]]:
+            preferred = pattern.search(line, match.start() + 1)
+            if preferred is not None:
+                return preferred
+        return match
+    
+    def _parse_meezan_transaction(self, first_line: str, date_match: re.Match,
+                                  body_lines: List[str]) -> Optional[Dict[str, Any]]:
+        """Parse Meezan Bank transaction format with 5 columns
         
+        first_line is the stripped line holding the date, body_lines the stripped
+        lines that follow it up to the next date line.
+        """
         date_str = date_match.group()
-        transaction_date = self._parse_meezan_date(date_str)
+        transaction_date = self._parse_meezan_date(date_str, date_match.lastgroup)
         if not transaction_date:
             return None
         
         # Extract description and amount from the transaction block
         description_lines = []
-        debit_amount = None
-        credit_amount = None
         temp_amount = None
-        transaction_type = 'DEBIT'  # Default
         
         # Look for amount in the first line
-        amount_matches = re.findall(r'([\d,]+\.\d{2})', first_line)
+        amount_matches = AMOUNT_RE.findall(first_line)
         if amount_matches:
             # Take the last amount found (usually the transaction amount, not balance)
-            amount_str = amount_matches[-1].replace(',', '')
-            temp_amount = Decimal(amount_str)
+            temp_amount = Decimal(amount_matches[-1].replace(',', ''))
             
             # Remove date and all amounts from first line for description
-            desc_part = first_line
-            for match in amount_matches:
-                desc_part = desc_part.replace(match, '')
-            desc_part = desc_part.replace(date_str, '').strip()
+            desc_part = AMOUNT_RE.sub('', first_line).replace(date_str, '').strip()
             if desc_part:
                 description_lines.append(desc_part)
         
         # Look for description in subsequent lines
-        i = start_index + 1
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Stop if we hit another date (next transaction)
-            if self._find_date_in_line(line):
-                break
-            
+        for line in body_lines:
             # Look for amount in this line
-            amount_matches = re.findall(r'([\d,]+\.\d{2})', line)
+            amount_matches = AMOUNT_RE.findall(line)
             if amount_matches and temp_amount is None:
                 # Take the last amount found (usually the transaction amount, not balance)
-                amount_str = amount_matches[-1].replace(',', '')
-                temp_amount = Decimal(amount_str)
+                temp_amount = Decimal(amount_matches[-1].replace(',', ''))
                 
                 # Remove all amounts from line for description
-                desc_part = line
-                for match in amount_matches:
-                    desc_part = desc_part.replace(match, '')
-                desc_part = desc_part.strip()
+                desc_part = AMOUNT_RE.sub('', line).strip()
                 if desc_part:
                     description_lines.append(desc_part)
             elif line and not amount_matches:
                 # This line is part of description
                 description_lines.append(line)
-            
-            i += 1
         
-        # Combine description lines
-        description = ' '.join(description_lines).strip()
-        
-        # Clean up description
-        description = re.sub(r'\s+', ' ', description)
-        description = re.sub(r'STAN\(\d+\)', '', description)  # Remove STAN numbers
-        description = description.strip()
+        # Combine and clean up description
+        description = WHITESPACE_RE.sub(' ', ' '.join(description_lines).strip())
+        description = STAN_RE.sub('', description).strip()  # Remove STAN numbers
         
         if not description:
             description = "Unknown Transaction"
         
-        # Determine transaction type based on description keywords and amounts
-        description_lower = description.lower()
-        
-        # Keywords that indicate CREDIT (money coming in)
-        credit_keywords = [
-            'received', 'remittance', 'salary', 'batch transfer', 'inward rtgs',
-            'home remittance', 'money received', 'credit', 'money received from',
-            'remittance from', 'transfer from', 'raast p2p fund transfer from'
-        ]
-        
-        # Keywords that indicate DEBIT (money going out)
-        debit_keywords = [
-            'transferred', 'charges', 'pos', 'purchase', 'atm cash', 'withdrawal',
-            'money transferred', 'debit', 'taxes', 'fed', 'bank charges', 'bill paid',
-            'raast p2p fund transfer to', 'chg:', 'visa card', 'replacement fee',
-            'er ', 'payment gateway', 'payfast', 'gopb', 'telenor', 'zong', 'easy card',
-            'monthly', 'prepaid', 'from ib', 'rev ', 'fbrtax:', 'stan (', 'transfer to'
-        ]
-        
-        # Check for credit keywords first
-        if any(keyword in description_lower for keyword in credit_keywords):
-            transaction_type = 'CREDIT'
-        # Then check for debit keywords
-        elif any(keyword in description_lower for keyword in debit_keywords):
-            transaction_type = 'DEBIT'
-        # If no keywords match, default to DEBIT for safety
-        else:
-            transaction_type = 'DEBIT'
-        
-        # Use the temp_amount if available, otherwise 0
-        amount = temp_amount if 'temp_amount' in locals() else 0
+        transaction_type = self._classify_type(description)
         
         return {
             'date': transaction_date,
             'description': description,
-            'amount': abs(amount) if amount else 0,
-            'type': transaction_type,
-            'next_line_index': i
+            'amount': abs(temp_amount) if temp_amount else 0,
+            'type': transaction_type
         }
     
-    def _parse_meezan_date(self, date_str: str) -> Optional[date]:
-        """Parse Meezan Bank date format (e.g., 'Wed Jun 26')"""
+    def _classify_type(self, description: str) -> str:
+        """Determine transaction type based on description keywords
+        
+        Credit keywords take priority over debit keywords; if no keywords match,
+        default to DEBIT for safety. Without pyahocorasick, results are memoized per
+        merchant key.
+        """
+        type_memo = get_transaction_type_memo()
+        if type_memo is None:
+            return get_transaction_type_matcher().first_label(description, 'DEBIT')
+        
+        key_function, memo = type_memo
+        key = key_function(description)
+        transaction_type = memo.get(key)
+        if transaction_type is None:
+            transaction_type = get_transaction_type_matcher().first_label(key, 'DEBIT')
+            memo.set(key, transaction_type)
+        return transaction_type
+    
+    def _parse_meezan_date(self, date_str: str, kind: Optional[str] = None) -> Optional[date]:
+        """Parse Meezan Bank date format (e.g., 'Wed Jun 26')
+        
+        kind is the DATE_PATTERNS group that matched date_str; it is looked up when
+        not given. The fixed-width numeric formats are sliced instead of strptime'd.
+        """
+        if kind is None:
+            match = DATE_RE.fullmatch(date_str)
+            if match is None:
+                return None
+            kind = match.lastgroup
+        
         try:
             # Handle "Wed Jun 26" format
-            if re.match(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}', date_str):
+            if kind == 'weekday':
                 parts = date_str.split()
                 day = int(parts[2])
                 month = self.month_map[parts[1]]
@@ -208,35 +387,27 @@ class PDFParser:
                 return date(year, month, day)
             
             # Handle other date formats
-            for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d']:
-                try:
-                    return datetime.strptime(date_str, fmt).date()
-                except ValueError:
-                    continue
-        except:
+            if kind == 'iso':  # YYYY-MM-DD
+                return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+            if kind in ('dmy_slash', 'dmy_dash'):  # DD/MM/YYYY, DD-MM-YYYY
+                return date(int(date_str[6:10]), int(date_str[3:5]), int(date_str[0:2]))
+        except (ValueError, KeyError, IndexError):
             pass
         return None
     
     def _extract_date(self, line: str) -> Optional[date]:
         """Extract date from line"""
-        for pattern in self.date_patterns:
-            match = re.search(pattern, line)
-            if match:
-                date_str = match.group()
-                return self._parse_meezan_date(date_str)
+        match = self._find_date_in_line(line)
+        if match:
+            return self._parse_meezan_date(match.group(), match.lastgroup)
         return None
     
     def _extract_amount(self, line: str) -> Optional[Decimal]:
         """Extract amount from line"""
-        for pattern in self.amount_patterns:
-            matches = re.findall(pattern, line)
-            if matches:
-                # Take the last amount found (usually the transaction amount)
-                amount_str = matches[-1].replace(',', '')
-                try:
-                    return Decimal(amount_str)
-                except:
-                    continue
+        matches = AMOUNT_RE.findall(line)
+        if matches:
+            # Take the last amount found (usually the transaction amount)
+            return Decimal(matches[-1].replace(',', ''))
         return None
     
     def _extract_description(self, line: str, date: date, amount: Decimal) -> str:
@@ -245,15 +416,13 @@ class PDFParser:
         line_clean = line
         
         # Remove date
-        for pattern in self.date_patterns:
-            line_clean = re.sub(pattern, '', line_clean)
+        line_clean = DATE_RE.sub('', line_clean)
         
         # Remove amount
-        for pattern in self.amount_patterns:
-            line_clean = re.sub(pattern, '', line_clean)
+        line_clean = AMOUNT_RE.sub('', line_clean)
         
         # Clean up extra spaces and special characters
-        description = re.sub(r'\s+', ' ', line_clean).strip()
+        description = WHITESPACE_RE.sub(' ', line_clean).strip()
         description = re.sub(r'[^\w\s\-\.]', '', description)
         
         return description if description else "Unknown Transaction" 
\ No newline at end of file
@@ -0,0 +1,197 @@
+import decimal
+import logging
+from typing import Dict, Any, Tuple, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import AnalysisSession, AnalysisResult
+from .ingest import discard_session_rows, ingest_stream, session_frame
+from .metrics import PipelineMetrics, collect, maybe_profile, record_session, stage
+from .recurring import recurring_insights, refresh_account
+from .response_cache import invalidate_session
+
+logger = logging.getLogger(__name__)
+
+
+class StatementProcessingError(Exception):
+    """Raised when an uploaded statement cannot be turned into an analysis"""
+
+
+def statement_path(session_id: str) -> str:
+    """Storage path used for the uploaded PDF of a session"""
+    return f'statements/{session_id}.pdf'
+
+
+def keep_uploads() -> bool:
+    """Whether uploaded PDFs stay in storage after processing (STATEMENT_KEEP_UPLOADS)"""
+    return getattr(settings, 'STATEMENT_KEEP_UPLOADS', False)
+
+
+def upload_source(uploaded_file):
+    """What PDFParser should read an upload from, without copying it
+    
+    Large uploads that Django spooled to a temporary file are read by path; small
+    in-memory uploads through a view of their buffer.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path()
+    stream = getattr(uploaded_file, 'file', uploaded_file)
+    if hasattr(stream, 'getbuffer'):
+        return stream.getbuffer()
+    uploaded_file.seek(0)
+    return uploaded_file
+
+
+def convert_decimals(obj):
+    """Convert an analysis result to a JSON-serializable structure"""
+    if isinstance(obj, dict):
+        return {k: convert_decimals(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_decimals(item) for item in obj]
+    elif hasattr(obj, '__float__') and not isinstance(obj, (str, bool)):  # Only convert numeric types
+        try:
+            return float(obj) if obj is not None else 0.0
+        except (ValueError, TypeError, decimal.InvalidOperation):
+            return 0.0
+    else:
+        return obj
+
+
+def save_analysis_result(session: AnalysisSession, analysis_result: Dict[str, Any]):
+    """Create or replace the stored AnalysisResult of a session
+    
+    Written as an UPDATE, then an INSERT if no row was updated, rather than
+    update_or_create(): its SELECT followed by a write in one transaction is what
+    fails with "database is locked" when another worker writes to SQLite at the
+    same time.
+    """
+    fields = {
+        'total_income': analysis_result['total_income'],
+        'total_expenses': analysis_result['total_expenses'],
+        'net_amount': analysis_result['net_amount'],
+        'category_breakdown': convert_decimals(analysis_result['category_breakdown']),
+        'anomaly_transactions': convert_decimals(analysis_result['anomalies']),
+        'insights': convert_decimals(analysis_result['insights'])
+    }
+    if not AnalysisResult.objects.filter(session=session).update(**fields):
+        try:
+            with transaction.atomic():
+                AnalysisResult.objects.create(session=session, **fields)
+        except IntegrityError:
+            # Another run (e.g. reanalyze_sessions) stored one in the meantime
+            AnalysisResult.objects.filter(session=session).update(**fields)
+    
+    # Bump the content version so cached responses and ETags for the old result expire
+    previous_version = session.content_version
+    AnalysisSession.objects.filter(pk=session.pk).update(content_version=F('content_version') + 1)
+    session.refresh_from_db(fields=['content_version'])
+    invalidate_session(session.session_id, previous_version)
+
+
+def discard_failed_session(session: AnalysisSession):
+    """Undo what a failed run stored, so uploading the statement again starts afresh
+    
+    The session's transactions and their rollup contributions are removed, and the
+    account's recurring payments are detected again without them. The anomaly
+    baseline is only saved by runs that complete, so it needs no cleanup.
+    """
+    try:
+        if discard_session_rows(session):
+            refresh_account(session.account)
+    except Exception:
+        logger.exception("Could not discard the rows of failed session %s", session.session_id)
+
+
+def process_statement(session_id: str, relative_path: Optional[str] = None,
+                      source=None) -> Tuple[Dict[str, Any], int]:
+    """Parse, ingest and analyze an uploaded statement, recording progress on the session
+    
+    The PDF is read from source (see upload_source) when given, otherwise from the
+    stored file at relative_path. Returns (analysis_result, rejected_count). On
+    failure the rows stored so far are discarded, the session is marked FAILED and
+    the exception is re-raised. A stored
+    file is removed afterwards unless STATEMENT_KEEP_UPLOADS is set. Stage timings
+    and counters are stored on the session (see services/metrics.py).
+    """
+    session = AnalysisSession.objects.get(session_id=session_id)
+    metrics = PipelineMetrics()
+    
+    try:
+        with collect(metrics), maybe_profile(metrics, session_id):
+            result = _process_statement(session, relative_path, source)
+        record_session(session, metrics, AnalysisSession.STATUS_COMPLETED)
+        return result
+    except Exception as e:
+        logger.error("Processing failed for session %s: %s", session_id, e)
+        discard_failed_session(session)
+        session.update_status(AnalysisSession.STATUS_FAILED, error=str(e))
+        record_session(session, metrics, AnalysisSession.STATUS_FAILED)
+        raise
+    finally:
+        # Clean up temporary file
+        if relative_path and not keep_uploads():
+            default_storage.delete(relative_path)
+
+
+def _process_statement(session: AnalysisSession, relative_path: Optional[str],
+                       source) -> Tuple[Dict[str, Any], int]:
+    # The ML and PDF stacks are imported on first use, not when the URLconf loads
+    from .anomaly import fold_statement, load_anomaly_detector, save_baseline
+    from .ml_analyzer import get_analyzer
+    from .pdf_parser import PDFParser
+    
+    session.update_status(AnalysisSession.STATUS_PROCESSING, progress=10)
+    
+    # Parse PDF
+    parser = PDFParser(
+        workers=getattr(settings, 'PDF_PARSER_WORKERS', 0),
+        chunk_size=getattr(settings, 'PDF_PARSER_CHUNK_SIZE', 16)
+    )
+    
+    # Stream parsed rows into the database chunk by chunk: validate, categorize
+    # once with the shared pre-trained models, score against the account's anomaly
+    # baseline, and bulk insert each chunk in a short atomic block of its own
+    with stage('load_models'):
+        analyzer = get_analyzer()
+        # Only a signed-in owner's statements share a baseline; anonymous uploads all
+        # fall under one account, so they are checked against their own amounts instead
+        detector = load_anomaly_detector(session.account) if session.has_owner else None
+    if source is None:
+        source = default_storage.path(relative_path)
+    try:
+        accepted, rejected = ingest_stream(
+            session, parser.iter_transactions(source), analyzer=analyzer,
+            anomaly_detector=detector if detector is not None and detector.is_fitted else None
+        )
+    except Exception as e:
+        # Chunks committed before the failure have been removed again
+        raise StatementProcessingError(f'Could not process PDF: {e}') from e
+    if not accepted and not rejected:
+        raise StatementProcessingError('Could not extract transactions from PDF')
+    if not accepted:
+        raise StatementProcessingError('Could not extract valid transactions from PDF')
+    session.update_status(progress=70)
+    
+    # Fold the statement into the account baseline (fitting it on a cold start); the
+    # baseline is saved with the result, once nothing else can fail
+    if detector is not None:
+        with stage('anomaly_baseline'):
+            detector = fold_statement(session, detector)
+    
+    # Analyze the stored rows as one frame; their categories and anomaly flags are reused
+    with stage('analyze'):
+        analysis_result = analyzer.analyze_transactions(session_frame(session, analyzer.categories))
+    # Subscriptions and bills show up across statements, so they are detected over the
+    # whole signed-in account (an anonymous upload only over its own statement)
+    with stage('recurring'):
+        analysis_result['insights'].update(recurring_insights(session))
+    with stage('save_result'):
+        if detector is not None:
+            save_baseline(session, detector)
+        save_analysis_result(session, analysis_result)
+    
+    session.update_status(AnalysisSession.STATUS_COMPLETED, progress=100)
+    return analysis_result, rejected
@@ -0,0 +1,23 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def preload(import_only: bool = False):
+    """Import the ML and PDF stacks, and load the shared models, ahead of the first request
+    
+    The URLconf and management commands never import them at start-up; serving
+    workers call this once (see ANALYZER_PRELOAD in spendwise/wsgi.py) so the first
+    upload does not pay for it. import_only skips loading the model artifact.
+    """
+    started = time.perf_counter()
+    from .keywords import get_category_matcher, get_transaction_type_matcher
+    from .ml_analyzer import get_analyzer
+    from . import anomaly, frame, pdf_parser  # noqa: F401
+    
+    if not import_only:
+        get_analyzer()
+        get_category_matcher()
+        get_transaction_type_matcher()
+    logger.info("Preloaded analyzer in %.2fs", time.perf_counter() - started)
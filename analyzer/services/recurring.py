@@ -0,0 +1,249 @@
+import calendar
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import AnalysisSession, RecurringPayment, Transaction
+from .ingest import MAX_AMOUNT
+from .merchants import merchant_key
+
+logger = logging.getLogger(__name__)
+
+# (cadence, period in days, tolerance in days, calendar months per period; 0 steps by days)
+CADENCES = (
+    ('weekly', 7.0, 1.5, 0),
+    ('biweekly', 14.0, 2.5, 0),
+    ('monthly', 30.44, 4.0, 1),
+    ('quarterly', 91.31, 10.0, 3),
+    ('yearly', 365.25, 20.0, 12),
+)
+PERIOD_DAYS = {name: period for name, period, _, _ in CADENCES}
+MONTH_DAYS = PERIOD_DAYS['monthly']
+
+# Amounts are kept in minor units during detection (as in services/frame.py)
+MINOR_UNITS = 100
+
+# Same-day charges are added up, which can exceed what RecurringPayment's amount fields hold
+MAX_MINOR_AMOUNT = float(MAX_AMOUNT) * MINOR_UNITS
+
+# Upcoming charges listed in a session's insights
+UPCOMING_LIMIT = 5
+
+_CENT = Decimal('0.01')
+
+
+def recurring_key(description: str) -> str:
+    """Merchant a charge is grouped under: its merchant key with whitespace collapsed"""
+    return ' '.join(merchant_key(description).split())[:255]
+
+
+def _money(minor: float) -> Decimal:
+    return (Decimal(int(round(minor))) / MINOR_UNITS).quantize(_CENT)
+
+
+def _as_date(days: int) -> date:
+    return date(1970, 1, 1) + timedelta(days=int(days))
+
+
+def _step(day: date, months: int) -> date:
+    """Same day of month, months later (clamped to the month's last day)"""
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def detect_recurring(dates: Sequence, descriptions: Sequence[str], amounts: Sequence,
+                     categories: Sequence) -> List[Dict[str, Any]]:
+    """Recurring charges among the given debits, one dict of RecurringPayment fields per merchant
+    
+    Descriptions are keyed once per distinct value and grouped by merchant through a
+    hash index (pd.factorize); one sort by (merchant, date) then lets every
+    per-merchant interval and amount statistic be a bincount over the sorted
+    arrays. Apart from the sort, the cost is linear in the number of rows.
+    """
+    # numpy and pandas are imported on first use, not when the URLconf loads
+    import numpy as np
+    import pandas as pd
+    
+    from .frame import to_datetime64, to_minor_units
+    
+    count = len(descriptions)
+    min_occurrences = getattr(settings, 'RECURRING_MIN_OCCURRENCES', 3)
+    amount_tolerance = getattr(settings, 'RECURRING_AMOUNT_TOLERANCE', 0.2)
+    if count < min_occurrences:
+        return []
+    
+    description_codes, distinct = pd.factorize(pd.Series(descriptions, dtype=object))
+    key_codes, keys = pd.factorize(pd.Series([recurring_key(d) for d in distinct], dtype=object))
+    merchants = key_codes[description_codes]
+    dates64 = to_datetime64(dates)
+    days = dates64.astype(np.int64)
+    minor, valid = to_minor_units(amounts, count)
+    
+    rows = np.flatnonzero(valid & ~np.isnat(dates64))
+    rows = rows[np.lexsort((days[rows], merchants[rows]))]
+    merchants, days, minor = merchants[rows], days[rows], minor[rows]
+    
+    # One charge per merchant and day: exact repeats (overlapping statements of the
+    # account) are dropped, other same-day charges of a merchant are added up
+    repeat = np.zeros(len(rows), dtype=bool)
+    repeat[1:] = (merchants[1:] == merchants[:-1]) & (days[1:] == days[:-1]) & (minor[1:] == minor[:-1])
+    rows, merchants, days, minor = rows[~repeat], merchants[~repeat], days[~repeat], minor[~repeat]
+    if not len(rows):
+        return []
+    new_day = np.ones(len(rows), dtype=bool)
+    new_day[1:] = (merchants[1:] != merchants[:-1]) | (days[1:] != days[:-1])
+    starts = np.flatnonzero(new_day)
+    amount = np.add.reduceat(minor, starts).astype(np.float64)
+    rows = rows[np.append(starts[1:], len(rows)) - 1]
+    merchants, days = merchants[starts], days[starts]
+    
+    groups = len(keys)
+    occurrences = np.bincount(merchants, minlength=groups)
+    same = merchants[1:] == merchants[:-1]
+    gaps = np.diff(days)[same].astype(np.float64)
+    gap_owner = merchants[1:][same]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_gap = np.bincount(gap_owner, gaps, groups) / (occurrences - 1)
+        gap_std = np.sqrt(np.bincount(gap_owner, (gaps - mean_gap[gap_owner]) ** 2, groups) / (occurrences - 1))
+        mean_amount = np.bincount(merchants, amount, groups) / occurrences
+        amount_std = np.sqrt(np.bincount(merchants, (amount - mean_amount[merchants]) ** 2, groups) / occurrences)
+    
+    periods = np.array([period for _, period, _, _ in CADENCES])
+    tolerances = np.array([tolerance for _, _, tolerance, _ in CADENCES])
+    distance = np.abs(mean_gap[:, None] - periods[None, :])
+    cadence = np.argmin(np.nan_to_num(distance, nan=np.inf), axis=1)
+    tolerance = tolerances[cadence]
+    with np.errstate(invalid='ignore'):
+        recurring = (
+            (occurrences >= min_occurrences)
+            & (distance[np.arange(groups), cadence] <= tolerance)
+            & (gap_std <= tolerance)
+            & (amount_std <= amount_tolerance * mean_amount)
+            & (mean_amount <= MAX_MINOR_AMOUNT)
+        )
+    
+    # Position of each merchant's first and last charge in the sorted arrays
+    last = np.flatnonzero(np.append(merchants[1:] != merchants[:-1], True))
+    first = np.append(0, last[:-1] + 1)
+    last_position = np.zeros(groups, dtype=np.int64)
+    last_position[merchants[last]] = last
+    first_position = np.zeros(groups, dtype=np.int64)
+    first_position[merchants[first]] = first
+    as_of = _as_date(days.max())
+    
+    detected = []
+    for group in np.flatnonzero(recurring):
+        name, period, _, months = CADENCES[cadence[group]]
+        last_date = _as_date(days[last_position[group]])
+        next_date = _step(last_date, months) if months else last_date + timedelta(days=round(mean_gap[group]))
+        row = rows[last_position[group]]
+        detected.append({
+            'merchant_key': keys[group],
+            'merchant': descriptions[row],
+            'category': categories[row] or '',
+            'cadence': name,
+            'interval_days': round(float(mean_gap[group]), 2),
+            'occurrences': int(occurrences[group]),
+            'average_amount': _money(mean_amount[group]),
+            'amount_std_dev': _money(amount_std[group]),
+            'first_date': _as_date(days[first_position[group]]),
+            'last_date': last_date,
+            'next_date': next_date,
+            'next_amount': _money(mean_amount[group]),
+            'active': as_of <= next_date + timedelta(days=period),
+        })
+    return detected
+
+
+def _detect_payments(account: str, **filters) -> Tuple[List[RecurringPayment], int]:
+    """(unsaved recurring payments, debits scanned) among the stored debits matching filters"""
+    rows = list(
+        Transaction.objects.filter(transaction_type='DEBIT', **filters)
+        .order_by()
+        .values_list('date', 'description', 'amount', 'category')
+    )
+    detected = detect_recurring(*zip(*rows)) if rows else []
+    return [RecurringPayment(account=account, **fields) for fields in detected], len(rows)
+
+
+def refresh_account(account: str) -> List[RecurringPayment]:
+    """Detect an account's recurring payments from all its stored debits and persist them
+    
+    Only signed-in accounts keep recurring payments: anonymous uploads all share
+    one account, whose merchants belong to no one caller. Anything stored for such
+    an account is removed.
+    """
+    if not AnalysisSession.account_has_owner(account):
+        RecurringPayment.objects.filter(account=account).delete()
+        return []
+    
+    payments, debits = _detect_payments(account, session__account=account)
+    with transaction.atomic():
+        RecurringPayment.objects.filter(account=account).exclude(
+            merchant_key__in=[payment.merchant_key for payment in payments]
+        ).delete()
+        # Upsert, so a concurrent refresh of the same account cannot hit the unique constraint
+        RecurringPayment.objects.bulk_create(
+            payments,
+            update_conflicts=True,
+            unique_fields=['account', 'merchant_key'],
+            update_fields=[
+                'merchant', 'category', 'cadence', 'interval_days', 'occurrences', 'average_amount',
+                'amount_std_dev', 'first_date', 'last_date', 'next_date', 'next_amount', 'active', 'updated_at'
+            ]
+        )
+    logger.info("Found %d recurring payments in %d debits of %s", len(payments), debits, account)
+    return payments
+
+
+def monthly_cost(payment: RecurringPayment) -> float:
+    """What a recurring payment costs per month on average"""
+    return float(payment.average_amount) * MONTH_DAYS / PERIOD_DAYS[payment.cadence]
+
+
+def recurring_summary(payments: List[RecurringPayment]) -> Dict[str, Any]:
+    """Insights entries for the active recurring payments of an account"""
+    active = sorted((p for p in payments if p.active), key=lambda p: p.next_date)
+    return {
+        'recurring_payments': len(active),
+        'recurring_monthly_cost': round(sum((monthly_cost(p) for p in active), 0.0), 2),
+        'upcoming_charges': [
+            {
+                'merchant': payment.merchant,
+                'cadence': payment.cadence,
+                'next_date': payment.next_date.isoformat(),
+                'next_amount': float(payment.next_amount),
+            }
+            for payment in active[:UPCOMING_LIMIT]
+        ],
+    }
+
+
+def recurring_insights(session) -> Dict[str, Any]:
+    """Recurring payments summarized for a session's insights
+    
+    A signed-in account's payments are refreshed over all of its statements; an
+    anonymous session's are detected in its own statement only and not stored.
+    Detection never fails the caller: the session's rows are already stored, so on
+    an error the insights simply go without recurring entries.
+    """
+    try:
+        if session.has_owner:
+            payments = refresh_account(session.account)
+        else:
+            payments, _ = _detect_payments(session.account, session=session)
+        return recurring_summary(payments)
+    except Exception:
+        logger.exception("Recurring payment detection failed for session %s", session.session_id)
+        return {}
+
+
+def refresh_account_on_delete(sender, instance, **kwargs):
+    """post_delete receiver: the session's transactions are already gone"""
+    refresh_account(instance.account)
@@ -0,0 +1,51 @@
+import logging
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+def get_response_cache():
+    """Cache backend for serialized analysis responses (settings.ANALYSIS_CACHE_ALIAS)"""
+    return caches[getattr(settings, 'ANALYSIS_CACHE_ALIAS', 'default')]
+
+
+def body_key(session_id: str, version: int) -> str:
+    return f'analysis-body:{session_id}:{version}'
+
+
+def make_etag(session_id: str, version: int) -> str:
+    return f'"{session_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers etag"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def cache_response(session_id: str, version: int, body: bytes):
+    """Store a rendered response under the content version it was rendered for
+    
+    Callers read the version from the database in the same request; there is no
+    cached pointer to the current version that a slow reader could overwrite.
+    """
+    get_response_cache().set(body_key(session_id, version), body)
+
+
+def get_cached_response(session_id: str, version: int) -> Optional[bytes]:
+    return get_response_cache().get(body_key(session_id, version))
+
+
+def invalidate_session(session_id: str, version: int):
+    """Drop the cached body of one content version of a session"""
+    get_response_cache().delete(body_key(session_id, version))
+
+
+def invalidate_session_on_delete(sender, instance, **kwargs):
+    """post_delete receiver: frees the cached body of a deleted session"""
+    invalidate_session(instance.session_id, instance.content_version)
@@ -0,0 +1,245 @@
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from ..models import AnalysisSession, MonthlyRollup, Transaction
+
+logger = logging.getLogger(__name__)
+
+# (month, category, transaction_type)
+RollupKey = Tuple[date, str, str]
+
+
+class Aggregate:
+    """Sum, count, min and max of the amounts of one rollup group"""
+    
+    __slots__ = ('total', 'count', 'min_amount', 'max_amount')
+    
+    def __init__(self, total=Decimal('0'), count=0, min_amount=None, max_amount=None):
+        self.total = total
+        self.count = count
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+    
+    def add(self, amount: Decimal):
+        self.total += amount
+        self.count += 1
+        if self.min_amount is None or amount < self.min_amount:
+            self.min_amount = amount
+        if self.max_amount is None or amount > self.max_amount:
+            self.max_amount = amount
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Aggregate]:
+    """Group validated transaction dicts (as produced by ingest) into rollup deltas"""
+    groups: Dict[RollupKey, Aggregate] = {}
+    for row in rows:
+        key = (month_start(row['date']), row.get('category') or '', row['type'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = Aggregate()
+        group.add(row['amount'])
+    return groups
+
+
+def _lock_rows(account: str, keys: Iterable[RollupKey]) -> Dict[RollupKey, MonthlyRollup]:
+    """Rollup rows of the given groups, locked for update until the transaction ends"""
+    keys = set(keys)
+    rows = MonthlyRollup.objects.select_for_update().filter(
+        account=account, month__in={month for month, _, _ in keys}
+    )
+    return {
+        (row.month, row.category, row.transaction_type): row
+        for row in rows
+        if (row.month, row.category, row.transaction_type) in keys
+    }
+
+
+def apply_rows(account: str, rows: List[Dict[str, Any]]):
+    """Add ingested rows to the account's rollups
+    
+    Call inside the atomic block that inserts the rows, so the rollups commit or
+    roll back with them. Missing groups are created first (ignoring groups a
+    concurrent ingest just created) and then all groups are updated under a row
+    lock, so concurrent statements of one account never lose an update.
+    """
+    groups = aggregate_rows(rows)
+    if not groups:
+        return
+    
+    with transaction.atomic():
+        MonthlyRollup.objects.bulk_create(
+            [
+                MonthlyRollup(account=account, month=month, category=category, transaction_type=transaction_type)
+                for month, category, transaction_type in groups
+            ],
+            ignore_conflicts=True
+        )
+        existing = _lock_rows(account, groups)
+        for key, group in groups.items():
+            row = existing[key]
+            row.total += group.total
+            row.count += group.count
+            if row.min_amount is None or group.min_amount < row.min_amount:
+                row.min_amount = group.min_amount
+            if row.max_amount is None or group.max_amount > row.max_amount:
+                row.max_amount = group.max_amount
+        MonthlyRollup.objects.bulk_update(existing.values(), ['total', 'count', 'min_amount', 'max_amount'])
+
+
+def _grouped(transactions) -> Dict[RollupKey, Aggregate]:
+    """Rollup groups of a Transaction queryset, aggregated in the database"""
+    rows = (
+        transactions.annotate(month=TruncMonth('date'))
+        .values('month', 'category', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'), min_amount=Min('amount'), max_amount=Max('amount'))
+        .order_by()
+    )
+    groups: Dict[RollupKey, Aggregate] = {}
+    for row in rows:
+        key = (_as_date(row['month']), row['category'] or '', row['transaction_type'])
+        group = groups.get(key)
+        if group is None:
+            groups[key] = Aggregate(row['total'], row['count'], row['min_amount'], row['max_amount'])
+        else:
+            # NULL and '' categories fall into the same group
+            group.total += row['total']
+            group.count += row['count']
+            group.min_amount = min(group.min_amount, row['min_amount'])
+            group.max_amount = max(group.max_amount, row['max_amount'])
+    return groups
+
+
+def _as_date(value) -> date:
+    # TruncMonth over a DateField yields a date; guard against backends returning a datetime
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _recompute_extremes(account: str, key: RollupKey,
+                        exclude_session: AnalysisSession) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+    """Min and max of one group without the given session (they cannot be subtracted)"""
+    month, category, transaction_type = key
+    next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    rows = Transaction.objects.filter(
+        session__account=account,
+        date__gte=month,
+        date__lt=next_month,
+        transaction_type=transaction_type,
+    ).exclude(session=exclude_session)
+    rows = rows.filter(Q(category=category) if category else Q(category__isnull=True) | Q(category=''))
+    extremes = rows.aggregate(min_amount=Min('amount'), max_amount=Max('amount'))
+    return extremes['min_amount'], extremes['max_amount']
+
+
+def remove_session(session: AnalysisSession):
+    """Subtract a session's transactions from its account's rollups
+    
+    Sums and counts are decremented; min/max are recomputed, only for groups whose
+    extreme came from this session. Groups left empty are deleted.
+    """
+    groups = _grouped(Transaction.objects.filter(session=session))
+    if not groups:
+        return
+    
+    with transaction.atomic():
+        existing = _lock_rows(session.account, groups)
+        emptied = []
+        updated = []
+        for key, group in groups.items():
+            row = existing.get(key)
+            if row is None:
+                continue
+            row.total -= group.total
+            row.count -= min(group.count, row.count)
+            if row.count == 0:
+                emptied.append(row.pk)
+                continue
+            if group.min_amount == row.min_amount or group.max_amount == row.max_amount:
+                row.min_amount, row.max_amount = _recompute_extremes(session.account, key, session)
+            updated.append(row)
+        
+        MonthlyRollup.objects.filter(pk__in=emptied).delete()
+        MonthlyRollup.objects.bulk_update(updated, ['total', 'count', 'min_amount', 'max_amount'])
+    logger.info("Removed session %s from %d rollup groups of %s", session.session_id, len(groups), session.account)
+
+
+def rebuild_account(account: str) -> int:
+    """Recompute an account's rollups from its stored transactions; returns the group count"""
+    groups = _grouped(Transaction.objects.filter(session__account=account))
+    with transaction.atomic():
+        MonthlyRollup.objects.filter(account=account).delete()
+        MonthlyRollup.objects.bulk_create([
+            MonthlyRollup(
+                account=account, month=month, category=category, transaction_type=transaction_type,
+                total=group.total, count=group.count, min_amount=group.min_amount, max_amount=group.max_amount
+            )
+            for (month, category, transaction_type), group in groups.items()
+        ])
+    return len(groups)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def latest_month(account: str) -> Optional[date]:
+    row = MonthlyRollup.objects.filter(account=account).order_by('-month').values('month').first()
+    return row['month'] if row else None
+
+
+def monthly_trends(account: str, start: date, end: date, transaction_type: Optional[str] = None,
+                   category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Income, expenses and per-category figures for each month in [start, end], from rollups only
+    
+    Months without transactions are included with zero totals.
+    """
+    rollups = MonthlyRollup.objects.filter(account=account, month__gte=start, month__lte=end)
+    if transaction_type:
+        rollups = rollups.filter(transaction_type=transaction_type)
+    if category:
+        rollups = rollups.filter(category=category)
+    
+    months = {}
+    month = start
+    while month <= end:
+        months[month] = {
+            'month': month.strftime('%Y-%m'),
+            'income': Decimal('0'),
+            'expenses': Decimal('0'),
+            'transactions': 0,
+            'categories': {},
+        }
+        month = add_months(month, 1)
+    
+    for rollup in rollups.order_by('month', 'transaction_type', 'category'):
+        entry = months[rollup.month]
+        entry['income' if rollup.transaction_type == 'CREDIT' else 'expenses'] += rollup.total
+        entry['transactions'] += rollup.count
+        if rollup.transaction_type == 'DEBIT':
+            entry['categories'][rollup.category or 'Uncategorized'] = {
+                'total': float(rollup.total),
+                'count': rollup.count,
+                'min': float(rollup.min_amount) if rollup.min_amount is not None else None,
+                'max': float(rollup.max_amount) if rollup.max_amount is not None else None,
+            }
+    
+    for entry in months.values():
+        entry['net'] = float(entry['income'] - entry['expenses'])
+        entry['income'] = float(entry['income'])
+        entry['expenses'] = float(entry['expenses'])
+    return list(months.values())
+
+
+def remove_session_on_delete(sender, instance: AnalysisSession, **kwargs):
+    """pre_delete receiver: runs while the session's transactions still exist"""
+    remove_session(instance)
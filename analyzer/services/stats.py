@@ -0,0 +1,99 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .frame import MINOR_UNITS
+
+
+class TransactionStats:
+    """Aggregates of a statement
+    
+    Counts, income/expense totals, the mean and variance of amounts, and debit
+    totals and counts per category, all computed by from_frame() with vectorized
+    operations over the statement's frame.
+    """
+    
+    __slots__ = (
+        'count', 'valid_count', 'invalid_count', 'credit_count', 'debit_count',
+        'total_income', 'total_expenses', 'mean', '_m2',
+        'category_totals', 'category_counts',
+    )
+    
+    def __init__(self, categories: Sequence[str] = ()):
+        self.count = 0
+        self.valid_count = 0
+        self.invalid_count = 0
+        self.credit_count = 0
+        self.debit_count = 0
+        self.total_income = 0.0
+        self.total_expenses = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.category_totals: Dict[str, float] = {category: 0.0 for category in categories}
+        self.category_counts: Dict[str, int] = {}
+    
+    @classmethod
+    def from_frame(cls, frame, categories: Sequence[str] = ()) -> 'TransactionStats':
+        """Compute every aggregate with vectorized operations on a frame from build_frame()"""
+        stats = cls(categories)
+        if frame is None or not len(frame):
+            return stats
+        
+        amount = frame['amount'].to_numpy()
+        valid = frame['amount_valid'].to_numpy()
+        type_codes = frame['type'].cat.codes.to_numpy()
+        credit = type_codes == 0
+        debit = type_codes == 1
+        
+        stats.count = len(frame)
+        stats.valid_count = int(valid.sum())
+        stats.invalid_count = stats.count - stats.valid_count
+        stats.credit_count = int(credit.sum())
+        stats.debit_count = int(debit.sum())
+        stats.total_income = int(amount[credit & valid].sum()) / MINOR_UNITS
+        stats.total_expenses = int(amount[debit & valid].sum()) / MINOR_UNITS
+        
+        if stats.valid_count:
+            values = amount[valid] / MINOR_UNITS
+            stats.mean = float(values.mean())
+            stats._m2 = float(np.square(values - stats.mean).sum())
+        
+        # Debits without a category count as 'Other'
+        levels = list(frame['category'].cat.categories)
+        if 'Other' not in levels:
+            levels.append('Other')
+        codes = frame['category'].cat.codes.to_numpy()[debit]
+        codes = np.where(codes < 0, levels.index('Other'), codes)
+        if not len(codes):
+            return stats
+        
+        # Counts keep first-seen order so top_category() breaks ties the same way
+        seen, first_index = np.unique(codes, return_index=True)
+        counts = np.bincount(codes, minlength=len(levels))
+        debit_valid = valid[debit]
+        sums = np.bincount(codes[debit_valid], weights=amount[debit][debit_valid], minlength=len(levels))
+        has_amount = np.bincount(codes[debit_valid], minlength=len(levels)) > 0
+        for code in seen[np.argsort(first_index)].tolist():
+            stats.category_counts[levels[code]] = int(counts[code])
+            if has_amount[code]:
+                stats.category_totals[levels[code]] = float(sums[code]) / MINOR_UNITS
+        return stats
+    
+    @property
+    def net_amount(self) -> float:
+        return self.total_income - self.total_expenses
+    
+    @property
+    def variance(self) -> float:
+        """Population variance of all valid amounts"""
+        return self._m2 / self.valid_count if self.valid_count else 0.0
+    
+    @property
+    def std_dev(self) -> float:
+        return self.variance ** 0.5
+    
+    def top_category(self) -> Optional[str]:
+        """Most frequent debit category; ties go to the category seen first"""
+        if not self.category_counts:
+            return None
+        return max(self.category_counts, key=self.category_counts.get)
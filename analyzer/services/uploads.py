@@ -0,0 +1,255 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# UploadLimiter.acquire() rejection reasons
+REASON_SLOTS = 'slots'
+REASON_USER = 'user'
+REASON_BYTES = 'bytes'
+
+
+def max_file_size() -> int:
+    """Largest accepted statement PDF, in bytes (STATEMENT_MAX_FILE_SIZE)"""
+    return getattr(settings, 'STATEMENT_MAX_FILE_SIZE', 25 * MB)
+
+
+def max_request_size() -> int:
+    """Largest accepted upload request body, in bytes (STATEMENT_MAX_REQUEST_SIZE)"""
+    return getattr(settings, 'STATEMENT_MAX_REQUEST_SIZE', 100 * MB)
+
+
+def format_size(size: int) -> str:
+    return f'{size / MB:g}MB' if size >= MB else f'{size / 1024:g}KB'
+
+
+class UploadLimitHandler(FileUploadHandler):
+    """Counts each file's bytes as they stream in and skips files over the size limit
+    
+    A skipped file never reaches request.FILES and its partial temporary file is
+    closed (and so deleted) by Django; the names are kept in `oversized` for the
+    view to report.
+    """
+    
+    def __init__(self, request=None, limit: Optional[int] = None):
+        super().__init__(request)
+        self.limit = limit if limit is not None else max_file_size()
+        self.oversized: List[Tuple[str, str, int]] = []
+        self._received = 0
+    
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._received = 0
+    
+    def receive_data_chunk(self, raw_data, start):
+        self._received += len(raw_data)
+        if self._received > self.limit:
+            self.oversized.append((self.field_name, self.file_name, self._received))
+            raise SkipFile()
+        return raw_data
+    
+    def file_complete(self, file_size):
+        return None
+
+
+def oversized_files(request, field_name: str) -> List[Tuple[str, int]]:
+    """(file name, bytes received before skipping) of the files of field_name over the limit"""
+    for handler in request.upload_handlers:
+        if isinstance(handler, UploadLimitHandler):
+            return [(name, size) for field, name, size in handler.oversized if field == field_name]
+    return []
+
+
+class UploadLimiter:
+    """Admission control for upload requests: a request semaphore, per-client slots
+    and a budget of bytes being received or held in temporary files
+    
+    Requests are admitted or rejected immediately, never queued, so a burst of
+    uploads cannot tie up every worker thread. An admission lasts until the
+    statement is processed, including in a background job (see UploadTicket).
+    Limits apply per worker process.
+    """
+    
+    def __init__(self, max_concurrent: int, max_per_client: int, byte_budget: int):
+        self.max_concurrent = max_concurrent
+        self.max_per_client = max_per_client
+        self.byte_budget = byte_budget
+        self.active_bytes = 0
+        self.admitted = 0
+        self.rejected: Counter = Counter()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._clients: Counter = Counter()
+        self._lock = threading.Lock()
+    
+    def acquire(self, client: str, size: int) -> Optional[str]:
+        """Reserve a slot and size bytes for client; returns the rejection reason, if any"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected[REASON_SLOTS] += 1
+            return REASON_SLOTS
+        with self._lock:
+            reason = None
+            if self._clients[client] >= self.max_per_client:
+                reason = REASON_USER
+            elif self.active_bytes + size > self.byte_budget:
+                reason = REASON_BYTES
+            if reason is not None:
+                self.rejected[reason] += 1
+                self._slots.release()
+                return reason
+            self._clients[client] += 1
+            self.active_bytes += size
+            self.admitted += 1
+        return None
+    
+    def release(self, client: str, size: int):
+        with self._lock:
+            self._clients[client] -= 1
+            if self._clients[client] <= 0:
+                del self._clients[client]
+            self.active_bytes -= size
+        self._slots.release()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'active_uploads': sum(self._clients.values()),
+                'active_bytes': self.active_bytes,
+                'max_concurrent': self.max_concurrent,
+                'max_per_client': self.max_per_client,
+                'byte_budget': self.byte_budget,
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+            }
+
+
+class UploadTicket:
+    """An admitted request's slot and bytes in the limiter, released exactly once
+    
+    The view hands the ticket to a queued job with hold_until(); otherwise
+    limit_uploads releases it when the view returns.
+    """
+    
+    def __init__(self, limiter: UploadLimiter, client: str, size: int):
+        self.limiter = limiter
+        self.client = client
+        self.size = size
+        self.handed_off = False
+        self._released = False
+        self._lock = threading.Lock()
+    
+    def hold_until(self, future: Future):
+        """Keep the reservation until a background job finishes"""
+        self.handed_off = True
+        future.add_done_callback(self.release)
+    
+    def release(self, *args):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.limiter.release(self.client, self.size)
+
+
+def hold_upload_until(request, future: Future):
+    """Keep the upload's admission (see limit_uploads) until its queued job finishes"""
+    ticket = getattr(request, 'upload_ticket', None)
+    if ticket is not None:
+        ticket.hold_until(future)
+
+
+_limiter: Optional[UploadLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_upload_limiter() -> UploadLimiter:
+    """Process-wide limiter built from the UPLOAD_* settings on first use"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = UploadLimiter(
+                max_concurrent=getattr(settings, 'UPLOAD_MAX_CONCURRENT', 8),
+                max_per_client=getattr(settings, 'UPLOAD_MAX_CONCURRENT_PER_CLIENT', 2),
+                byte_budget=getattr(settings, 'UPLOAD_BYTE_BUDGET', 512 * MB),
+            )
+        return _limiter
+
+
+def upload_client(request) -> str:
+    """Who an upload counts against: the signed-in user, or the client address"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"addr:{request.META.get('REMOTE_ADDR', '')}"
+
+
+REJECTION_MESSAGES = {
+    REASON_SLOTS: 'Too many uploads in progress, please retry shortly',
+    REASON_USER: 'You already have uploads in progress, please wait for them to finish',
+    REASON_BYTES: 'The server is busy receiving other uploads, please retry shortly',
+}
+
+
+def limit_uploads(view):
+    """Admit an upload view's request before its body is read
+    
+    Requests without a Content-Length get 411: the declared length is what the
+    byte budget is charged, and Django never reads past it. Requests whose
+    Content-Length exceeds STATEMENT_MAX_REQUEST_SIZE get 413; when the limiter is
+    full the response is 429 with Retry-After. Admitted requests hold their slot
+    and reserved bytes until the view returns, or until the job the view queued
+    finishes (see hold_upload_until). Files larger than STATEMENT_MAX_FILE_SIZE
+    are skipped as they stream in (see oversized_files). Place it below @api_view
+    so it sees the DRF request.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            size = int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            size = -1
+        if size < 0:
+            return Response({'error': 'Uploads must declare their Content-Length'},
+                            status=status.HTTP_411_LENGTH_REQUIRED)
+        limit = max_request_size()
+        if size > limit:
+            return Response({'error': f'Upload must be at most {format_size(limit)}'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        limiter = get_upload_limiter()
+        client = upload_client(request)
+        reason = limiter.acquire(client, size)
+        if reason is not None:
+            logger.warning("Rejected upload of %d bytes from %s: %s", size, client, reason)
+            return Response(
+                {'error': REJECTION_MESSAGES[reason]},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(getattr(settings, 'UPLOAD_RETRY_AFTER', 5))}
+            )
+        
+        ticket = request.upload_ticket = UploadTicket(limiter, client, size)
+        try:
+            # Must precede the first access to request.data or request.FILES
+            request.upload_handlers.insert(0, UploadLimitHandler(request))
+            return view(request, *args, **kwargs)
+        finally:
+            if not ticket.handed_off:
+                ticket.release()
+    return wrapper
+
+
+def reset_upload_limiter():
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
@@ -0,0 +1,62 @@
+"""
+Minimal text PDFs for tests, written by hand so no PDF library is needed.
+"""
+from datetime import date, timedelta
+
+DESCRIPTIONS = [
+    ('POS PURCHASE FOODPANDA KARACHI', 'STAN(123456)'),
+    ('ATM CASH WITHDRAWAL', 'MEEZAN BANK BRANCH 0102'),
+    ('NETFLIX.COM SUBSCRIPTION', 'VISA CARD 4321'),
+    ('SALARY TRANSFER', 'BATCH TRANSFER 2024'),
+]
+
+
+def statement_lines(transactions, start=date(2024, 1, 1), seed=0):
+    """Two lines per transaction: date, description, amount and balance, then a detail line"""
+    lines = []
+    balance = 100000.0
+    for i in range(transactions):
+        first, second = DESCRIPTIONS[(i + seed) % len(DESCRIPTIONS)]
+        day = start + timedelta(days=i)
+        amount = 100 + (i * 37 + seed * 11) % 5000 + (i % 100) / 100
+        balance += amount if 'SALARY' in first else -amount
+        lines.append(f'{day:%a %b} {day.day} {first} {amount:,.2f} {balance:,.2f}')
+        lines.append(second)
+    return lines
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def text_pdf(pages):
+    """Bytes of a PDF with one page per list of text lines"""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for lines in pages:
+        content = 'BT /F1 9 Tf 12 TL 36 800 Td ' + ' '.join(f'({_escape(line)}) Tj T*' for line in lines) + ' ET'
+        objects.append(f'<< /Length {len(content)} >>\nstream\n{content}\nendstream')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>'
+        )
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+    
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return bytes(out)
+
+
+def statement_pdf(transactions, lines_per_page=40, start=date(2024, 1, 1), seed=0):
+    """Bytes of a statement PDF with statement_lines() spread over pages"""
+    lines = statement_lines(transactions, start=start, seed=seed)
+    return text_pdf([lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)])
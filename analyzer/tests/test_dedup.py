@@ -0,0 +1,39 @@
+from django.test import TestCase, override_settings
+
+from analyzer.models import AnalysisSession
+from analyzer.services.dedup import find_duplicate_session
+
+DIGEST = 'a' * 64
+
+
+class FindDuplicateSessionTests(TestCase):
+    """Re-uploads are answered only from sessions of the uploader's own signed-in account"""
+    
+    def session(self, session_id, account, status=AnalysisSession.STATUS_COMPLETED):
+        return AnalysisSession.objects.create(
+            session_id=session_id, account=account, file_name='statement.pdf', file_size=0,
+            status=status, content_hash=DIGEST
+        )
+    
+    def test_same_account_reuses_its_session(self):
+        session = self.session('mine', 'user:1')
+        self.assertEqual(find_duplicate_session(DIGEST, 'user:1'), session)
+    
+    def test_other_accounts_never_get_the_session(self):
+        self.session('mine', 'user:1')
+        for account in ('user:2', 'user:1:savings', 'anonymous'):
+            with self.subTest(account=account):
+                self.assertIsNone(find_duplicate_session(DIGEST, account))
+    
+    def test_anonymous_uploads_are_not_deduplicated(self):
+        self.session('anonymous-upload', 'anonymous')
+        self.assertIsNone(find_duplicate_session(DIGEST, 'anonymous'))
+    
+    def test_failed_sessions_are_not_reused(self):
+        self.session('failed', 'user:1', status=AnalysisSession.STATUS_FAILED)
+        self.assertIsNone(find_duplicate_session(DIGEST, 'user:1'))
+    
+    @override_settings(STATEMENT_DEDUP_POLICY='off')
+    def test_policy_off(self):
+        self.session('mine', 'user:1')
+        self.assertIsNone(find_duplicate_session(DIGEST, 'user:1'))
@@ -0,0 +1,146 @@
+import multiprocessing
+import shutil
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from analyzer.services import embeddings
+from analyzer.services.embeddings import EmbeddingCache, EmbeddingCategorizer
+
+DIM = 8
+
+
+class StubEncoder:
+    """Deterministic encoder that records every text it was asked to encode"""
+    
+    name = 'stub'
+    dim = DIM
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.vstack([stub_vector(text) for text in texts])
+
+
+def stub_vector(text):
+    vector = np.random.default_rng(zlib.crc32(text.encode())).random(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def put_keys(directory, keys):
+    """Worker process: store the stub vectors of keys in a shared cache, checking every hit"""
+    cache = EmbeddingCache(directory, dim=DIM, capacity=50, model_name='stub')
+    for start in range(0, len(keys), 2):
+        chunk = keys[start:start + 2]
+        cache.put_many(chunk, np.vstack([stub_vector(key) for key in chunk]))
+        recent = keys[max(0, start - 10):start + 2]
+        vectors, missing = cache.get_many(recent)
+        for i, key in enumerate(recent):
+            if i not in missing and not np.array_equal(vectors[i], stub_vector(key)):
+                raise AssertionError(f'{key} read another key\'s vector')
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+    
+    def make_cache(self, capacity=4, model_name='stub', dim=DIM):
+        return EmbeddingCache(self.directory, dim=dim, capacity=capacity, model_name=model_name)
+    
+    def put(self, cache, *keys):
+        cache.put_many(list(keys), np.vstack([stub_vector(key) for key in keys]))
+    
+    def test_hit_and_miss(self):
+        cache = self.make_cache()
+        self.put(cache, 'netflix', 'uber')
+        
+        vectors, missing = cache.get_many(['uber', 'careem', 'netflix'])
+        
+        self.assertEqual(missing, [1])
+        np.testing.assert_array_equal(vectors[0], stub_vector('uber'))
+        np.testing.assert_array_equal(vectors[2], stub_vector('netflix'))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+    
+    def test_least_recently_used_key_is_evicted(self):
+        cache = self.make_cache(capacity=3)
+        self.put(cache, 'a', 'b', 'c')
+        cache.get_many(['a'])
+        
+        self.put(cache, 'd')
+        
+        _, missing = cache.get_many(['a', 'b', 'c', 'd'])
+        self.assertEqual(missing, [1])
+        self.assertEqual(len(cache.slots), 3)
+    
+    def test_reload_from_directory(self):
+        self.put(self.make_cache(), 'netflix', 'uber')
+        
+        vectors, missing = self.make_cache().get_many(['netflix', 'uber'])
+        
+        self.assertEqual(missing, [])
+        np.testing.assert_array_equal(vectors[1], stub_vector('uber'))
+    
+    def test_cache_of_another_model_or_dim_is_discarded(self):
+        self.put(self.make_cache(), 'netflix')
+        
+        self.assertEqual(self.make_cache(model_name='other').get_many(['netflix'])[1], [0])
+        self.assertEqual(self.make_cache(dim=DIM * 2).get_many(['netflix'])[1], [0])
+    
+    def test_instances_sharing_a_directory_see_each_others_writes(self):
+        first = self.make_cache(capacity=3)
+        second = self.make_cache(capacity=3)
+        self.put(first, 'a', 'b')
+        
+        self.put(second, 'c', 'd')
+        
+        for cache in (first, second):
+            vectors, missing = cache.get_many(['a', 'b', 'c', 'd'])
+            self.assertEqual(missing, [0])
+            for i, key in enumerate('bcd', start=1):
+                np.testing.assert_array_equal(vectors[i], stub_vector(key))
+    
+    @unittest.skipIf(embeddings.fcntl is None, 'needs fcntl file locks')
+    def test_concurrent_processes_keep_index_and_vectors_consistent(self):
+        self.make_cache(capacity=50)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=put_keys, args=(self.directory, [f'{name}{i}' for i in range(200)]))
+            for name in ('alpha', 'beta', 'gamma')
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+        
+        cache = self.make_cache(capacity=50)
+        keys = list(cache.slots)
+        vectors, missing = cache.get_many(keys)
+        self.assertEqual(len(keys), 50)
+        self.assertEqual(missing, [])
+        for key, vector in zip(keys, vectors):
+            np.testing.assert_array_equal(vector, stub_vector(key))
+
+
+class EmbeddingCategorizerCacheTests(SimpleTestCase):
+
+    def test_each_description_is_encoded_once(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        encoder = StubEncoder()
+        cache = EmbeddingCache(directory, dim=DIM, capacity=10, model_name=encoder.name)
+        categorizer = EmbeddingCategorizer(encoder, {'Shopping': ['daraz']}, cache=cache)
+        encoder.encoded.clear()
+        
+        categorizer.classify_batch(['DARAZ 1234', 'daraz #99', 'UBER TRIP'])
+        categorizer.classify_batch(['Uber trip 7'])
+        
+        self.assertEqual(encoder.encoded, ['daraz', 'uber trip'])
+        self.assertEqual(cache.stats()['hits'], 1)
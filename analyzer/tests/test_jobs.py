@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TransactionTestCase, override_settings
+
+from analyzer.models import AnalysisResult, AnalysisSession, AnomalyBaseline, MonthlyRollup
+from analyzer.services.jobs import StatementQueue
+from analyzer.services.pipeline import statement_path
+
+from .pdfs import statement_pdf
+
+# Pairs of statements processed at the same time; one pair rarely hits a lock conflict
+ROUNDS = 6
+TRANSACTIONS = 120
+
+
+class ConcurrentJobTests(TransactionTestCase):
+    """Two background workers processing statements of one account at the same time"""
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, STATEMENT_KEEP_UPLOADS=False)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.queue = StatementQueue(max_workers=2)
+        self.addCleanup(self.queue.shutdown)
+    
+    def upload(self, name, seed):
+        session = AnalysisSession.objects.create(session_id=name, file_name=f'{name}.pdf', file_size=0)
+        relative_path = default_storage.save(statement_path(name), ContentFile(statement_pdf(TRANSACTIONS, seed=seed)))
+        return session, relative_path
+    
+    def test_concurrent_jobs_all_complete(self):
+        sessions = []
+        for round_number in range(ROUNDS):
+            pair = [self.upload(f'session-{round_number}-{i}', seed=round_number * 2 + i) for i in range(2)]
+            futures = [self.queue.submit(session.session_id, relative_path) for session, relative_path in pair]
+            for future in futures:
+                future.result(timeout=120)
+            sessions.extend(session for session, _ in pair)
+        
+        for session in sessions:
+            session.refresh_from_db()
+            self.assertEqual(session.status, AnalysisSession.STATUS_COMPLETED, session.error)
+            self.assertEqual(session.transactions.count(), TRANSACTIONS)
+            self.assertTrue(AnalysisResult.objects.filter(session=session).exists())
+        rollup_rows = sum(MonthlyRollup.objects.filter(account='anonymous').values_list('count', flat=True))
+        self.assertEqual(rollup_rows, TRANSACTIONS * len(sessions))
+        # Anonymous statements are checked on their own, never pooled into a shared baseline
+        self.assertFalse(AnomalyBaseline.objects.exists())
@@ -0,0 +1,42 @@
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from analyzer.services import ml_analyzer
+
+
+class SharedAnalyzerTests(SimpleTestCase):
+    """get_analyzer() publishes the shared analyzer only once it is fully built"""
+    
+    def setUp(self):
+        patcher = mock.patch.object(ml_analyzer, '_shared_analyzer', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_not_published_before_categorizer_is_attached(self):
+        building = threading.Event()
+        release = threading.Event()
+        categorizer = object()
+        
+        def build_categorizer(analyzer):
+            building.set()
+            release.wait(10)
+            return categorizer
+        
+        loaded = SimpleNamespace(embedding_categorizer=None)
+        results = []
+        with mock.patch.object(ml_analyzer.MLAnalyzer, 'load', return_value=loaded), \
+                mock.patch.object(ml_analyzer, '_build_embedding_categorizer', side_effect=build_categorizer):
+            loader = threading.Thread(target=lambda: results.append(ml_analyzer.get_analyzer()))
+            loader.start()
+            self.assertTrue(building.wait(10))
+            # A reader taking the lock-free fast path must not see the half-built analyzer
+            self.assertIsNone(ml_analyzer._shared_analyzer)
+            release.set()
+            loader.join(10)
+            
+            self.assertIs(results[0], loaded)
+            self.assertIs(loaded.embedding_categorizer, categorizer)
+            self.assertIs(ml_analyzer.get_analyzer(), loaded)
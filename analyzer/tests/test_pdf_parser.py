@@ -0,0 +1,164 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from analyzer.services.pdf_parser import PDFParser
+
+from .pdfs import statement_lines, text_pdf
+
+HEADER = 'Date Description Debit Credit Balance'
+
+# Page 1 ends inside a debit's block; page 2 opens with a header naming "Credit"
+PAGES = [
+    [
+        'MEEZAN BANK LIMITED',
+        'Account Statement',
+        'Wed Jun 26 POS PURCHASE FOODPANDA 1,250.00 98,750.00',
+        'STAN(123456)',
+        'Thu Jun 27 ATM CASH WITHDRAWAL 5,000.00',
+        'MEEZAN BANK BRANCH 0102',
+    ],
+    [
+        HEADER,
+        'Fri Jun 28 SALARY TRANSFER 150,000.00',
+        'BATCH TRANSFER 2024',
+        'Sat Jun 29 NETFLIX.COM SUBSCRIPTION',
+        'VISA CARD 4321 1,100.00 242,650.00',
+    ],
+]
+
+# What the original parser, which scanned every page's text separately, returned for PAGES
+PER_PAGE_OUTPUT = [
+    {'date': date(2024, 6, 26), 'description': 'POS PURCHASE FOODPANDA', 'amount': Decimal('98750.00'), 'type': 'DEBIT'},
+    {'date': date(2024, 6, 27), 'description': 'ATM CASH WITHDRAWAL MEEZAN BANK BRANCH 0102',
+     'amount': Decimal('5000.00'), 'type': 'DEBIT'},
+    {'date': date(2024, 6, 28), 'description': 'SALARY TRANSFER BATCH TRANSFER 2024',
+     'amount': Decimal('150000.00'), 'type': 'CREDIT'},
+    {'date': date(2024, 6, 29), 'description': 'VISA CARD 4321', 'amount': Decimal('242650.00'), 'type': 'DEBIT'},
+]
+
+
+class PageBoundaryTests(SimpleTestCase):
+    """Each page is scanned on its own, as the original per-page parser did"""
+    
+    def test_output_matches_per_page_parsing(self):
+        self.assertEqual(PDFParser().parse_pdf(text_pdf(PAGES)), PER_PAGE_OUTPUT)
+    
+    def test_streamed_output_matches_parsing_each_page_text(self):
+        parser = PDFParser()
+        pdf = text_pdf(PAGES)
+        per_page = [
+            transaction
+            for page_text in parser._iter_page_texts(pdf)
+            for transaction in parser._extract_transactions_from_text(page_text)
+        ]
+        
+        self.assertEqual(list(parser.iter_transactions(pdf)), per_page)
+    
+    def test_page_headers_never_join_a_transaction(self):
+        lines = statement_lines(60)
+        pages = [[HEADER] + lines[start:start + 30] for start in range(0, len(lines), 30)]
+        
+        transactions = PDFParser().parse_pdf(text_pdf(pages))
+        
+        self.assertEqual(len(transactions), 60)
+        for transaction in transactions:
+            self.assertNotIn('Balance', transaction['description'])
+            expected_type = 'CREDIT' if transaction['description'].startswith('SALARY') else 'DEBIT'
+            self.assertEqual(transaction['type'], expected_type, transaction['description'])
+
+
+# The original parser's date patterns, tried one by one in this order
+ORIGINAL_DATE_PATTERNS = [
+    r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}',  # Wed Jun 26
+    r'\d{2}/\d{2}/\d{4}',  # DD/MM/YYYY
+    r'\d{2}-\d{2}-\d{4}',  # DD-MM-YYYY
+    r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
+]
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# (line, date text the original loop found); the later lines hold several formats
+DATE_LINES = [
+    ('Wed Jun 26 POS PURCHASE FOODPANDA 1,250.00', 'Wed Jun 26'),
+    ('Sun Dec 1 BANK CHARGES 50.00', 'Sun Dec 1'),
+    ('26/06/2024 ATM CASH WITHDRAWAL 5,000.00', '26/06/2024'),
+    ('26-06-2024 TELENOR PREPAID LOAD 500.00', '26-06-2024'),
+    ('2024-06-26 SALARY TRANSFER 150,000.00', '2024-06-26'),
+    ('STAN(123456)', None),
+    ('Page 1 of 2', None),
+    ('Mon Feb 30 impossible day', 'Mon Feb 30'),
+    ('31/02/2024 impossible day', '31/02/2024'),
+    # A higher-priority format later in the line wins over the leftmost date
+    ('26/06/2024 posted Wed Jun 26', 'Wed Jun 26'),
+    ('REF 2024-06-26 value date 27/06/2024', '27/06/2024'),
+    ('01-02-2024 and 03/04/2024', '03/04/2024'),
+    ('2024-06-26 then 27-06-2024', '27-06-2024'),
+    # Matches of two formats overlapping each other
+    ('1999-12-31-2024', '12-31-2024'),
+    ('12-06-2024-06-26', '12-06-2024'),
+    ('123/45/67890', '23/45/6789'),
+    ('Wed Jun 26/06/2024', 'Wed Jun 26'),
+]
+
+
+def original_find_date(line):
+    """The original scan: the first pattern that matches anywhere in the line wins"""
+    for pattern in ORIGINAL_DATE_PATTERNS:
+        match = re.search(pattern, line)
+        if match:
+            return match
+    return None
+
+
+def original_parse_date(date_str):
+    """The original date parse: the weekday form, else each strptime format in turn"""
+    if re.match(ORIGINAL_DATE_PATTERNS[0], date_str):
+        parts = date_str.split()
+        try:
+            return date(2024, MONTHS.index(parts[1]) + 1, int(parts[2]))
+        except ValueError:
+            return None
+    for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d']:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class DateScanTests(SimpleTestCase):
+    """The combined DATE_RE scan agrees with the original per-pattern loop"""
+    
+    def test_finds_the_same_date(self):
+        parser = PDFParser()
+        for line, expected in DATE_LINES:
+            with self.subTest(line=line):
+                match = parser._find_date_in_line(line)
+                original = original_find_date(line)
+                self.assertEqual(match and match.group(), expected)
+                self.assertEqual(match and match.span(), original and original.span())
+    
+    def test_parses_the_same_date(self):
+        parser = PDFParser()
+        for line, expected in DATE_LINES:
+            with self.subTest(line=line):
+                original = original_parse_date(expected) if expected else None
+                self.assertEqual(parser._extract_date(line), original)
+    
+    def test_each_format(self):
+        parser = PDFParser()
+        for date_str, expected in [
+            ('Wed Jun 26', date(2024, 6, 26)),
+            ('Sun Dec 1', date(2024, 12, 1)),
+            ('26/06/2024', date(2024, 6, 26)),
+            ('26-06-2024', date(2024, 6, 26)),
+            ('2024-06-26', date(2024, 6, 26)),
+            ('31/02/2024', None),
+            ('Mon Feb 30', None),
+        ]:
+            with self.subTest(date_str=date_str):
+                self.assertEqual(parser._parse_meezan_date(date_str), expected)
+                self.assertEqual(original_parse_date(date_str), expected)
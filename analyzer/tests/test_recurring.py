@@ -0,0 +1,51 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from analyzer.models import AnalysisSession, RecurringPayment, Transaction
+from analyzer.services.recurring import recurring_insights, refresh_account
+
+# Four monthly charges of one merchant: enough to be detected as recurring
+MONTHLY = [date(2024, month, 5) for month in range(3, 7)]
+
+
+class RecurringInsightsTests(TestCase):
+    """Recurring payments of anonymous uploads stay within each statement"""
+    
+    def session(self, session_id, account, descriptions):
+        session = AnalysisSession.objects.create(session_id=session_id, account=account,
+                                                 file_name='statement.pdf', file_size=0)
+        Transaction.objects.bulk_create([
+            Transaction(session=session, date=day, description=description, amount=Decimal('15.99'),
+                        transaction_type='DEBIT', category='Entertainment')
+            for description in descriptions
+            for day in MONTHLY
+        ])
+        return session
+    
+    def test_anonymous_session_sees_only_its_own_statement(self):
+        self.session('stranger', 'anonymous', ['NETFLIX.COM SUBSCRIPTION'])
+        mine = self.session('mine', 'anonymous', ['SPOTIFY PREMIUM'])
+        
+        insights = recurring_insights(mine)
+        self.assertEqual(insights['recurring_payments'], 1)
+        self.assertEqual([charge['merchant'] for charge in insights['upcoming_charges']], ['SPOTIFY PREMIUM'])
+        self.assertFalse(RecurringPayment.objects.filter(account='anonymous').exists())
+    
+    def test_signed_in_account_spans_its_statements(self):
+        self.session('first', 'user:1', ['NETFLIX.COM SUBSCRIPTION'])
+        second = self.session('second', 'user:1', ['SPOTIFY PREMIUM'])
+        
+        self.assertEqual(recurring_insights(second)['recurring_payments'], 2)
+        self.assertEqual(RecurringPayment.objects.filter(account='user:1').count(), 2)
+    
+    def test_refresh_clears_anonymous_payments(self):
+        self.session('stranger', 'anonymous', ['NETFLIX.COM SUBSCRIPTION'])
+        RecurringPayment.objects.create(
+            account='anonymous', merchant_key='netflix', merchant='NETFLIX', cadence='monthly',
+            interval_days=30.0, occurrences=4, average_amount=Decimal('15.99'), first_date=MONTHLY[0],
+            last_date=MONTHLY[-1], next_date=date(2024, 7, 5), next_amount=Decimal('15.99')
+        )
+        self.assertEqual(refresh_account('anonymous'), [])
+        self.assertFalse(RecurringPayment.objects.filter(account='anonymous').exists())
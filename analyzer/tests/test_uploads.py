@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+from analyzer import views
+from analyzer.services.uploads import UploadLimiter, UploadTicket, get_upload_limiter, reset_upload_limiter
+
+from .pdfs import statement_pdf
+
+
+@override_settings(UPLOAD_MAX_CONCURRENT=4, UPLOAD_MAX_CONCURRENT_PER_CLIENT=1, UPLOAD_RETRY_AFTER=7)
+class UploadLimitTests(TestCase):
+    """Admission control of the upload endpoint (services/uploads.py)"""
+    
+    def setUp(self):
+        reset_upload_limiter()
+        self.addCleanup(reset_upload_limiter)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+    
+    def statement(self):
+        return SimpleUploadedFile('statement.pdf', statement_pdf(5), content_type='application/pdf')
+    
+    def assertIdle(self):
+        stats = get_upload_limiter().stats()
+        self.assertEqual((stats['active_uploads'], stats['active_bytes']), (0, 0))
+    
+    def test_missing_content_length(self):
+        request = RequestFactory().post(reverse('upload_statement'), {'file': self.statement()})
+        del request.META['CONTENT_LENGTH']
+        response = views.upload_statement(request)
+        self.assertEqual(response.status_code, 411)
+        self.assertIdle()
+    
+    @override_settings(STATEMENT_MAX_REQUEST_SIZE=1024)
+    def test_oversized_body(self):
+        response = self.client.post(reverse('upload_statement'), {'file': self.statement()})
+        self.assertEqual(response.status_code, 413)
+        self.assertIdle()
+    
+    def test_per_client_limit(self):
+        # The test client's address already has an upload in progress
+        self.assertIsNone(get_upload_limiter().acquire('addr:127.0.0.1', 100))
+        
+        response = self.client.post(reverse('upload_statement'), {'file': self.statement()})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(get_upload_limiter().stats()['rejected'], {'user': 1})
+        
+        # Another client is still admitted
+        response = self.client.post(reverse('upload_statement'), {}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_upload_limiter().stats()['active_uploads'], 1)
+    
+    @override_settings(STATEMENT_PROCESSING_MODE='async')
+    def test_slot_released_when_job_fails(self):
+        job = Future()
+        with mock.patch.object(views, 'enqueue_statement', return_value=job):
+            response = self.client.post(reverse('upload_statement'), {'file': self.statement()})
+        self.assertEqual(response.status_code, 202)
+        # The queued job holds the admission
+        self.assertEqual(get_upload_limiter().stats()['active_uploads'], 1)
+        
+        job.set_exception(RuntimeError('worker crashed'))
+        self.assertIdle()
+        # The slot is free for the next upload of the same client
+        self.assertIsNone(get_upload_limiter().acquire('addr:127.0.0.1', 100))
+    
+    def test_ticket_released_once(self):
+        limiter = UploadLimiter(max_concurrent=2, max_per_client=2, byte_budget=1000)
+        self.assertIsNone(limiter.acquire('addr:1', 400))
+        ticket = UploadTicket(limiter, 'addr:1', 400)
+        job = Future()
+        ticket.hold_until(job)
+        job.set_exception(RuntimeError('parse failed'))
+        ticket.release()
+        stats = limiter.stats()
+        self.assertEqual((stats['active_uploads'], stats['active_bytes']), (0, 0))
+        # A double release would have over-released the semaphore
+        self.assertIsNone(limiter.acquire('addr:1', 400))
+        self.assertIsNone(limiter.acquire('addr:2', 400))
+        self.assertEqual(limiter.acquire('addr:3', 100), 'slots')
@@ -0,0 +1,171 @@
+import base64
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from analyzer.models import AnalysisSession, MonthlyRollup, RecurringPayment, Transaction
+
+
+class ListTransactionsTests(TestCase):
+    """Keyset pagination of a session's transactions"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.session = AnalysisSession.objects.create(
+            session_id='paged', file_name='paged.pdf', file_size=0, status=AnalysisSession.STATUS_COMPLETED
+        )
+        # Five transactions on each of five dates, inserted out of date order so ids
+        # and dates disagree and pages of four end partway through a date
+        start = date(2024, 6, 1)
+        Transaction.objects.bulk_create([
+            Transaction(
+                session=cls.session,
+                date=start + timedelta(days=(i * 3) % 5),
+                description=f'PAYMENT {i}',
+                amount=Decimal(100 + i),
+                transaction_type='CREDIT' if i % 3 == 0 else 'DEBIT',
+                category='Income' if i % 3 == 0 else 'Shopping',
+            )
+            for i in range(25)
+        ])
+        AnalysisSession.objects.create(session_id='other', file_name='other.pdf', file_size=0)
+    
+    def url(self, session_id='paged'):
+        return reverse('list_transactions', args=[session_id])
+    
+    def fetch_all(self, limit, **params):
+        """Follow next_cursor from the first page to the last"""
+        ids, pages = [], 0
+        cursor = None
+        while True:
+            query = dict(params, limit=limit)
+            if cursor:
+                query['cursor'] = cursor
+            response = self.client.get(self.url(), query)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body['transactions']), limit)
+            ids.extend(row['id'] for row in body['transactions'])
+            pages += 1
+            cursor = body['next_cursor']
+            if cursor is None:
+                return ids, pages
+    
+    def test_cursor_round_trip(self):
+        expected = list(
+            Transaction.objects.filter(session=self.session).order_by('-date', '-id').values_list('id', flat=True)
+        )
+        for limit in (1, 4, 5, 7, 25, 100):
+            with self.subTest(limit=limit):
+                ids, pages = self.fetch_all(limit)
+                self.assertEqual(ids, expected)
+                self.assertEqual(pages, max(1, -(-len(expected) // limit)))
+    
+    def test_cursor_round_trip_with_filter(self):
+        expected = list(
+            Transaction.objects.filter(session=self.session, transaction_type='DEBIT')
+            .order_by('-date', '-id').values_list('id', flat=True)
+        )
+        ids, _ = self.fetch_all(3, type='debit')
+        self.assertEqual(ids, expected)
+    
+    def test_empty_session(self):
+        response = self.client.get(self.url('other'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['transactions'], [])
+        self.assertIsNone(response.json()['next_cursor'])
+    
+    def test_invalid_cursor(self):
+        for cursor in [
+            'zzz',  # not base64
+            base64.urlsafe_b64encode(b'2024-06-01').decode(),  # no id
+            base64.urlsafe_b64encode(b'2024-06-01|abc').decode(),  # id is not a number
+            base64.urlsafe_b64encode(b'June 1st|12').decode(),  # date is not ISO
+            base64.urlsafe_b64encode(b'\xff\xfe|12').decode(),  # not UTF-8
+        ]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url(), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+    
+    def test_invalid_limit(self):
+        for limit in ('0', '-1', 'ten'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.client.get(self.url(), {'limit': limit}).status_code, 400)
+    
+    def test_unknown_session(self):
+        self.assertEqual(self.client.get(self.url('missing')).status_code, 404)
+
+
+class SpendingTrendsTests(TestCase):
+    """Trends are only served to signed-in users, from their own accounts"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        users = get_user_model().objects
+        cls.alice = users.create_user('alice', password='unused')
+        cls.bob = users.create_user('bob', password='unused')
+        for account, total in [(f'user:{cls.alice.pk}', 100), (f'user:{cls.alice.pk}:savings', 200),
+                               (f'user:{cls.bob.pk}', 400), ('anonymous', 800)]:
+            MonthlyRollup.objects.create(account=account, month=date(2024, 6, 1), category='Shopping',
+                                         transaction_type='DEBIT', total=Decimal(total), count=1)
+    
+    def expenses(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('spending_trends'), params)
+        self.assertEqual(response.status_code, 200)
+        return [month['expenses'] for month in response.json()['months']]
+    
+    def test_anonymous_caller_is_refused(self):
+        for params in ({}, {'account': 'savings'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('spending_trends'), params).status_code, 403)
+    
+    def test_own_accounts(self):
+        self.assertEqual(self.expenses(self.alice, months=1), [100.0])
+        self.assertEqual(self.expenses(self.alice, months=1, account='savings'), [200.0])
+        self.assertEqual(self.expenses(self.bob, months=1), [400.0])
+    
+    def test_account_label_stays_in_callers_namespace(self):
+        for label in ('savings', f'user:{self.alice.pk}', 'anonymous'):
+            with self.subTest(label=label):
+                self.assertEqual(self.expenses(self.bob, months=1, account=label), [])
+
+
+class RecurringPaymentsTests(TestCase):
+    """Recurring payments are only listed to signed-in users, from their own accounts"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        users = get_user_model().objects
+        cls.alice = users.create_user('alice', password='unused')
+        cls.bob = users.create_user('bob', password='unused')
+        for account, merchant in [(f'user:{cls.alice.pk}', 'NETFLIX'), (f'user:{cls.bob.pk}', 'SPOTIFY'),
+                                  ('anonymous', 'GYM MEMBERSHIP')]:
+            RecurringPayment.objects.create(
+                account=account, merchant_key=merchant.lower(), merchant=merchant, cadence='monthly',
+                interval_days=30.0, occurrences=3, average_amount=Decimal('10.00'),
+                first_date=date(2024, 4, 1), last_date=date(2024, 6, 1), next_date=date(2024, 7, 1),
+                next_amount=Decimal('10.00')
+            )
+    
+    def merchants(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('recurring_payments'), params)
+        self.assertEqual(response.status_code, 200)
+        return [payment['merchant'] for payment in response.json()['payments']]
+    
+    def test_anonymous_caller_is_refused(self):
+        for params in ({}, {'account': 'anything'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('recurring_payments'), params).status_code, 403)
+    
+    def test_only_own_payments(self):
+        self.assertEqual(self.merchants(self.alice), ['NETFLIX'])
+        self.assertEqual(self.merchants(self.bob), ['SPOTIFY'])
+        for label in (f'user:{self.alice.pk}', 'anonymous'):
+            with self.subTest(label=label):
+                self.assertEqual(self.merchants(self.bob, account=label), [])
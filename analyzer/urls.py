@@ -4,5 +4,13 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('api/upload/', views.upload_statement, name='upload_statement'),
+    path('api/upload/batch/', views.upload_statements, name='upload_statements'),
+    path('api/upload/stats/', views.upload_stats, name='upload_stats'),
+    path('api/categorizer/stats/', views.categorizer_stats, name='categorizer_stats'),
     path('api/analysis/<str:session_id>/', views.get_analysis, name='get_analysis'),
+    path('api/analysis/<str:session_id>/transactions/', views.list_transactions, name='list_transactions'),
+    path('api/analysis/<str:session_id>/metrics/', views.session_metrics, name='session_metrics'),
+    path('api/trends/', views.spending_trends, name='spending_trends'),
+    path('api/recurring/', views.recurring_payments, name='recurring_payments'),
+    path('metrics', views.metrics, name='metrics'),
 ] 
\ No newline at end of file
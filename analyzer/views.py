@@ -1,186 +1,550 @@
 import json
 import uuid
 import os
-import decimal
-from datetime import datetime
+import base64
+import binascii
+import logging
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.conf import settings
-from rest_framework.decorators import api_view, parser_classes
+from django.db.models import Q
+from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import AnalysisSession, Transaction, AnalysisResult
-from .services.pdf_parser import PDFParser
-from .services.ml_analyzer import MLAnalyzer
+from .models import AnalysisSession, RecurringPayment, StatementFile, Transaction
+from .services.batch import process_statement_batch, statement_file_path
+from .services.dedup import attach_content_hashes, dedup_stats, find_duplicate_session, install_hash_handler
+from .services.jobs import enqueue_statement, enqueue_statement_batch, processing_is_async
+from .services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, PipelineMetrics, record_session
+from .services.pipeline import (
+    StatementProcessingError, convert_decimals, keep_uploads, process_statement, statement_path, upload_source
+)
+from .services.response_cache import (
+    cache_response, etag_matches, get_cached_response, make_etag
+)
+from .services.recurring import recurring_summary
+from .services.rollups import add_months, latest_month, monthly_trends
+from .services.uploads import (
+    format_size, get_upload_limiter, hold_upload_until, limit_uploads, max_file_size, oversized_files
+)
+
+logger = logging.getLogger(__name__)
+
+
+def account_for_request(request):
+    """Account key an upload belongs to: the signed-in user, plus an optional account label"""
+    user = getattr(request, 'user', None)
+    owner = f'user:{user.pk}' if user is not None and user.is_authenticated else 'anonymous'
+    label = str(request.data.get('account') or request.query_params.get('account', '')).strip()[:40]
+    return f'{owner}:{label}' if label else owner
 
 
 def index(request):
     """Main upload page"""
-    return render(request, 'analyzer/index.html')
+    return render(request, 'analyzer/index.html', {'max_file_size': max_file_size()})
+
+
+def file_size_error():
+    return f'File size must be at most {format_size(max_file_size())}'
 
 
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
+@limit_uploads
 def upload_statement(request):
-    """Handle PDF statement upload and analysis"""
+    """Accept a PDF statement upload and queue it for analysis
+    
+    A file whose content was already analyzed (see services/dedup.py) is answered
+    from the existing session without being stored or parsed again. Size and
+    concurrency limits are enforced while the upload streams in (see
+    services/uploads.py).
+    """
     try:
+        # Hash the upload while it streams in; must precede the first access to request.FILES
+        hash_handler = install_hash_handler(request)
         if 'file' not in request.FILES:
+            if oversized_files(request, 'file'):
+                return Response({'error': file_size_error()}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        uploaded_file = request.FILES['file']
+        uploaded_file = attach_content_hashes(request, hash_handler, 'file')[0]
         
         # Validate file
         if not uploaded_file.name.lower().endswith('.pdf'):
             return Response({'error': 'Only PDF files are supported'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if uploaded_file.size > 1024 * 1024:  # 1MB limit
-            return Response({'error': 'File size must be less than 1MB'}, status=status.HTTP_400_BAD_REQUEST)
+        account = account_for_request(request)
+        duplicate = find_duplicate_session(uploaded_file.content_hash, account)
+        if duplicate is not None:
+            return duplicate_session_response(duplicate)
         
         # Create analysis session
         session_id = str(uuid.uuid4())
         session = AnalysisSession.objects.create(
             session_id=session_id,
+            account=account,
             file_name=uploaded_file.name,
-            file_size=uploaded_file.size
+            file_size=uploaded_file.size,
+            content_hash=uploaded_file.content_hash
         )
         
-        # Save file temporarily
-        relative_path = default_storage.save(f'statements/{session_id}.pdf', ContentFile(uploaded_file.read()))
-        absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-        
-        print(f"Saved file to: {absolute_path}")
-        
-        # Parse PDF
-        parser = PDFParser()
-        transactions = parser.parse_pdf(absolute_path)
-        
-        if not transactions:
-            return Response({'error': 'Could not extract transactions from PDF'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Save transactions with error handling
-        for trans_data in transactions:
-            try:
-                Transaction.objects.create(
-                    session=session,
-                    date=trans_data['date'],
-                    description=trans_data['description'],
-                    amount=trans_data['amount'],
-                    transaction_type=trans_data['type']
-                )
-            except Exception as e:
-                print(f"Error saving transaction {trans_data.get('description', 'Unknown')}: {e}")
-                continue
-        
-        # Analyze with ML
-        analyzer = MLAnalyzer()
-        
-        # Convert QuerySet to the format expected by ML analyzer
-        transactions_for_analysis = []
-        for trans in session.transactions.all():
-            transactions_for_analysis.append({
-                'date': trans.date,
-                'description': trans.description,
-                'amount': trans.amount,
-                'type': trans.transaction_type
-            })
-        
-        analysis_result = analyzer.analyze_transactions(transactions_for_analysis)
-        
-        # Save analysis result with error handling
+        # Store the file only when a worker picks it up after this request ends, or when
+        # uploads are kept; Django writes it to storage chunk by chunk
+        upload_metrics = PipelineMetrics()
+        relative_path = None
+        if processing_is_async() or keep_uploads():
+            with upload_metrics.stage('save_upload'):
+                relative_path = default_storage.save(statement_path(session_id), uploaded_file)
+        
+        if processing_is_async():
+            record_session(session, upload_metrics)
+            hold_upload_until(request, enqueue_statement(session_id, relative_path))
+            return Response({
+                'session_id': session_id,
+                'status': session.status,
+                'progress': session.progress
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        # Synchronous mode: return the analysis directly. Unless it was just stored (which
+        # may have moved Django's temporary file), the PDF is parsed straight from the upload
+        source = upload_source(uploaded_file) if relative_path is None else None
         try:
-            AnalysisResult.objects.create(
+            analysis_result, rejected_count = process_statement(session_id, relative_path, source=source)
+        except StatementProcessingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with upload_metrics.stage('serialize'):
+            analysis = convert_decimals(analysis_result)
+        record_session(session, upload_metrics)
+        return Response({
+            'session_id': session_id,
+            'status': AnalysisSession.STATUS_COMPLETED,
+            'progress': 100,
+            'rejected_transactions': rejected_count,
+            'analysis': analysis
+        }, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        logger.error("Error in upload_statement: %s", e)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def duplicate_session_response(session):
+    """Answer a re-upload from the session that already holds the same statement"""
+    if session.status == AnalysisSession.STATUS_COMPLETED:
+        return Response({**build_analysis_body(session), 'deduplicated': True}, status=status.HTTP_200_OK)
+    
+    # Still queued or processing; the client polls it like a fresh upload
+    return Response({
+        'session_id': session.session_id,
+        'status': session.status,
+        'progress': session.progress,
+        'deduplicated': True
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def upload_stats(request):
+    """Hit rate of the re-upload deduplication lookup and the upload limiter's state"""
+    return Response({**dedup_stats(), 'limits': get_upload_limiter().stats()})
+
+
+@api_view(['GET'])
+def categorizer_stats(request):
+    """Active categorizer and the hit ratio of its embedding cache"""
+    from .services.ml_analyzer import get_categorizer_stats
+    
+    return Response(get_categorizer_stats())
+
+
+@api_view(['GET'])
+def session_metrics(request, session_id):
+    """Stage timings and counters recorded for one session"""
+    try:
+        session = AnalysisSession.objects.get(session_id=session_id)
+    except AnalysisSession.DoesNotExist:
+        return Response({'error': 'Analysis session not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'session_id': session_id, 'status': session.status, **session.metrics})
+
+
+@require_http_methods(['GET'])
+def metrics(request):
+    """Process-wide pipeline histograms and cache counters in Prometheus text format"""
+    return HttpResponse(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def statement_files_body(files):
+    """Per-file status of a multi-statement upload"""
+    body = []
+    for statement_file in files:
+        entry = {
+            'file_name': statement_file.file_name,
+            'status': statement_file.status,
+            'transactions': statement_file.transaction_count,
+            'duplicates': statement_file.duplicate_count,
+            'rejected': statement_file.rejected_count
+        }
+        if statement_file.error:
+            entry['error'] = statement_file.error
+        body.append(entry)
+    return body
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@limit_uploads
+def upload_statements(request):
+    """Accept several PDF statements in one request and analyze them as one session
+    
+    Files are sent as repeated 'files' fields. Invalid files, including those over
+    the size limit (skipped while streaming in), are reported as FAILED; the rest
+    are parsed concurrently and combined into one analysis.
+    """
+    try:
+        uploaded_files = request.FILES.getlist('files')
+        oversized = oversized_files(request, 'files')
+        if not uploaded_files and not oversized:
+            return Response({'error': 'No files provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_files = getattr(settings, 'STATEMENT_BATCH_MAX_FILES', 24)
+        if len(uploaded_files) + len(oversized) > max_files:
+            return Response({'error': f'At most {max_files} files can be uploaded at once'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        session_id = str(uuid.uuid4())
+        session = AnalysisSession.objects.create(
+            session_id=session_id,
+            account=account_for_request(request),
+            file_name=f'{len(uploaded_files) + len(oversized)} statements',
+            file_size=sum(uploaded_file.size for uploaded_file in uploaded_files)
+        )
+        
+        upload_metrics = PipelineMetrics()
+        files = []
+        for position, uploaded_file in enumerate(uploaded_files):
+            statement_file = StatementFile(
                 session=session,
-                total_income=analysis_result['total_income'],
-                total_expenses=analysis_result['total_expenses'],
-                net_amount=analysis_result['net_amount'],
-                category_breakdown=analysis_result['category_breakdown'],
-                anomaly_transactions=analysis_result['anomalies'],
-                insights=analysis_result['insights']
+                position=position,
+                file_name=uploaded_file.name,
+                file_size=uploaded_file.size
             )
-        except Exception as e:
-            print(f"Error saving analysis result: {e}")
-            # Continue without saving to database, but still return the result
-        
-        # Clean up temporary file
-        default_storage.delete(relative_path)
-        
-        # Convert analysis result to JSON-serializable format
-        def convert_decimals(obj):
-            if isinstance(obj, dict):
-                return {k: convert_decimals(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_decimals(item) for item in obj]
-            elif hasattr(obj, '__float__') and not isinstance(obj, (str, bool)):  # Only convert numeric types
-                try:
-                    return float(obj) if obj is not None else 0.0
-                except (ValueError, TypeError, decimal.InvalidOperation):
-                    return 0.0
+            
+            # Validate each file on its own; a bad file never rejects the whole batch
+            if not uploaded_file.name.lower().endswith('.pdf'):
+                statement_file.status = AnalysisSession.STATUS_FAILED
+                statement_file.error = 'Only PDF files are supported'
             else:
-                return obj
+                with upload_metrics.stage('save_upload'):
+                    default_storage.save(statement_file_path(session_id, position), uploaded_file)
+            files.append(statement_file)
+        # Oversized files were never stored; file_size is what arrived before they were skipped
+        for file_name, received in oversized:
+            files.append(StatementFile(
+                session=session,
+                position=len(files),
+                file_name=file_name,
+                file_size=received,
+                status=AnalysisSession.STATUS_FAILED,
+                error=file_size_error()
+            ))
+        StatementFile.objects.bulk_create(files)
         
-        try:
-            analysis_result_serializable = convert_decimals(analysis_result)
-            
+        if all(f.status == AnalysisSession.STATUS_FAILED for f in files):
+            session.update_status(AnalysisSession.STATUS_FAILED, error='No valid PDF files provided')
             return Response({
                 'session_id': session_id,
-                'analysis': analysis_result_serializable
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            print(f"Error serializing analysis result: {e}")
-            # Return a simplified response if serialization fails
+                'status': session.status,
+                'error': session.error,
+                'files': statement_files_body(files)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        record_session(session, upload_metrics)
+        if processing_is_async():
+            hold_upload_until(request, enqueue_statement_batch(session_id))
             return Response({
                 'session_id': session_id,
-                'analysis': {
-                    'total_income': 0.0,
-                    'total_expenses': 0.0,
-                    'net_amount': 0.0,
-                    'category_breakdown': {},
-                    'anomalies': [],
-                    'insights': {}
-                }
-            }, status=status.HTTP_200_OK)
+                'status': session.status,
+                'progress': session.progress,
+                'files': statement_files_body(files)
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        # Synchronous mode: process inside the request and return the combined analysis
+        try:
+            analysis_result, files = process_statement_batch(session_id)
+        except StatementProcessingError as e:
+            return Response({
+                'session_id': session_id,
+                'status': AnalysisSession.STATUS_FAILED,
+                'error': str(e),
+                'files': statement_files_body(session.files.all())
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        return Response({
+            'session_id': session_id,
+            'status': AnalysisSession.STATUS_COMPLETED,
+            'progress': 100,
+            'files': statement_files_body(files),
+            'analysis': convert_decimals(analysis_result)
+        }, status=status.HTTP_200_OK)
+    
     except Exception as e:
-        print(f"Error in upload_statement: {str(e)}")
+        logger.error("Error in upload_statements: %s", e)
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def build_analysis_body(session):
+    """Response body for a completed session"""
+    analysis = session.analysis_result
+    
+    body = {
+        'session_id': session.session_id,
+        'status': session.status,
+        'progress': session.progress,
+        'analysis': {
+            'total_income': float(analysis.total_income),
+            'total_expenses': float(analysis.total_expenses),
+            'net_amount': float(analysis.net_amount),
+            'category_breakdown': analysis.category_breakdown,
+            'anomalies': analysis.anomaly_transactions,
+            'anomaly_transactions': analysis.anomaly_transactions,
+            'insights': analysis.insights,
+            'transactions': [
+                {
+                    'date': trans.date.isoformat(),
+                    'description': trans.description,
+                    'amount': float(trans.amount),
+                    'type': trans.transaction_type,
+                    'category': trans.category,
+                    'confidence': trans.confidence
+                }
+                for trans in session.transactions.all()
+            ]
+        }
+    }
+    
+    files = list(session.files.all())
+    if files:
+        body['files'] = statement_files_body(files)
+    return body
+
+
+def cached_json_response(session_id, version, body):
+    """JSON response carrying the ETag of a session's content version"""
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = make_etag(session_id, version)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 @api_view(['GET'])
 def get_analysis(request, session_id):
-    """Get analysis results for a session"""
+    """Get processing status and, once completed, analysis results for a session
+    
+    Completed responses are cached per content version, read from the session row
+    on every request; a poll whose If-None-Match matches the current ETag is
+    answered with 304 without touching the cache.
+    """
     try:
         session = AnalysisSession.objects.get(session_id=session_id)
-        analysis = session.analysis_result
         
-        return Response({
-            'session_id': session_id,
-            'analysis': {
-                'total_income': float(analysis.total_income),
-                'total_expenses': float(analysis.total_expenses),
-                'net_amount': float(analysis.net_amount),
-                'category_breakdown': analysis.category_breakdown,
-                'anomaly_transactions': analysis.anomaly_transactions,
-                'insights': analysis.insights,
-                'transactions': [
-                    {
-                        'date': trans.date.isoformat(),
-                        'description': trans.description,
-                        'amount': float(trans.amount),
-                        'type': trans.transaction_type,
-                        'category': trans.category
-                    }
-                    for trans in session.transactions.all()
-                ]
+        if session.status != AnalysisSession.STATUS_COMPLETED:
+            body = {
+                'session_id': session_id,
+                'status': session.status,
+                'progress': session.progress
             }
-        }, status=status.HTTP_200_OK)
+            files = list(session.files.all())
+            if files:
+                body['files'] = statement_files_body(files)
+            if session.status == AnalysisSession.STATUS_FAILED:
+                body['error'] = session.error
+                return Response(body, status=status.HTTP_200_OK)
+            return Response(body, status=status.HTTP_202_ACCEPTED)
+        
+        version = session.content_version
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), make_etag(session_id, version)):
+            return HttpResponseNotModified(headers={'ETag': make_etag(session_id, version)})
         
+        body = get_cached_response(session_id, version)
+        if body is None:
+            render_metrics = PipelineMetrics()
+            with render_metrics.stage('serialize'):
+                body = JSONRenderer().render(build_analysis_body(session))
+            # Reads only feed the process histograms; the session keeps its pipeline timings
+            REGISTRY.observe(render_metrics)
+            cache_response(session_id, version, body)
+        return cached_json_response(session_id, version, body)
+    
     except AnalysisSession.DoesNotExist:
         return Response({'error': 'Analysis session not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+TREND_DEFAULT_MONTHS = 12
+TREND_MAX_MONTHS = 120
+
+
+def parse_month(value):
+    """First day of a 'YYYY-MM' month"""
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def spending_trends(request):
+    """Monthly income, expenses and category totals of an account, read from the rollups
+    
+    Signed-in users only: anonymous uploads all share one account, so its totals
+    belong to no one caller. Query parameters: account (label, as on upload, within
+    the caller's own accounts), months (default 12), to ('YYYY-MM', default the
+    latest month with transactions), type, category. The cost depends on the
+    number of months, not on the number of transactions.
+    """
+    account = account_for_request(request)
+    params = request.query_params
+    try:
+        months = int(params.get('months', TREND_DEFAULT_MONTHS))
+        if not 1 <= months <= TREND_MAX_MONTHS:
+            raise ValueError(f'months must be between 1 and {TREND_MAX_MONTHS}')
+        end = parse_month(params['to']) if params.get('to') else latest_month(account)
+    except (ValueError, TypeError) as e:
+        return Response({'error': f'Invalid query parameter: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if end is None:
+        return Response({'account': account, 'months': []}, status=status.HTTP_200_OK)
+    
+    start = add_months(end, 1 - months)
+    transaction_type = params.get('type', '').upper() or None
+    return Response({
+        'account': account,
+        'from': start.strftime('%Y-%m'),
+        'to': end.strftime('%Y-%m'),
+        'months': monthly_trends(account, start, end, transaction_type, params.get('category') or None)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def recurring_payments(request):
+    """Subscriptions and bills detected across an account's statements
+    
+    Signed-in users only, like spending_trends. Query parameters: account (label,
+    as on upload, within the caller's own accounts); all=1 also lists payments
+    that have stopped. Results are stored when statements are processed, so this
+    is a single query.
+    """
+    account = account_for_request(request)
+    payments = list(RecurringPayment.objects.filter(account=account))
+    include_stopped = request.query_params.get('all', '').lower() in ('1', 'true', 'yes')
+    return Response({
+        'account': account,
+        'summary': recurring_summary(payments),
+        'payments': [
+            {
+                'merchant': payment.merchant,
+                'merchant_key': payment.merchant_key,
+                'category': payment.category or None,
+                'cadence': payment.cadence,
+                'interval_days': payment.interval_days,
+                'occurrences': payment.occurrences,
+                'average_amount': float(payment.average_amount),
+                'amount_std_dev': float(payment.amount_std_dev),
+                'first_date': payment.first_date.isoformat(),
+                'last_date': payment.last_date.isoformat(),
+                'next_date': payment.next_date.isoformat(),
+                'next_amount': float(payment.next_amount),
+                'active': payment.active,
+            }
+            for payment in payments
+            if payment.active or include_stopped
+        ]
+    }, status=status.HTTP_200_OK)
+
+
+TRANSACTION_PAGE_SIZE = 100
+TRANSACTION_MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(trans_date, trans_id):
+    """Opaque keyset cursor for the (date, id) position of the last row on a page"""
+    return base64.urlsafe_b64encode(f'{trans_date.isoformat()}|{trans_id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    trans_date, trans_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return date.fromisoformat(trans_date), int(trans_id)
+
+
+@api_view(['GET'])
+def list_transactions(request, session_id):
+    """Page through a session's transactions, newest first, with keyset pagination
+    
+    Query parameters: limit, cursor, type, category, date_from, date_to,
+    min_amount, max_amount. Each page costs one indexed range scan on
+    (session, date, id), however large the session is.
+    """
+    try:
+        session = AnalysisSession.objects.only('id').get(session_id=session_id)
+    except AnalysisSession.DoesNotExist:
+        return Response({'error': 'Analysis session not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    params = request.query_params
+    try:
+        limit = min(int(params.get('limit', TRANSACTION_PAGE_SIZE)), TRANSACTION_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        
+        queryset = Transaction.objects.filter(session_id=session.id)
+        if params.get('type'):
+            queryset = queryset.filter(transaction_type=params['type'].upper())
+        if params.get('category'):
+            queryset = queryset.filter(category=params['category'])
+        if params.get('date_from'):
+            queryset = queryset.filter(date__gte=date.fromisoformat(params['date_from']))
+        if params.get('date_to'):
+            queryset = queryset.filter(date__lte=date.fromisoformat(params['date_to']))
+        if params.get('min_amount'):
+            queryset = queryset.filter(amount__gte=Decimal(params['min_amount']))
+        if params.get('max_amount'):
+            queryset = queryset.filter(amount__lte=Decimal(params['max_amount']))
+        if params.get('cursor'):
+            cursor_date, cursor_id = decode_cursor(params['cursor'])
+            queryset = queryset.filter(Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id))
+    except InvalidOperation:
+        return Response({'error': 'Invalid amount filter'}, status=status.HTTP_400_BAD_REQUEST)
+    except (ValueError, TypeError, binascii.Error) as e:
+        return Response({'error': f'Invalid query parameter: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rows = list(
+        queryset.order_by('-date', '-id')
+        .values('id', 'date', 'description', 'amount', 'transaction_type', 'category', 'confidence')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return Response({
+        'session_id': session_id,
+        'transactions': [
+            {
+                'id': row['id'],
+                'date': row['date'].isoformat(),
+                'description': row['description'],
+                'amount': float(row['amount']),
+                'type': row['transaction_type'],
+                'category': row['category'],
+                'confidence': row['confidence']
+            }
+            for row in rows
+        ],
+        'next_cursor': encode_cursor(rows[-1]['date'], rows[-1]['id']) if has_more else None
+    }, status=status.HTTP_200_OK)
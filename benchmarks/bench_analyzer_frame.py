@@ -0,0 +1,63 @@
+"""
+Memory per transaction and aggregate time: transaction dicts with Decimal amounts
+vs the columnar frame the analyzer builds (int64 minor units, categorical
+type/category, datetime64 dates), and the time to build that frame from row
+dicts or from the value columns session_frame() reads, vs aggregating it.
+
+Usage:
+    python benchmarks/bench_analyzer_frame.py [--rows 100000] [--repeat 3]
+"""
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analyzer_passes import CATEGORIES, best_of, make_rows, value_columns  # noqa: E402
+from analyzer.services.frame import build_frame, frame_from_columns  # noqa: E402
+from analyzer.services.stats import TransactionStats  # noqa: E402
+
+
+def traced_bytes(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    rows, row_bytes = traced_bytes(lambda: make_rows(args.rows))
+    frame, frame_bytes = traced_bytes(lambda: build_frame(rows, CATEGORIES))
+    deep_bytes = frame.memory_usage(deep=True).sum()
+    numeric_bytes = frame.drop(columns=['description']).memory_usage(deep=True).sum()
+    print(f"dict rows          {row_bytes / args.rows:8.1f} bytes/transaction")
+    print(f"frame (traced)     {frame_bytes / args.rows:8.1f} bytes/transaction")
+    print(f"frame (deep)       {deep_bytes / args.rows:8.1f} bytes/transaction "
+          f"({numeric_bytes / args.rows:.1f} without descriptions)")
+    
+    build = best_of(args.repeat, lambda r: build_frame(r, CATEGORIES), rows)
+    columns = value_columns(rows)
+    from_columns = best_of(args.repeat, lambda c: frame_from_columns(*c, categories=CATEGORIES), columns)
+    vectorized = best_of(args.repeat, lambda f: TransactionStats.from_frame(f, CATEGORIES), frame)
+    print(f"frame from row dicts       {build * 1000:9.1f} ms")
+    print(f"frame from value columns   {from_columns * 1000:9.1f} ms")
+    print(f"aggregates over the frame  {vectorized * 1000:9.1f} ms")
+    
+    expected = TransactionStats.from_frame(frame, CATEGORIES)
+    actual = TransactionStats.from_frame(frame_from_columns(*columns, categories=CATEGORIES), CATEGORIES)
+    assert expected.count == actual.count and expected.category_counts == actual.category_counts
+    assert expected.total_income == actual.total_income and expected.total_expenses == actual.total_expenses
+    assert expected.category_totals == actual.category_totals
+    assert expected.mean == actual.mean and expected.variance == actual.variance
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+analyze_transactions aggregate cost: the original separate Python passes vs one
+frame built over all rows and aggregated by TransactionStats.from_frame(), both
+from row dicts and from the value columns session_frame() reads from the
+database. Rows are pre-categorized so no ML runs.
+
+Usage:
+    python benchmarks/bench_analyzer_passes.py [--rows 100000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import decimal
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from analyzer.services.frame import build_frame, frame_from_columns  # noqa: E402
+from analyzer.services.stats import TransactionStats  # noqa: E402
+
+CATEGORIES = ['Food & Dining', 'Transportation', 'Shopping', 'Bills & Utilities', 'Entertainment', 'Healthcare', 'Other']
+
+
+def make_rows(count):
+    start = date(2024, 1, 1)
+    return [
+        {
+            'date': start + timedelta(days=i % 365),
+            'description': f'ROW {i}',
+            'amount': Decimal(f'{(i * 37) % 50000 + 100}.{i % 100:02d}'),
+            'type': 'CREDIT' if i % 10 == 0 else 'DEBIT',
+            'category': None if i % 10 == 0 else CATEGORIES[i % len(CATEGORIES)],
+        }
+        for i in range(count)
+    ]
+
+
+def to_float(t):
+    try:
+        return float(t['amount']) if t['amount'] is not None else 0.0
+    except (ValueError, TypeError, decimal.InvalidOperation):
+        return None
+
+
+def pass_totals(rows):
+    income = expenses = 0.0
+    for t in rows:
+        amount = to_float(t)
+        if amount is None:
+            continue
+        if t['type'] == 'CREDIT':
+            income += amount
+        elif t['type'] == 'DEBIT':
+            expenses += amount
+    return income, expenses
+
+
+def pass_categories(rows):
+    debits = [t for t in rows if t['type'] == 'DEBIT']
+    frame = pd.DataFrame({
+        'category': [t['category'] for t in debits],
+        'amount': pd.to_numeric(pd.Series([t['amount'] for t in debits], dtype=object), errors='coerce'),
+    })
+    return frame.groupby('category')['amount'].sum().to_dict(), pd.Series(frame['category']).value_counts().idxmax()
+
+
+def pass_anomaly_features(rows):
+    return np.array([to_float(t) or 0.0 for t in rows]).reshape(-1, 1)
+
+
+def pass_average(rows):
+    total = 0.0
+    valid = 0
+    for t in rows:
+        amount = to_float(t)
+        if amount is not None:
+            total += amount
+            valid += 1
+    return total / valid if valid else 0.0
+
+
+def value_columns(rows):
+    """The columns session_frame() collects from values_list() tuples"""
+    return (
+        [t['amount'] for t in rows], [t['type'] for t in rows], [t['date'] for t in rows],
+        [t['description'] for t in rows], [t['category'] for t in rows],
+        [None] * len(rows), [False] * len(rows),
+    )
+
+
+def single_pass(rows):
+    return TransactionStats.from_frame(build_frame(rows, CATEGORIES), CATEGORIES)
+
+
+def columns_pass(columns):
+    return TransactionStats.from_frame(frame_from_columns(*columns, categories=CATEGORIES), CATEGORIES)
+
+
+def best_of(repeat, func, rows):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    rows = make_rows(args.rows)
+    
+    legacy_total = 0.0
+    for name, func in [('totals', pass_totals), ('category group-by', pass_categories),
+                       ('anomaly features', pass_anomaly_features), ('average', pass_average)]:
+        elapsed = best_of(args.repeat, func, rows)
+        legacy_total += elapsed
+        print(f"legacy pass {name:<20} {elapsed * 1000:9.1f} ms")
+    print(f"legacy passes total            {legacy_total * 1000:9.1f} ms")
+    
+    elapsed = best_of(args.repeat, single_pass, rows)
+    print(f"single pass from row dicts     {elapsed * 1000:9.1f} ms  ({legacy_total / elapsed:.2f}x)")
+    columns = value_columns(rows)
+    elapsed = best_of(args.repeat, columns_pass, columns)
+    print(f"single pass from value columns {elapsed * 1000:9.1f} ms  ({legacy_total / elapsed:.2f}x)")
+    
+    stats = single_pass(rows)
+    assert columns_pass(columns).category_totals == stats.category_totals
+    income, expenses = pass_totals(rows)
+    assert abs(stats.total_income - income) < 0.01 and abs(stats.total_expenses - expenses) < 0.01
+    assert abs(stats.mean - pass_average(rows)) < 1e-6
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Start-up import cost of the Django project, measured with `python -X importtime`
+in fresh interpreters.
+
+Profiles:
+    urls     django.setup() + the URLconf; what `manage.py migrate`/`check` and
+             every serving worker import before handling a request
+    preload  the same plus analyzer.services.preload.preload(import_only=True),
+             i.e. the ML and PDF stacks a preloaded worker imports up front
+
+Usage:
+    python benchmarks/bench_import_time.py [--repeat 3] [--top 8]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = (
+    "import os, django; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spendwise.settings'); "
+    "django.setup(); import analyzer.urls"
+)
+PROFILES = {
+    'urls': SETUP,
+    'preload': SETUP + "; from analyzer.services.preload import preload; preload(import_only=True)",
+}
+
+
+def run_profile(code):
+    """Wall time and per-top-level-package cumulative import time (microseconds)"""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - started
+    
+    packages = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level entries are not indented; nested imports are already in their parent
+        if not name.startswith('  '):
+            packages[name.strip().split('.')[0]] += int(cumulative)
+    return elapsed, packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+    
+    for name, code in PROFILES.items():
+        runs = [run_profile(code) for _ in range(args.repeat)]
+        elapsed, packages = min(runs, key=lambda run: run[0])
+        print(f"{name:<8} wall {elapsed * 1000:8.1f} ms   imports {sum(packages.values()) / 1000:8.1f} ms")
+        for package, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {package:<24} {cumulative / 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
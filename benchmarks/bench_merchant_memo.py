@@ -0,0 +1,84 @@
+"""
+Categorization and typing cost with and without the per-merchant memo, on
+descriptions that repeat a few merchants with varying STAN and reference numbers.
+
+Usage:
+    python benchmarks/bench_merchant_memo.py [--rows 20000] [--batch 500]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spendwise.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from analyzer.services import keywords  # noqa: E402
+from analyzer.services.merchants import memo_stats, reset_memos  # noqa: E402
+from analyzer.services.ml_analyzer import get_analyzer  # noqa: E402
+from analyzer.services.pdf_parser import PDFParser  # noqa: E402
+
+MERCHANTS = [
+    'POS PURCHASE FOODPANDA KARACHI', 'ATM CASH WITHDRAWAL BRANCH', 'TELENOR PREPAID LOAD',
+    'NETFLIX SUBSCRIPTION', 'UBER TRIP', 'SALARY TRANSFER FROM EMPLOYER', 'PHARMACY MEDICINE',
+    'K-ELECTRIC BILL PAID', 'DARAZ ONLINE ORDER', 'CAREEM RIDE',
+]
+
+
+def make_descriptions(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        f'{rng.choice(MERCHANTS)} STAN ({rng.randint(100000, 999999)}) REF {rng.randint(10 ** 9, 10 ** 10)}'
+        for _ in range(count)
+    ]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+    
+    descriptions = make_descriptions(args.rows)
+    batches = [descriptions[i:i + args.batch] for i in range(0, len(descriptions), args.batch)]
+    analyzer = get_analyzer()
+    pdf_parser = PDFParser()
+    
+    # Keyed by the full description, as before: reference numbers make every row distinct
+    analyzer._key_function = lambda description: description
+    reset_memos()
+    uncached = timed(lambda: [analyzer.classify_batch(batch) for batch in batches])
+    analyzer._key_function = None
+    
+    reset_memos()
+    cached = timed(lambda: [analyzer.classify_batch(batch) for batch in batches])
+    category_stats = memo_stats()['category']
+    
+    # Typing is only memoized with the pure-Python automaton (see get_transaction_type_memo)
+    keywords.ahocorasick = None
+    keywords.reset_keyword_cache()
+    matcher = keywords.get_transaction_type_matcher()
+    scan = timed(lambda: [matcher.first_label(description, 'DEBIT') for description in descriptions])
+    memoized_scan = timed(lambda: [pdf_parser._classify_type(description) for description in descriptions])
+    type_stats = memo_stats()['type']
+    
+    print(f"{args.rows} descriptions over {len(MERCHANTS)} merchants, batches of {args.batch}")
+    print(f"  categorize  raw descriptions {uncached * 1000:8.1f} ms   merchant memo {cached * 1000:8.1f} ms   "
+          f"hit ratio {category_stats['hit_ratio']:.3f} ({category_stats['entries']} keys)")
+    print(f"  type        python scan      {scan * 1000:8.1f} ms   merchant memo {memoized_scan * 1000:8.1f} ms   "
+          f"hit ratio {type_stats['hit_ratio']:.3f} ({type_stats['entries']} keys)")
+
+
+if __name__ == '__main__':
+    main()
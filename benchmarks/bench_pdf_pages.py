@@ -0,0 +1,56 @@
+"""
+PDF page extraction throughput: serial vs process-pool PDFParser.
+
+The parser starts at most one process per available CPU and extracts serially
+when fewer than two are available, so on such a machine both columns measure
+the same serial path.
+
+Usage:
+    python benchmarks/bench_pdf_pages.py [--pages 10 50 200] [--workers 4] [--chunk-size 16]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.services.pdf_parser import PDFParser, available_cpus  # noqa: E402
+from synthetic_statement import statement_pdf  # noqa: E402
+
+
+def timed_parse(parser, path):
+    started = time.perf_counter()
+    transactions = parser.parse_pdf(path)
+    return transactions, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--chunk-size', type=int, default=16)
+    args = parser.parse_args()
+
+    workers = min(args.workers, available_cpus())
+    print(f"{available_cpus()} CPUs available, {args.workers} workers requested, {workers} used"
+          + ("" if workers > 1 else " (serial extraction, no pool)"))
+    print(f"{'pages':>6} {'serial p/s':>12} {'parallel p/s':>13} {'speedup':>8}  identical")
+    for pages in args.pages:
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as handle:
+            handle.write(statement_pdf(pages))
+            path = handle.name
+        try:
+            serial, serial_time = timed_parse(PDFParser(), path)
+            parallel, parallel_time = timed_parse(
+                PDFParser(workers=args.workers, chunk_size=args.chunk_size), path
+            )
+            print(f"{pages:>6} {pages / serial_time:>12.1f} {pages / parallel_time:>13.1f} "
+                  f"{serial_time / parallel_time:>7.2f}x  {serial == parallel}")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
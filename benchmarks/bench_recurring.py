@@ -0,0 +1,86 @@
+"""
+Recurring-payment detection cost as the number of debits grows.
+
+For each size, generates one merchant per 20 rows: every tenth charges monthly
+for three years, the rest at random, with reference numbers that differ on
+every charge. Times detect_recurring on the rows.
+
+Usage:
+    python benchmarks/bench_recurring.py [--rows 80000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spendwise.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from analyzer.services.recurring import detect_recurring  # noqa: E402
+
+START = date(2021, 1, 1)
+
+
+def merchant_name(index):
+    # Letters only: digit runs of three or more are collapsed by the merchant key
+    name = ''
+    while True:
+        index, letter = divmod(index, 26)
+        name += chr(ord('A') + letter)
+        if not index:
+            return name
+
+
+def make_rows(count, merchants, seed=11):
+    rng = random.Random(seed)
+    rows = []
+    # Every tenth merchant is a monthly subscription
+    for merchant in range(0, merchants, 10):
+        amount = Decimal(rng.randint(300, 5000))
+        for month in range(36):
+            rows.append((
+                START + timedelta(days=round(month * 30.44)),
+                f'SUBSCRIPTION {merchant_name(merchant)} REF {rng.randint(10 ** 8, 10 ** 9)}',
+                amount,
+            ))
+    while len(rows) < count:
+        rows.append((
+            START + timedelta(days=rng.randint(0, 36 * 30)),
+            f'POS PURCHASE STORE {merchant_name(rng.randint(0, merchants))} STAN {rng.randint(10 ** 5, 10 ** 6)}',
+            Decimal(rng.randint(100, 90000)) / 100,
+        ))
+    rng.shuffle(rows)
+    return rows[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=80000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    size = args.rows // 8
+    while size <= args.rows:
+        merchants = size // 20
+        dates, descriptions, amounts = zip(*make_rows(size, merchants))
+        categories = [None] * size
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            detected = detect_recurring(dates, descriptions, amounts, categories)
+            timings.append(time.perf_counter() - started)
+        best = min(timings) * 1000
+        print(f"  {size:7d} rows   {best:8.1f} ms   {best * 1000 / size:6.2f} us/row   "
+              f"{len(detected)} recurring of {len(range(0, merchants, 10))} subscriptions")
+        size *= 2
+
+
+if __name__ == '__main__':
+    main()
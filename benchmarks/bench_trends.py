@@ -0,0 +1,101 @@
+"""
+Trend query cost: aggregating Transaction rows per month vs reading MonthlyRollup.
+
+Stores --years of daily transactions for one account in an in-memory database
+(rollups maintained by the normal ingest path), then times a 12-month and a
+full-range trend query both ways.
+
+Usage:
+    python benchmarks/bench_trends.py [--years 3] [--per-day 40] [--repeat 5]
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spendwise.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.DATABASES['default']['NAME'] = ':memory:'
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db.models import Count, Sum  # noqa: E402
+from django.db.models.functions import TruncMonth  # noqa: E402
+
+from analyzer.models import AnalysisSession, Transaction  # noqa: E402
+from analyzer.services.ingest import ingest_stream  # noqa: E402
+from analyzer.services.rollups import add_months, latest_month, monthly_trends  # noqa: E402
+
+ACCOUNT = 'bench'
+CATEGORIES = ['Food & Dining', 'Transportation', 'Shopping', 'Bills & Utilities', 'Entertainment', 'Healthcare']
+
+
+def load(years, per_day):
+    start = date(2020, 1, 1)
+    for month in range(years * 12):
+        month_start = add_months(start, month)
+        session = AnalysisSession.objects.create(
+            session_id=str(uuid.uuid4()), account=ACCOUNT, file_name='bench.pdf', file_size=0
+        )
+        rows = []
+        day = month_start
+        while day.month == month_start.month:
+            for i in range(per_day):
+                rows.append({
+                    'date': day,
+                    'description': f'ROW {i}',
+                    'amount': Decimal(f'{(i * 37) % 5000 + 100}.{i % 100:02d}'),
+                    'type': 'CREDIT' if i % 10 == 0 else 'DEBIT',
+                    'category': None if i % 10 == 0 else CATEGORIES[i % len(CATEGORIES)],
+                })
+            day += timedelta(days=1)
+        ingest_stream(session, rows)
+
+
+def scan_trends(start, end):
+    return list(
+        Transaction.objects.filter(session__account=ACCOUNT, date__gte=start, date__lt=add_months(end, 1))
+        .annotate(month=TruncMonth('date'))
+        .values('month', 'category', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+
+def best_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--per-day', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    call_command('migrate', verbosity=0)
+    load(args.years, args.per_day)
+    end = latest_month(ACCOUNT)
+    print(f"{Transaction.objects.count()} transactions over {args.years * 12} months")
+    
+    for months in (12, args.years * 12):
+        start = add_months(end, 1 - months)
+        scan = best_ms(lambda: scan_trends(start, end), args.repeat)
+        rollup = best_ms(lambda: monthly_trends(ACCOUNT, start, end), args.repeat)
+        print(f"  {months:3d} months   transaction scan {scan:8.2f} ms   rollups {rollup:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
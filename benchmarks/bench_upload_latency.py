@@ -0,0 +1,89 @@
+"""
+Upload latency benchmark: per-request MLAnalyzer training vs the shared artifact.
+
+Each simulated request obtains an analyzer, categorizes the statement's rows and
+analyzes them, as the upload path does. The model step is timed separately from
+the rest: sharing the artifact removes the per-request training, while the
+analysis itself (mostly the per-statement IsolationForest fit) is unchanged, so
+the end-to-end gain is the training time and shrinks as statements grow.
+
+Usage:
+    python benchmarks/bench_upload_latency.py [--rows 200] [--requests 20]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spendwise.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from analyzer.services.ml_analyzer import MLAnalyzer, get_analyzer, reset_analyzer  # noqa: E402
+from analyzer.services.merchants import reset_memos  # noqa: E402
+
+DESCRIPTIONS = [
+    'POS PURCHASE FOODPANDA KARACHI', 'ATM CASH WITHDRAWAL', 'TELENOR PREPAID LOAD',
+    'NETFLIX SUBSCRIPTION', 'UBER TRIP', 'SALARY TRANSFER', 'PHARMACY MEDICINE',
+]
+
+
+def make_transactions(rows):
+    start = date(2024, 1, 1)
+    return [
+        {
+            'date': start + timedelta(days=i % 365),
+            'description': DESCRIPTIONS[i % len(DESCRIPTIONS)],
+            'amount': Decimal(f'{(i * 37) % 5000 + 100}.00'),
+            'type': 'CREDIT' if i % 10 == 0 else 'DEBIT',
+        }
+        for i in range(rows)
+    ]
+
+
+def measure(label, make_analyzer, rows, requests):
+    """Mean (model, analysis) milliseconds per request"""
+    model_timings = []
+    analysis_timings = []
+    for _ in range(requests):
+        # Fresh rows and an empty merchant memo, so every request classifies its debits
+        reset_memos()
+        transactions = make_transactions(rows)
+        started = time.perf_counter()
+        analyzer = make_analyzer()
+        model_done = time.perf_counter()
+        analyzer.categorize(transactions)
+        analyzer.analyze_transactions(transactions)
+        finished = time.perf_counter()
+        model_timings.append((model_done - started) * 1000)
+        analysis_timings.append((finished - model_done) * 1000)
+    model, analysis = statistics.mean(model_timings), statistics.mean(analysis_timings)
+    print(f"{label:<24} model {model:8.2f} ms   categorize+analyze {analysis:8.2f} ms   "
+          f"total {model + analysis:8.2f} ms")
+    return model + analysis
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    before = measure('before: MLAnalyzer()', MLAnalyzer, args.rows, args.requests)
+
+    reset_analyzer()
+    started = time.perf_counter()
+    get_analyzer()
+    print(f"{'artifact load (once)':<24} {(time.perf_counter() - started) * 1000:8.2f} ms")
+    after = measure('after: get_analyzer()', get_analyzer, args.rows, args.requests)
+    print(f"shared artifact saves {before - after:.2f} ms per request ({(before - after) / before:.1%} of the total)")
+
+
+if __name__ == '__main__':
+    main()
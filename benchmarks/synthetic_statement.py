@@ -0,0 +1,64 @@
+"""
+Synthetic Meezan-style statements for benchmarks (no PDF library required).
+"""
+import random
+
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+DESCRIPTIONS = [
+    ('POS PURCHASE FOODPANDA KARACHI', 'STAN(123456)'),
+    ('ATM CASH WITHDRAWAL', 'MEEZAN BANK BRANCH 0102'),
+    ('TELENOR PREPAID LOAD', 'REF 99887766'),
+    ('NETFLIX.COM SUBSCRIPTION', 'VISA CARD 4321'),
+    ('RAAST P2P FUND TRANSFER FROM', 'ALI KHAN'),
+    ('SALARY TRANSFER', 'BATCH TRANSFER 2024'),
+    ('BANK CHARGES', 'FED INCLUDED'),
+]
+
+
+def statement_lines(transactions, seed=42):
+    """Lines of a statement with multi-line transaction blocks"""
+    rng = random.Random(seed)
+    lines = []
+    balance = 100000.0
+    for i in range(transactions):
+        first, second = DESCRIPTIONS[i % len(DESCRIPTIONS)]
+        amount = rng.randint(100, 50000) + rng.randint(0, 99) / 100
+        balance += amount if 'FROM' in first or 'SALARY' in first else -amount
+        lines.append(f'{DAYS[i % 7]} {MONTHS[(i // 28) % 12]} {i % 28 + 1} {first} {amount:,.2f} {balance:,.2f}')
+        lines.append(second)
+    return lines
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def statement_pdf(pages, lines_per_page=40, seed=42):
+    """Bytes of a minimal multi-page PDF containing statement_lines()"""
+    lines = statement_lines(pages * lines_per_page // 2, seed=seed)
+    page_lines = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for chunk in page_lines:
+        content = 'BT /F1 9 Tf 12 TL 36 800 Td ' + ' '.join(f'({_escape(line)}) Tj T*' for line in chunk) + ' ET'
+        objects.append(f'<< /Length {len(content)} >>\nstream\n{content}\nendstream')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>'
+        )
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return bytes(out)
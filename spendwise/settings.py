@@ -61,13 +61,45 @@ TEMPLATES = [
 WSGI_APPLICATION = 'spendwise.wsgi.application'
 
 # Database
+# Django's SQLite backend, except that transactions begin with BEGIN IMMEDIATE so
+# concurrent writers queue for the write lock (see spendwise/sqlite_backend/base.py)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'spendwise.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a writer waits for another one to commit before failing
+            'timeout': 20,
+        },
+        # Tests run on a file, as in production: an in-memory database shared between
+        # threads locks per table and fails instead of waiting
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Caches. 'analysis' holds rendered GET /api/analysis/<session_id>/ responses,
+# keyed by session id and the content version read from the database, so an
+# updated or deleted session is never answered from an old entry. LocMemCache
+# evicts least recently used entries beyond MAX_ENTRIES; with several worker
+# processes switch it to 'django.core.cache.backends.filebased.FileBasedCache'
+# with a shared LOCATION so the processes share rendered responses.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analysis': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'spendwise-analysis',
+        'TIMEOUT': 300,  # seconds
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    },
+}
+ANALYSIS_CACHE_ALIAS = 'analysis'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -100,13 +132,144 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Pre-trained ML model artifacts (rebuild with `python manage.py train_models`)
+ML_MODEL_DIR = BASE_DIR / 'artifacts'
+
+# Directory with category_keywords.json and transaction_type_keywords.json;
+# None uses the lists shipped in analyzer/data
+KEYWORD_DATA_DIR = None
+
+# Categorizer: 'tfidf' (the trained artifact) or 'embedding' (nearest category
+# centroid of sentence embeddings; needs requirements-embeddings.txt unless
+# EMBEDDING_MODEL is 'hashing', a dependency-free stand-in encoder). Embeddings are
+# cached per normalized description in an LRU-bounded memory-mapped store.
+CATEGORIZER_BACKEND = 'tfidf'
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_MIN_SIMILARITY = 0.3
+EMBEDDING_CACHE_DIR = BASE_DIR / 'artifacts' / 'embedding_cache'
+EMBEDDING_CACHE_SIZE = 50000
+
+# Categories and credit/debit types are memoized per merchant key (the description
+# with digit runs such as STAN/reference numbers collapsed). The category memo
+# can also live in a cache alias (e.g. a Redis-backed one) shared by all workers.
+MERCHANT_MEMO_SIZE = 20000
+MERCHANT_MEMO_CACHE_ALIAS = None
+
+# Share of processed statements run under cProfile; stats are written to
+# PIPELINE_PROFILE_DIR/<session_id>.prof (0 disables profiling)
+PIPELINE_PROFILE_SAMPLE_RATE = 0.0
+PIPELINE_PROFILE_DIR = BASE_DIR / 'artifacts' / 'profiles'
+
+# Logging: the analyzer logs one summary line per statement at INFO; per-row
+# details (rejected rows, unconvertible amounts) only at DEBUG
+LOG_LEVEL = os.environ.get('SPENDWISE_LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s %(levelname)s %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'standard',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        # Replaces Django's default handlers, which would print request errors a second time via root
+        'django': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'analyzer': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+# Rows per INSERT when bulk-saving parsed transactions
+TRANSACTION_BULK_BATCH_SIZE = 500
+
+# Statement processing: 'async' hands uploads to STATEMENT_WORKERS background
+# threads and returns 202 immediately, 'sync' processes inside the request.
+# None uses 1 worker on SQLite, which writes one transaction at a time, else 2
+STATEMENT_PROCESSING_MODE = 'async'
+STATEMENT_WORKERS = None
+
+# Uploads are parsed straight from the request in 'sync' mode and only written to
+# MEDIA_ROOT when a background worker needs them; set True to keep every PDF
+STATEMENT_KEEP_UPLOADS = False
+
+# sklearn, pandas and pdfplumber are imported on first use so manage.py commands
+# start fast; True makes WSGI workers import them and load the model at start-up
+ANALYZER_PRELOAD = False
+
+# PDF page extraction: more than one worker extracts pages in a process pool,
+# PDF_PARSER_CHUNK_SIZE pages per task and at most one process per available CPU.
+# 0 keeps extraction serial; the pool only pays off for long statements on
+# machines with spare cores (see benchmarks/bench_pdf_pages.py).
+PDF_PARSER_WORKERS = 0
+PDF_PARSER_CHUNK_SIZE = 16
+
+# Multi-statement uploads (api/upload/batch/): at most STATEMENT_BATCH_MAX_FILES
+# PDFs per request, parsed concurrently by up to STATEMENT_BATCH_WORKERS processes
+# (never more than the available CPUs)
+STATEMENT_BATCH_MAX_FILES = 24
+STATEMENT_BATCH_WORKERS = 4
+
+# Re-uploads of an already analyzed PDF (matched by SHA-256) are answered from the
+# existing session: 'account' reuses sessions of the same signed-in account, 'off'
+# always processes the upload again. Anonymous uploads are never deduplicated
+STATEMENT_DEDUP_POLICY = 'account'
+
+# Anomaly baselines of signed-in accounts (anonymous statements are checked against
+# their own amounts): amounts kept in the history sample, and the share of new rows
+# (relative to the sample) that triggers a refit
+ANOMALY_RESERVOIR_SIZE = 2048
+ANOMALY_REFIT_FRACTION = 0.25
+
+# Recurring payments: a merchant needs RECURRING_MIN_OCCURRENCES charges at a
+# regular interval whose amounts vary by at most RECURRING_AMOUNT_TOLERANCE
+# (standard deviation relative to the mean)
+RECURRING_MIN_OCCURRENCES = 3
+RECURRING_AMOUNT_TOLERANCE = 0.2
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# File upload settings
+# File upload settings: request bodies above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled
+# to FILE_UPLOAD_TEMP_DIR (the system temp directory when None) in 64KB chunks
+# instead of being held in memory; DATA_UPLOAD_MAX_MEMORY_SIZE caps the non-file fields
 FILE_UPLOAD_MAX_MEMORY_SIZE = 1048576  # 1MB
+FILE_UPLOAD_TEMP_DIR = os.environ.get('SPENDWISE_UPLOAD_TEMP_DIR') or None
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1048576  # 1MB
 
+# Statement uploads: larger PDFs are skipped while streaming in, and larger request
+# bodies are refused with 413 before they are read
+STATEMENT_MAX_FILE_SIZE = 25 * 1024 * 1024
+STATEMENT_MAX_REQUEST_SIZE = 100 * 1024 * 1024
+
+# Concurrent uploads per worker process: at most UPLOAD_MAX_CONCURRENT uploads
+# (UPLOAD_MAX_CONCURRENT_PER_CLIENT per user or address) receiving or processing at
+# once, queued jobs included, with at most UPLOAD_BYTE_BUDGET bytes of request bodies
+# between them. Others get 429 with Retry-After: UPLOAD_RETRY_AFTER seconds; uploads
+# without a Content-Length get 411
+UPLOAD_MAX_CONCURRENT = 8
+UPLOAD_MAX_CONCURRENT_PER_CLIENT = 2
+UPLOAD_BYTE_BUDGET = 512 * 1024 * 1024
+UPLOAD_RETRY_AFTER = 5
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
 
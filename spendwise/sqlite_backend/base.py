@@ -0,0 +1,18 @@
+"""
+SQLite backend whose transactions take the database write lock when they begin.
+
+Django opens transactions with a plain (deferred) BEGIN, which only takes a read
+lock until the first write. When two connections read in a transaction and then
+both try to write, SQLite cannot wait for either without a deadlock, so one of
+them fails at once with "database is locked" whatever the busy timeout. BEGIN
+IMMEDIATE takes the write lock up front: a second writer waits for the first,
+for up to OPTIONS['timeout'] seconds, instead of failing halfway through.
+Reads outside transaction.atomic() are unaffected.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -4,8 +4,15 @@ WSGI config for spendwise project.
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spendwise.settings')
 
-application = get_wsgi_application() 
\ No newline at end of file
+application = get_wsgi_application()
+
+# Serving workers can load the ML and PDF stacks up front instead of on the first upload
+if getattr(settings, 'ANALYZER_PRELOAD', False):
+    from analyzer.services.preload import preload
+    
+    preload() 
\ No newline at end of file